@@ -213,28 +213,42 @@ def validate_password_strength(password: str) -> tuple[bool, str]:
 class LoginAttemptTracker:
     """
     Track login attempts for rate limiting.
-    In production, use Redis or database for distributed systems.
+    Counters live in the shared state backend so every worker process
+    sees the same failures and lockouts.
     """
-    def __init__(self):
-        self._attempts = {}  # {username: [(timestamp, success), ...]}
+    def __init__(self, backend=None):
+        self._backend = backend
         self._lockout_duration = timedelta(minutes=15)
         self._max_attempts = 5
         self._attempt_window = timedelta(minutes=5)
     
+    @property
+    def backend(self):
+        # Resolved lazily so importing this module never opens the state store
+        if self._backend is None:
+            from app.services.shared_state import get_state_backend
+            self._backend = get_state_backend()
+        return self._backend
+    
     def record_attempt(self, username: str, success: bool):
         """Record a login attempt"""
-        now = datetime.now(timezone.utc)
-        
-        if username not in self._attempts:
-            self._attempts[username] = []
+        if success:
+            return
         
-        # Clean old attempts outside the window
-        self._attempts[username] = [
-            (ts, succ) for ts, succ in self._attempts[username]
-            if now - ts < self._attempt_window
-        ]
+        failures_key = f"login:failures:{username}"
+        failures = self.backend.incr(failures_key)
+        if failures == 1:
+            # Window starts at the first failure
+            self.backend.expire(failures_key, int(self._attempt_window.total_seconds()))
         
-        self._attempts[username].append((now, success))
+        if failures >= self._max_attempts:
+            lockout_until = datetime.now(timezone.utc) + self._lockout_duration
+            self.backend.set(
+                f"login:lockout:{username}",
+                lockout_until.isoformat(),
+                ex=int(self._lockout_duration.total_seconds()),
+                nx=True,
+            )
     
     def is_locked_out(self, username: str) -> tuple[bool, Optional[datetime]]:
         """
@@ -243,32 +257,22 @@ class LoginAttemptTracker:
         Returns:
             Tuple of (is_locked, lockout_until)
         """
-        if username not in self._attempts:
+        lockout = self.backend.get(f"login:lockout:{username}")
+        if lockout is None:
             return False, None
         
-        now = datetime.now(timezone.utc)
-        
-        # Get recent failed attempts
-        recent_failed = [
-            ts for ts, success in self._attempts[username]
-            if not success and now - ts < self._attempt_window
-        ]
-        
-        if len(recent_failed) >= self._max_attempts:
-            # User is locked out
-            lockout_until = recent_failed[0] + self._lockout_duration
-            if now < lockout_until:
-                return True, lockout_until
+        lockout_until = datetime.fromisoformat(lockout)
+        if datetime.now(timezone.utc) < lockout_until:
+            return True, lockout_until
         
         return False, None
     
     def clear_attempts(self, username: str):
         """Clear login attempts for a user (after successful login)"""
-        if username in self._attempts:
-            del self._attempts[username]
+        self.backend.delete(f"login:failures:{username}", f"login:lockout:{username}")
 
 
-# Global instance (use Redis in production)
+# Global instance backed by shared state (Redis or local SQLite)
 login_tracker = LoginAttemptTracker()
 
 
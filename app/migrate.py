@@ -0,0 +1,141 @@
+"""
+Explicit schema migration step.
+
+The application no longer creates tables on import; run this once per
+deployment (app/serve.py runs it before starting workers):
+
+    python -m app.migrate
+"""
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+from app.database import Base, SessionLocal, engine, init_db
+from app.models import Product, ConsignmentStock, StockCheckpoint
+from app.services.reorder import rebuild_alerts
+from app.services.search import ensure_search_index
+from app.services.stock_history import build_checkpoints
+from app.services.sync import ensure_sync_triggers
+
+
+def ensure_unique_item_codes(connection: Connection):
+    """
+    Make ``products.item_code`` unique on databases created before catalog
+    upserts keyed on it. Refuses to proceed while duplicates exist, since
+    merging them would mean repointing stock and invoice lines.
+    """
+    index = next(i for i in Product.__table__.indexes if i.columns.keys() == ["item_code"])
+    existing = {i["name"]: i for i in inspect(connection).get_indexes("products")}
+    if existing.get(index.name, {}).get("unique"):
+        return
+
+    duplicates = connection.execute(text(
+        "SELECT item_code FROM products WHERE item_code IS NOT NULL "
+        "GROUP BY item_code HAVING count(*) > 1 LIMIT 10"
+    )).scalars().all()
+    if duplicates:
+        raise RuntimeError(
+            "Cannot make products.item_code unique; duplicate codes exist: "
+            + ", ".join(duplicates)
+        )
+
+    if index.name in existing:
+        connection.execute(text(f"DROP INDEX {index.name}"))
+    index.create(connection)
+
+
+def ensure_unique_consignment_stock(connection: Connection):
+    """
+    Merge duplicate (shop, product) consignment stock rows so the unique
+    index can be built. Quantities are summed into the oldest row, which
+    keeps its reorder level.
+    """
+    index = next(i for i in ConsignmentStock.__table__.indexes if i.unique)
+    existing = {i["name"] for i in inspect(connection).get_indexes("consignment_stock")}
+    if index.name in existing:
+        return
+
+    connection.execute(text(
+        "UPDATE consignment_stock SET quantity = ("
+        "SELECT sum(c.quantity) FROM consignment_stock c "
+        "WHERE c.shop_id = consignment_stock.shop_id AND c.product_id = consignment_stock.product_id) "
+        "WHERE id IN (SELECT min(id) FROM consignment_stock "
+        "GROUP BY shop_id, product_id HAVING count(*) > 1)"
+    ))
+    connection.execute(text(
+        "DELETE FROM consignment_stock WHERE id NOT IN "
+        "(SELECT min(id) FROM consignment_stock GROUP BY shop_id, product_id)"
+    ))
+    if "ix_consignment_stock_shop_product" in existing:
+        connection.execute(text("DROP INDEX ix_consignment_stock_shop_product"))
+
+
+def ensure_unique_stock_checkpoints(connection: Connection):
+    """
+    Clear checkpoints written before they were unique per (shop, date,
+    product); concurrent builds could have duplicated balances. They are
+    derived data, rebuilt at the end of the migration.
+    """
+    index = next(i for i in StockCheckpoint.__table__.indexes if i.unique)
+    existing = {i["name"] for i in inspect(connection).get_indexes("stock_checkpoints")}
+    if index.name in existing:
+        return
+
+    connection.execute(text("DELETE FROM stock_checkpoints"))
+    if "ix_stock_checkpoints_shop_date" in existing:
+        connection.execute(text("DROP INDEX ix_stock_checkpoints_shop_date"))
+
+
+def ensure_columns(connection: Connection):
+    """Add nullable columns declared on the models that existing tables lack"""
+    inspector = inspect(connection)
+    tables = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in tables:
+            continue
+        present = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in present:
+                column_type = column.type.compile(dialect=connection.dialect)
+                connection.execute(text(
+                    f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+                ))
+
+
+def ensure_indexes(connection: Connection):
+    """Create indexes declared on the models that existing tables lack"""
+    inspector = inspect(connection)
+    tables = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in tables:
+            continue
+        present = {i["name"] for i in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in present:
+                index.create(connection)
+
+
+def migrate():
+    """Bring the database schema up to date and materialise stock checkpoints"""
+    init_db()
+    with engine.begin() as connection:
+        ensure_columns(connection)
+        ensure_unique_item_codes(connection)
+        ensure_unique_consignment_stock(connection)
+        ensure_unique_stock_checkpoints(connection)
+        ensure_indexes(connection)
+        ensure_search_index(connection)
+        ensure_sync_triggers(connection)
+
+    with SessionLocal() as db:
+        rebuild_alerts(db)
+        db.commit()
+        build_checkpoints(db)
+
+
+def main():
+    migrate()
+    print(f"Database schema is up to date ({engine.url.render_as_string(hide_password=True)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Float, Date, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, Float, Date, DateTime, Boolean, Index, Text
 from sqlalchemy.orm import relationship
 from .database import Base
 from datetime import datetime, timezone
@@ -11,8 +11,21 @@ class Product(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     gpm_code = Column(String, index=True)
-    item_code = Column(String, index=True)
+    item_code = Column(String, index=True, unique=True)  # catalog upsert key
     description = Column(String)
+    reorder_level = Column(Integer)  # None falls back to the default level
+
+
+class ProductCode(Base):
+    __tablename__ = "product_codes"
+    __table_args__ = (
+        Index("ux_product_codes_retailer_code", "retailer", "code", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    retailer = Column(String, nullable=False)  # lower case, e.g. "carrefour"
+    code = Column(String, nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id"), index=True)
 
 
 class Shop(Base):
@@ -21,23 +34,28 @@ class Shop(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True)
     type = Column(String)  # "normal" or "consignment"
+    retailer = Column(String)  # e.g. "naivas"; selects the shop's product codes
 
 
 class MasterStock(Base):
     __tablename__ = "master_stock"
 
     id = Column(Integer, primary_key=True)
-    product_id = Column(Integer, ForeignKey("products.id"))
+    product_id = Column(Integer, ForeignKey("products.id"), index=True)
     quantity = Column(Integer, default=0)
 
 
 class ConsignmentStock(Base):
     __tablename__ = "consignment_stock"
+    __table_args__ = (
+        Index("ux_consignment_stock_shop_product", "shop_id", "product_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True)
     shop_id = Column(Integer, ForeignKey("shops.id"))
     product_id = Column(Integer, ForeignKey("products.id"))
     quantity = Column(Integer, default=0)
+    reorder_level = Column(Integer)  # per-shop override of the product level
 
 
 class Invoice(Base):
@@ -48,15 +66,21 @@ class Invoice(Base):
     shop_id = Column(Integer, ForeignKey("shops.id"))
     date = Column(Date)
 
+    shop = relationship("Shop")
+    items = relationship("InvoiceItem", back_populates="invoice", order_by="InvoiceItem.id")
+
 
 class InvoiceItem(Base):
     __tablename__ = "invoice_items"
 
     id = Column(Integer, primary_key=True)
-    invoice_id = Column(Integer, ForeignKey("invoices.id"))
+    invoice_id = Column(Integer, ForeignKey("invoices.id"), index=True)
     product_id = Column(Integer, ForeignKey("products.id"))
     quantity = Column(Integer)
     rate = Column(Float)
+
+    invoice = relationship("Invoice", back_populates="items")
+    product = relationship("Product")
     
 class ConsignmentSale(Base):
     __tablename__ = "consignment_sales"
@@ -68,6 +92,72 @@ class ConsignmentSale(Base):
     date = Column(Date)
 
 
+class StockTransfer(Base):
+    __tablename__ = "stock_transfers"
+
+    id = Column(Integer, primary_key=True)
+    batch_id = Column(String, index=True)  # one per /stock/transfers request
+    from_shop_id = Column(Integer, ForeignKey("shops.id"), index=True)
+    to_shop_id = Column(Integer, index=True)  # 0 for a return to master stock
+    product_id = Column(Integer, ForeignKey("products.id"))
+    quantity = Column(Integer)
+    date = Column(Date, index=True)
+
+
+class StockCheckpoint(Base):
+    __tablename__ = "stock_checkpoints"
+    __table_args__ = (
+        # Unique so concurrent builds cannot write a balance twice
+        Index("ux_stock_checkpoints_shop_date_product", "shop_id", "date", "product_id", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    shop_id = Column(Integer, ForeignKey("shops.id"))
+    product_id = Column(Integer, ForeignKey("products.id"))
+    quantity = Column(Integer)
+    date = Column(Date, index=True)  # balance at the end of this day
+
+
+class LowStockAlert(Base):
+    __tablename__ = "low_stock_alerts"
+    __table_args__ = (
+        Index("ux_low_stock_alerts_shop_product", "shop_id", "product_id", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    shop_id = Column(Integer)  # 0 for master stock
+    product_id = Column(Integer, ForeignKey("products.id"))
+    quantity = Column(Integer)
+    reorder_level = Column(Integer)
+    raised_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+
+class SyncChange(Base):
+    __tablename__ = "sync_changes"
+    __table_args__ = (
+        Index("ux_sync_changes_table_row", "table_name", "row_id", unique=True),
+        {"sqlite_autoincrement": True},  # versions are never reused
+    )
+
+    version = Column(Integer, primary_key=True)  # latest change to the row
+    table_name = Column(String, nullable=False)
+    row_id = Column(Integer, nullable=False)
+    deleted = Column(Boolean, default=False)
+    changed_at = Column(DateTime)
+
+
+class AuditLog(Base):
+    __tablename__ = "audit_log"
+
+    id = Column(Integer, primary_key=True)
+    created_at = Column(DateTime, index=True)
+    kind = Column(String)  # "request", "mutation" or "activity"
+    action = Column(String, index=True)  # e.g. "POST /stock/transfers", "stock.transfer"
+    username = Column(String, index=True)
+    status_code = Column(Integer)
+    detail = Column(Text)  # JSON
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -0,0 +1,46 @@
+"""
+Multi-worker launcher.
+
+Runs the migration step once in the parent process, then starts uvicorn
+with one worker per CPU core (or --workers / WEB_CONCURRENCY). State that
+must agree across workers (login lockouts, caches, job status) lives in
+the shared state backend configured by INVENTORY_STATE_URL.
+
+    python -m app.serve --host 0.0.0.0 --port 8000
+
+The migration also builds stock checkpoints, but nothing refreshes them
+while the server runs. Schedule the checkpoint job daily (cron or a
+systemd timer, like the snapshot job), or ``/stock/as-of`` replays one
+more day of history with every day that passes:
+
+    python -m app.services.stock_history
+"""
+import argparse
+import os
+
+import uvicorn
+
+from app.migrate import migrate
+
+
+def default_workers() -> int:
+    """Worker count from WEB_CONCURRENCY, else one per CPU core"""
+    configured = os.getenv("WEB_CONCURRENCY")
+    if configured:
+        return max(1, int(configured))
+    return os.cpu_count() or 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the inventory API with several workers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=default_workers())
+    args = parser.parse_args(argv)
+
+    migrate()
+    uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Allocation of master stock to consignment shops.
+
+Each consignment (shop, product) needs enough stock to reach the target
+days of cover at its forecast sell-through (``analytics.stock_cover``).
+Master stock counts every unit we own, including units already out on
+consignment, so what can be dispatched is master stock less the
+consignment stock at every shop. That is shared out per product:
+
+* when master stock covers every shop's need, each shop gets its need;
+  these products are settled in a few vector operations;
+* when it does not, the shortfall is shared by a greedy heap per product
+  that always tops up the shop with the fewest days of cover, lifting it
+  to the next shop's level (or by an even share of what is left, if that
+  is more), so scarce stock goes where it runs out first and every shop
+  with the same cover ends up with about the same days.
+
+The result converts to draft invoices, one per shop, in the layout the
+Excel path of ``/upload-invoice`` reads (Shop, InvoiceNo, ItemCode, Qty,
+Rate), so an approved draft is dispatched by uploading it unchanged.
+"""
+import heapq
+import io
+import math
+import zipfile
+from datetime import date
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models import Product, Shop, MasterStock, ConsignmentStock, Invoice, InvoiceItem
+from app.services.analytics import LOOKBACK_DAYS, TARGET_COVER_DAYS, stock_cover
+
+
+DRAFT_COLUMNS = ["Shop", "InvoiceNo", "ItemCode", "Qty", "Rate"]
+
+
+def _share(stock: np.ndarray, forecast: np.ndarray, need: np.ndarray, available: int) -> np.ndarray:
+    """
+    Split ``available`` units between shops needing more than that.
+
+    Heap entries are (days of cover, shop index); a popped shop is topped
+    up to the next shop's cover and pushed back until its need is met or
+    the units run out.
+    """
+    # Plain lists: scalar access to NumPy arrays dominates the loop otherwise
+    stock = stock.tolist()
+    forecast = np.maximum(forecast, 1e-9).tolist()  # a shop owed stock may have no sales yet
+    need = need.tolist()
+    allocated = [0] * len(need)
+    heap = [(stock[i] / forecast[i], i) for i in range(len(need)) if need[i] > 0]
+    heapq.heapify(heap)
+
+    while heap and available > 0:
+        cover, i = heapq.heappop(heap)
+        next_cover = heap[0][0] if heap else math.inf
+        step = max(
+            math.ceil((next_cover - cover) * forecast[i]) if heap else available,
+            available // (len(heap) + 1),
+            1,
+        )
+        step = min(step, need[i] - allocated[i], available)
+        allocated[i] += step
+        available -= step
+        if allocated[i] < need[i]:
+            heapq.heappush(heap, ((stock[i] + allocated[i]) / forecast[i], i))
+    return np.array(allocated, dtype=np.int64)
+
+
+def plan_allocation(
+    db: Session,
+    shop_ids: Optional[list[int]] = None,
+    target_days: int = TARGET_COVER_DAYS,
+    lookback_days: int = LOOKBACK_DAYS
+) -> pd.DataFrame:
+    """
+    Proposed dispatch of master stock per consignment (shop, product).
+
+    Args:
+        db: Database session
+        shop_ids: Only allocate to these consignment shops
+        target_days: Days of cover each shop should reach
+        lookback_days: Sales history window for the forecast
+
+    Returns:
+        DataFrame with shop_id, product_id, stock, forecast_daily, need
+        and qty (units to send), only rows with qty > 0
+    """
+    columns = ["shop_id", "product_id", "stock", "forecast_daily", "need", "qty"]
+    cover = stock_cover(db, shop_ids, target_days, lookback_days)
+    cover = cover[cover["suggested_qty"] > 0]
+    if cover.empty:
+        return pd.DataFrame(columns=columns)
+
+    master = pd.DataFrame(
+        db.query(MasterStock.product_id, func.sum(MasterStock.quantity))
+        .group_by(MasterStock.product_id).all(),
+        columns=["product_id", "available"],
+    )
+    consigned = pd.DataFrame(
+        db.query(ConsignmentStock.product_id, func.sum(ConsignmentStock.quantity))
+        .group_by(ConsignmentStock.product_id).all(),
+        columns=["product_id", "consigned"],
+    )
+    master = master.merge(consigned, on="product_id", how="left")
+    master["available"] = (master["available"] - master["consigned"].fillna(0)).clip(lower=0).astype(np.int64)
+    master = master.drop(columns="consigned")
+    plan = cover.merge(master, on="product_id", how="inner")
+    plan = plan[plan["available"] > 0].sort_values(["product_id", "shop_id"], ignore_index=True)
+    if plan.empty:
+        return pd.DataFrame(columns=columns)
+
+    need = plan["suggested_qty"].to_numpy(np.int64)
+    product_ids = plan["product_id"].to_numpy(np.int64)
+    starts = np.flatnonzero(np.r_[True, product_ids[1:] != product_ids[:-1]])
+    ends = np.r_[starts[1:], len(plan)]
+    available = plan["available"].to_numpy(np.int64)[starts]
+    total_need = np.add.reduceat(need, starts)
+
+    # Enough master stock: every shop gets its need
+    qty = need.copy()
+    stock = plan["stock"].to_numpy(np.float64)
+    forecast = plan["forecast_daily"].to_numpy(np.float64)
+    for start, end, units in zip(starts[total_need > available], ends[total_need > available],
+                                 available[total_need > available]):
+        qty[start:end] = _share(stock[start:end], forecast[start:end], need[start:end], int(units))
+
+    plan["need"] = need
+    plan["qty"] = qty
+    return plan.loc[plan["qty"] > 0, columns].reset_index(drop=True)
+
+
+def _latest_rates(db: Session, product_ids: list[int]) -> tuple[dict, dict]:
+    """Last invoiced rate per (shop, product) and per product"""
+    latest = (
+        select(func.max(InvoiceItem.id))
+        .join(Invoice, Invoice.id == InvoiceItem.invoice_id)
+        .group_by(Invoice.shop_id, InvoiceItem.product_id)
+    )
+    query = (
+        db.query(InvoiceItem.id, Invoice.shop_id, InvoiceItem.product_id, InvoiceItem.rate)
+        .join(Invoice, Invoice.id == InvoiceItem.invoice_id)
+        .filter(InvoiceItem.id.in_(latest))
+        .order_by(InvoiceItem.id)
+    )
+    if len(product_ids) <= 1000:
+        query = query.filter(InvoiceItem.product_id.in_(product_ids))
+
+    by_shop, by_product = {}, {}
+    for _, shop_id, product_id, rate in query:
+        by_shop[(shop_id, product_id)] = rate
+        by_product[product_id] = rate
+    return by_shop, by_product
+
+
+def draft_invoices(db: Session, plan: pd.DataFrame, on: Optional[date] = None) -> dict[str, pd.DataFrame]:
+    """
+    Turn an allocation into one draft invoice per shop.
+
+    Rates are the shop's last invoiced rate for the product, else the last
+    rate for the product anywhere, else 0.
+
+    Returns:
+        Shop name -> DataFrame with ``DRAFT_COLUMNS``
+    """
+    on = on or date.today()
+    product_ids = plan["product_id"].unique().tolist()
+    product_query = db.query(Product.id, Product.item_code)
+    if len(product_ids) <= 1000:
+        product_query = product_query.filter(Product.id.in_(product_ids))
+    item_codes = dict(product_query.all())
+    shop_names = dict(db.query(Shop.id, Shop.name).filter(Shop.id.in_(plan["shop_id"].unique().tolist())))
+    by_shop, by_product = _latest_rates(db, product_ids)
+
+    drafts = {}
+    for shop_id, lines in plan.groupby("shop_id", sort=True):
+        shop_id = int(shop_id)
+        drafts[shop_names[shop_id]] = pd.DataFrame({
+            "Shop": shop_names[shop_id],
+            "InvoiceNo": f"DRAFT-{on:%Y%m%d}-{shop_id}",
+            "ItemCode": [item_codes.get(int(p)) for p in lines["product_id"]],
+            "Qty": lines["qty"].astype(np.int64).to_numpy(),
+            "Rate": [
+                by_shop.get((shop_id, int(p)), by_product.get(int(p), 0.0))
+                for p in lines["product_id"]
+            ],
+        }, columns=DRAFT_COLUMNS)
+    return drafts
+
+
+def drafts_archive(drafts: dict[str, pd.DataFrame]) -> io.BytesIO:
+    """Zip of one Excel workbook per draft invoice"""
+    stream = io.BytesIO()
+    with zipfile.ZipFile(stream, "w", zipfile.ZIP_DEFLATED) as archive:
+        for shop_name, frame in drafts.items():
+            workbook = io.BytesIO()
+            frame.to_excel(workbook, index=False)
+            invoice_no = frame["InvoiceNo"].iloc[0]
+            safe_name = "".join(c if c.isalnum() or c in " -_" else "_" for c in shop_name)
+            archive.writestr(f"{invoice_no} {safe_name}.xlsx", workbook.getvalue())
+    stream.seek(0)
+    return stream
@@ -0,0 +1,272 @@
+"""
+Consignment sell-through analytics for replenishment planning.
+
+Sales history for the lookback window is loaded into NumPy arrays and
+reduced per (shop, product) with weighted ``bincount``s, so the work is a
+handful of vector passes regardless of how many pairs there are:
+
+* rolling velocities: units per day over the last 7 and 28 days;
+* forecast: simple exponential smoothing of the daily series. The smoothed
+  level after the last day is a weighted sum of past days with weight
+  ``alpha * (1 - alpha) ** age``, plus the initial level (the window mean)
+  decayed over the window, so no dense day-by-pair matrix is built;
+* days of cover: current consignment stock divided by the forecast.
+
+The velocity/forecast frame depends only on sales, so it is cached per
+worker and reused until a new sale is recorded (or the day rolls over).
+The raw sales behind it are cached too and extended with just the rows
+added since, so a new sale costs a small query plus the vector passes
+rather than reloading history; rows that age out of the window are
+dropped as it moves forward. Stock is read fresh on every call.
+"""
+import math
+import threading
+from datetime import date, timedelta
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+from app.models import Product, Shop, ConsignmentStock, ConsignmentSale
+
+
+LOOKBACK_DAYS = 90
+SMOOTHING_ALPHA = 0.2
+TARGET_COVER_DAYS = 14
+
+# Raw sales for the widest window (in days) loaded so far, extended with
+# new sales by id, and the velocity frame computed from it
+_sales = {"since": None, "days": 0, "max_id": None, "count": 0, "frame": None}
+_velocity: dict[tuple, pd.DataFrame] = {}
+_cache_lock = threading.Lock()
+
+
+def _sales_watermark(db: Session) -> tuple:
+    """(max id, row count) of consignment sales; changes whenever sales do"""
+    return tuple(db.query(func.max(ConsignmentSale.id), func.count(ConsignmentSale.id)).one())
+
+
+def load_sales(db: Session, since: date, after_id: int = 0) -> pd.DataFrame:
+    """Sales dated on or after ``since`` with id above ``after_id``"""
+    rows = db.execute(
+        text(
+            "SELECT id, shop_id, product_id, date, quantity FROM consignment_sales "
+            "WHERE date >= :since AND id > :after_id"
+        ),
+        {"since": since, "after_id": after_id},
+    ).all()
+    df = pd.DataFrame(rows, columns=["id", "shop_id", "product_id", "date", "quantity"])
+    df["date"] = pd.to_datetime(df["date"])
+    return df
+
+
+def compute_velocity(
+    sales: pd.DataFrame,
+    today: date,
+    lookback_days: int = LOOKBACK_DAYS,
+    alpha: float = SMOOTHING_ALPHA
+) -> pd.DataFrame:
+    """
+    Reduce sales to per-(shop, product) velocities and forecasts.
+
+    Args:
+        sales: Output of ``load_sales``; rows outside the window are ignored
+        today: Last day of the window (age 0)
+        lookback_days: Window length in days
+        alpha: Exponential smoothing factor
+
+    Returns:
+        DataFrame with shop_id, product_id, velocity_7d, velocity_28d and
+        forecast_daily (units per day); velocity_28d covers only the
+        window when it is shorter than 28 days
+    """
+    columns = ["shop_id", "product_id", "velocity_7d", "velocity_28d", "forecast_daily"]
+    days = sales["date"].to_numpy().astype("datetime64[D]")
+    age = (np.datetime64(today, "D") - days).astype(np.int64)
+    in_window = (age >= 0) & (age < lookback_days)
+    if not in_window.any():
+        return pd.DataFrame(columns=columns)
+
+    age = age[in_window]
+    shop_ids = sales["shop_id"].to_numpy(np.int64)[in_window]
+    product_ids = sales["product_id"].to_numpy(np.int64)[in_window]
+    quantity = sales["quantity"].to_numpy(np.float64)[in_window]
+
+    # One integer key per (shop, product) pair
+    stride = int(product_ids.max()) + 1
+    pairs, index = np.unique(shop_ids * stride + product_ids, return_inverse=True)
+    n = len(pairs)
+
+    def per_pair(weights: np.ndarray) -> np.ndarray:
+        return np.bincount(index, weights=weights, minlength=n)
+
+    velocity_7d = per_pair(quantity * (age < 7)) / 7
+    velocity_28d = per_pair(quantity * (age < 28)) / min(28, lookback_days)
+
+    # Smoothed level = sum(alpha (1-alpha)^age x) + (1-alpha)^window * initial level
+    decay = 1.0 - alpha
+    window_mean = per_pair(quantity) / lookback_days
+    forecast = per_pair(quantity * alpha * decay ** age) + decay ** lookback_days * window_mean
+
+    return pd.DataFrame({
+        "shop_id": pairs // stride,
+        "product_id": pairs % stride,
+        "velocity_7d": velocity_7d,
+        "velocity_28d": velocity_28d,
+        "forecast_daily": forecast,
+    })
+
+
+def _recent_sales(db: Session, today: date, lookback_days: int, watermark: tuple) -> pd.DataFrame:
+    """
+    Sales of the last ``lookback_days`` days up to ``today`` (or of the
+    widest window cached), loading only rows added after the cached ones
+    and dropping those the window has moved past.
+
+    A full reload happens when the window widens or rows were removed or
+    deleted (the row count grew by less than the rows fetched).
+    """
+    max_id, count = watermark
+    cached = _sales["frame"]
+    if cached is not None and lookback_days <= _sales["days"]:
+        since = today - timedelta(days=_sales["days"] - 1)
+        if since > _sales["since"]:
+            cached = cached[cached["date"] >= pd.Timestamp(since)].reset_index(drop=True)
+            _sales.update(since=since, frame=cached)
+        if max_id == _sales["max_id"] and count == _sales["count"]:
+            return cached
+        new = load_sales(db, since, _sales["max_id"] or 0)
+        # Fewer added rows than fetched means something was deleted too
+        if count - _sales["count"] >= len(new):
+            frame = pd.concat([cached, new], ignore_index=True) if not new.empty else cached
+            _sales.update(max_id=max_id, count=count, frame=frame)
+            return frame
+
+    days = max(lookback_days, _sales["days"]) if cached is not None else lookback_days
+    since = today - timedelta(days=days - 1)
+    frame = load_sales(db, since)
+    _sales.update(since=since, days=days, max_id=max_id, count=count, frame=frame)
+    return frame
+
+
+def sales_velocity(
+    db: Session,
+    lookback_days: int = LOOKBACK_DAYS,
+    alpha: float = SMOOTHING_ALPHA
+) -> pd.DataFrame:
+    """``compute_velocity`` over recent sales, cached until new sales arrive"""
+    today = date.today()
+    watermark = _sales_watermark(db)
+    key = (watermark, today, lookback_days, alpha)
+    with _cache_lock:
+        velocity = _velocity.get(key)
+        if velocity is None:
+            sales = _recent_sales(db, today, lookback_days, watermark)
+            velocity = compute_velocity(sales, today, lookback_days, alpha)
+            _velocity.clear()
+            _velocity[key] = velocity
+    return velocity
+
+
+def stock_cover(
+    db: Session,
+    shop_ids: Optional[list[int]] = None,
+    target_days: int = TARGET_COVER_DAYS,
+    lookback_days: int = LOOKBACK_DAYS
+) -> pd.DataFrame:
+    """
+    Stock, velocity, forecast and top-up per consignment (shop, product).
+
+    Pairs with stock but no recent sales are included with zero velocity;
+    pairs with sales but no stock row count as empty.
+
+    Args:
+        db: Database session
+        shop_ids: Only these consignment shops
+        target_days: Days of cover a top-up should reach
+        lookback_days: Sales history window
+
+    Returns:
+        DataFrame with shop_id, product_id, stock, the ``compute_velocity``
+        columns, days_of_cover (inf when nothing sells) and suggested_qty
+    """
+    velocity = sales_velocity(db, lookback_days)
+
+    consignment_shops = [shop for (shop,) in db.query(Shop.id).filter(Shop.type == "consignment")]
+    if shop_ids is not None:
+        consignment_shops = list(set(consignment_shops) & set(shop_ids))
+    velocity = velocity[velocity["shop_id"].isin(consignment_shops)]
+
+    stock_query = (
+        db.query(ConsignmentStock.shop_id, ConsignmentStock.product_id, ConsignmentStock.quantity)
+        .filter(ConsignmentStock.shop_id.in_(consignment_shops))
+    )
+    stock = pd.DataFrame(stock_query.all(), columns=["shop_id", "product_id", "stock"])
+    stock = stock.groupby(["shop_id", "product_id"], as_index=False)["stock"].sum()
+
+    plan = stock.merge(velocity, on=["shop_id", "product_id"], how="outer")
+    plan = plan.fillna({"stock": 0, "velocity_7d": 0.0, "velocity_28d": 0.0, "forecast_daily": 0.0})
+    plan = plan.astype({"shop_id": np.int64, "product_id": np.int64, "stock": np.int64})
+
+    forecast = plan["forecast_daily"].to_numpy(np.float64)
+    on_hand = plan["stock"].to_numpy(np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        plan["days_of_cover"] = np.where(forecast > 0, on_hand / forecast, np.inf)
+    plan["suggested_qty"] = np.maximum(0, np.ceil(forecast * target_days - on_hand)).astype(np.int64)
+    return plan
+
+
+def replenishment_plan(
+    db: Session,
+    shop_id: Optional[int] = None,
+    target_days: int = TARGET_COVER_DAYS,
+    lookback_days: int = LOOKBACK_DAYS,
+    limit: Optional[int] = None
+) -> list[dict]:
+    """
+    Days of cover and suggested top-up per consignment (shop, product).
+
+    Args:
+        db: Database session
+        shop_id: Only this consignment shop
+        target_days: Days of cover a top-up should reach
+        lookback_days: Sales history window
+        limit: Return at most this many rows, lowest cover first
+
+    Returns:
+        List of dicts sorted by days of cover (None when nothing sells)
+    """
+    plan = stock_cover(db, [shop_id] if shop_id is not None else None, target_days, lookback_days)
+    if plan.empty:
+        return []
+
+    plan = plan.sort_values(["days_of_cover", "forecast_daily"], ascending=[True, False])
+    if limit is not None:
+        plan = plan.head(limit)
+
+    shop_names = dict(db.query(Shop.id, Shop.name))
+    product_query = db.query(Product.id, Product.item_code, Product.description)
+    product_ids = plan["product_id"].unique().tolist()
+    if len(product_ids) <= 1000:
+        product_query = product_query.filter(Product.id.in_(product_ids))
+    products = {p.id: p for p in product_query}
+
+    rows = []
+    for r in plan.itertuples(index=False):
+        product = products.get(int(r.product_id))
+        rows.append({
+            "shop_id": int(r.shop_id),
+            "shop_name": shop_names.get(int(r.shop_id)),
+            "product_id": int(r.product_id),
+            "item_code": product.item_code if product else None,
+            "description": product.description if product else None,
+            "stock": int(r.stock),
+            "velocity_7d": round(float(r.velocity_7d), 3),
+            "velocity_28d": round(float(r.velocity_28d), 3),
+            "forecast_daily": round(float(r.forecast_daily), 3),
+            "days_of_cover": None if math.isinf(r.days_of_cover) else round(float(r.days_of_cover), 1),
+            "suggested_qty": int(r.suggested_qty),
+        })
+    return rows
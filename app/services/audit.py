@@ -0,0 +1,213 @@
+"""
+Buffered audit and user activity log.
+
+``record`` only appends an entry to a bounded in-memory queue, so a
+request pays microseconds for logging rather than a database commit. A
+daemon thread drains the queue into ``audit_log`` with one batched insert
+per ``BATCH_SIZE`` entries, or sooner once the oldest pending entry has
+waited ``FLUSH_INTERVAL`` seconds.
+
+When the queue is full (the database is stalled or far behind) new
+entries are dropped rather than blocking the request; so are batches
+whose insert fails. Both are counted in ``audit_entries_dropped_total``
+by reason. At interpreter exit the thread finishes its batch and the
+rest of the queue is flushed.
+
+Entry kinds:
+
+    request     one per mutating HTTP request (or every request with
+                INVENTORY_AUDIT_ALL_REQUESTS=1): route, user, status
+    mutation    a stock-changing action with its details
+    activity    client-reported activity such as page views
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.database import engine
+from app.models import AuditLog
+from app.services import metrics
+
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = int(os.getenv("INVENTORY_AUDIT_BATCH_SIZE", "500"))
+FLUSH_INTERVAL = float(os.getenv("INVENTORY_AUDIT_FLUSH_SECONDS", "1.0"))
+QUEUE_SIZE = int(os.getenv("INVENTORY_AUDIT_QUEUE_SIZE", "10000"))
+LOG_ALL_REQUESTS = os.getenv("INVENTORY_AUDIT_ALL_REQUESTS", "0") == "1"
+
+MUTATING_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+_STOP = object()  # queued by close() to end the writer thread
+
+
+class AuditWriter:
+    """Bounded queue of audit entries drained by a background thread"""
+
+    def __init__(
+        self,
+        batch_size: int = BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL,
+        queue_size: int = QUEUE_SIZE
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def record(
+        self,
+        kind: str,
+        action: str,
+        username: Optional[str] = None,
+        status_code: Optional[int] = None,
+        detail: Optional[dict] = None
+    ):
+        """Queue an entry; never blocks and never raises"""
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait({
+                "created_at": datetime.now(timezone.utc),
+                "kind": kind,
+                "action": action,
+                "username": username,
+                "status_code": status_code,
+                "detail": json.dumps(detail, default=str) if detail is not None else None,
+            })
+        except queue.Full:
+            metrics.AUDIT_DROPPED.inc(("queue_full",))
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        while True:
+            entry = self._queue.get()
+            if entry is _STOP:
+                return
+            batch = [entry]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    entry = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if entry is _STOP:
+                    self._write(batch)
+                    return
+                batch.append(entry)
+            self._write(batch)
+
+    def _write(self, batch: list[dict]):
+        with self._write_lock:
+            try:
+                with engine.begin() as connection:
+                    connection.execute(insert(AuditLog), batch)
+            except Exception:
+                metrics.AUDIT_DROPPED.inc(("write_failed",), amount=len(batch))
+                logger.exception("Dropped %d audit entries", len(batch))
+                return
+        metrics.AUDIT_WRITTEN.inc(amount=len(batch))
+
+    def flush(self):
+        """Write everything queued so far from the calling thread"""
+        batch = []
+        while True:
+            try:
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is _STOP:
+                continue
+            batch.append(entry)
+            if len(batch) == self.batch_size:
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+
+    def close(self, timeout: float = 5.0):
+        """Stop the writer thread after its current batch, then flush the rest"""
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                pass
+            thread.join(timeout)
+        self.flush()
+
+
+writer = AuditWriter()
+
+
+def record(kind: str, action: str, username: Optional[str] = None,
+           status_code: Optional[int] = None, detail: Optional[dict] = None):
+    """Queue an audit entry on the process-wide writer"""
+    writer.record(kind, action, username, status_code, detail)
+
+
+def should_log_request(method: str) -> bool:
+    return LOG_ALL_REQUESTS or method in MUTATING_METHODS
+
+
+def list_entries(
+    db: Session,
+    kind: Optional[str] = None,
+    username: Optional[str] = None,
+    action: Optional[str] = None,
+    before_id: Optional[int] = None,
+    limit: int = 100
+) -> list[dict]:
+    """
+    Audit entries, newest first.
+
+    Args:
+        db: Database session
+        kind: Only this kind of entry
+        username: Only entries by this user
+        action: Only this action
+        before_id: Page after the last id of the previous page
+        limit: Page size
+    """
+    query = db.query(AuditLog)
+    if kind:
+        query = query.filter(AuditLog.kind == kind)
+    if username:
+        query = query.filter(AuditLog.username == username)
+    if action:
+        query = query.filter(AuditLog.action == action)
+    if before_id is not None:
+        query = query.filter(AuditLog.id < before_id)
+
+    return [
+        {
+            "id": entry.id,
+            "created_at": entry.created_at.isoformat() if entry.created_at else None,
+            "kind": entry.kind,
+            "action": entry.action,
+            "username": entry.username,
+            "status_code": entry.status_code,
+            "detail": json.loads(entry.detail) if entry.detail else None,
+        }
+        for entry in query.order_by(AuditLog.id.desc()).limit(limit)
+    ]
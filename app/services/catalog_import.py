@@ -0,0 +1,215 @@
+"""
+Bulk product catalog import.
+
+Reads a supplier catalog (CSV, Excel or JSON) and upserts products keyed
+on ``item_code`` in chunks. Each chunk costs one lookup of the codes that
+already exist, one ``INSERT ... ON CONFLICT (item_code) DO UPDATE``
+executemany for new and changed rows, and one ``INSERT ... SELECT`` that
+creates the missing ``MasterStock`` rows, all inside a single transaction.
+
+Blank fields never overwrite stored values, so a code list without
+descriptions can be imported over a full catalog.
+"""
+import csv
+import io
+import json
+import re
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+
+from app.models import Product
+
+
+CHUNK_SIZE = 1000
+
+# Normalised header -> product field
+_COLUMNS = {
+    "itemcode": "item_code",
+    "item": "item_code",
+    "code": "item_code",
+    "gpmcode": "gpm_code",
+    "gpm": "gpm_code",
+    "barcode": "gpm_code",
+    "description": "description",
+    "desc": "description",
+    "name": "description",
+}
+
+
+def _normalise_header(name) -> str:
+    return re.sub(r"[^a-z0-9]", "", str(name).lower())
+
+
+def _clean(value) -> Optional[str]:
+    """Strip a cell to a string, treating blanks and NaN as missing"""
+    if value is None or value != value:  # NaN from pandas
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)  # Excel hands back numeric codes as floats
+    value = str(value).strip()
+    return value or None
+
+
+def _map_rows(records: Iterable[dict]) -> Iterator[dict]:
+    """Rename catalog columns to product fields and drop the rest"""
+    mappings = {}  # JSON records need not share keys, so map per key set
+    for record in records:
+        keys = tuple(record)
+        mapping = mappings.get(keys)
+        if mapping is None:
+            mapping = mappings[keys] = {}
+            for key in keys:
+                field = _COLUMNS.get(_normalise_header(key))
+                if field and field not in mapping.values():
+                    mapping[key] = field
+        yield {field: _clean(record.get(key)) for key, field in mapping.items()}
+
+
+def _csv_records(stream: BinaryIO) -> Iterator[dict]:
+    text_stream = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        yield from csv.DictReader(text_stream)
+    finally:
+        text_stream.detach()  # the caller owns the stream
+
+
+def read_catalog(stream: BinaryIO, filename: str) -> Iterator[dict]:
+    """
+    Parse an uploaded catalog into product dicts.
+
+    Args:
+        stream: Binary file object at the start of the file. CSV rows are
+            read from it as the result is consumed, so keep it open until
+            the import is done
+        filename: Original filename; the extension selects the format
+
+    Returns:
+        Iterator of dicts with item_code, gpm_code and description (any
+        may be None)
+    """
+    name = filename.lower()
+    if name.endswith(".json"):
+        data = json.load(stream)
+        if isinstance(data, dict):
+            data = data.get("products", [])
+        return _map_rows(data)
+
+    if name.endswith((".xlsx", ".xls")):
+        import pandas as pd
+
+        df = pd.read_excel(stream, dtype=object)
+        return _map_rows(df.to_dict("records"))
+
+    if name.endswith((".csv", ".txt")):
+        return _map_rows(_csv_records(stream))
+
+    raise ValueError(f"Unsupported catalog format: {filename}")
+
+
+def _chunks(rows: Iterable[dict], size: int) -> Iterator[list[dict]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _upsert_statement(dialect: str):
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    stmt = insert(Product.__table__)
+    return stmt.on_conflict_do_update(
+        index_elements=[Product.item_code],
+        set_={
+            "gpm_code": stmt.excluded.gpm_code,
+            "description": stmt.excluded.description,
+        },
+    )
+
+
+def import_catalog(db: Session, rows: Iterable[dict], chunk_size: int = CHUNK_SIZE) -> dict:
+    """
+    Upsert catalog rows by item code and create missing master stock.
+
+    Rows without an item code, repeats of a code already seen in the same
+    import and rows identical to the stored product are counted as skipped.
+
+    Args:
+        db: Database session; committed once at the end
+        rows: Dicts with item_code, gpm_code and description
+        chunk_size: Rows per statement batch
+
+    Returns:
+        Dict with inserted, updated and skipped counts, and the ids of
+        the products given an empty master stock row (``stocked_ids``)
+    """
+    inserted = updated = skipped = 0
+    stocked_ids = []
+    seen = set()
+    dialect = db.bind.dialect.name
+
+    try:
+        for chunk in _chunks(rows, chunk_size):
+            incoming = {}
+            for row in chunk:
+                code = row.get("item_code")
+                if not code or code in seen:
+                    skipped += 1
+                    continue
+                seen.add(code)
+                incoming[code] = row
+
+            if not incoming:
+                continue
+
+            existing = {
+                p.item_code: p
+                for p in db.query(Product.item_code, Product.gpm_code, Product.description)
+                .filter(Product.item_code.in_(incoming))
+            }
+
+            changes = []
+            for code, row in incoming.items():
+                current = existing.get(code)
+                merged = {
+                    "item_code": code,
+                    "gpm_code": row.get("gpm_code") or (current.gpm_code if current else None),
+                    "description": row.get("description") or (current.description if current else None),
+                }
+                if current is None:
+                    inserted += 1
+                elif (merged["gpm_code"], merged["description"]) != (current.gpm_code, current.description):
+                    updated += 1
+                else:
+                    skipped += 1
+                    continue
+                changes.append(merged)
+
+            if changes:
+                db.execute(_upsert_statement(dialect), changes)
+
+            stocked_ids += db.execute(
+                text(
+                    "INSERT INTO master_stock (product_id, quantity) "
+                    "SELECT p.id, 0 FROM products p "
+                    "WHERE p.item_code IN :codes AND NOT EXISTS "
+                    "(SELECT 1 FROM master_stock m WHERE m.product_id = p.id) "
+                    "RETURNING product_id"
+                ).bindparams(bindparam("codes", expanding=True)),
+                {"codes": list(incoming)},
+            ).scalars().all()
+
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return {"inserted": inserted, "updated": updated, "skipped": skipped, "stocked_ids": stocked_ids}
@@ -0,0 +1,160 @@
+"""
+Dashboard summary.
+
+Everything the dashboard shows comes from one call instead of full
+product, shop, invoice and movement lists, and one SELECT whose columns
+are scalar subqueries:
+
+* counts and stock totals;
+* the latest invoices with their totals and the latest sales;
+* low-stock alert counts and the most urgent master stock alerts, read
+  from the materialised ``low_stock_alerts`` table.
+
+The three lists come back as JSON arrays built by the database
+(``json_group_array`` on SQLite, ``json_agg`` on PostgreSQL).
+
+Stock value prices master stock (which includes consignment units) at the
+latest invoiced rate per product, as the daily snapshots do.
+
+The summary is cached in shared state for ``SUMMARY_TTL`` seconds, so
+every worker serves the same copy and a burst of dashboard loads costs
+one build.
+"""
+import os
+from datetime import datetime, timezone
+
+from sqlalchemy import JSON, func, literal, select
+from sqlalchemy.orm import Session
+
+from app.models import (
+    Product, Shop, MasterStock, ConsignmentStock,
+    Invoice, InvoiceItem, ConsignmentSale, LowStockAlert,
+)
+from app.services import reorder
+from app.services.shared_state import get_json, set_json
+
+
+SUMMARY_TTL = int(os.getenv("INVENTORY_DASHBOARD_TTL", "15"))
+CACHE_KEY = "dashboard:summary"
+RECENT_ROWS = 10
+
+
+def _count(model, *criteria):
+    return select(func.count()).select_from(model).where(*criteria).scalar_subquery()
+
+
+def _total(column):
+    return select(func.coalesce(func.sum(column), 0)).scalar_subquery()
+
+
+def _json_rows(dialect: str, statement):
+    """
+    Scalar subquery folding a statement's rows into a JSON array of objects
+    keyed by column label. Rows keep the statement's order in practice;
+    callers re-sort, since neither database promises it.
+    """
+    rows = statement.subquery()
+    pairs = [part for column in rows.c for part in (literal(column.key), column)]
+    if dialect == "postgresql":
+        array = func.json_agg(func.json_build_object(*pairs), type_=JSON)
+    else:
+        array = func.json_group_array(func.json_object(*pairs), type_=JSON)
+    return select(array).select_from(rows).scalar_subquery()
+
+
+def _stock_value():
+    latest_item = (
+        select(InvoiceItem.product_id, func.max(InvoiceItem.id).label("id"))
+        .group_by(InvoiceItem.product_id)
+        .subquery()
+    )
+    return (
+        select(func.coalesce(func.sum(MasterStock.quantity * InvoiceItem.rate), 0.0))
+        .join(latest_item, latest_item.c.product_id == MasterStock.product_id)
+        .join(InvoiceItem, InvoiceItem.id == latest_item.c.id)
+        .scalar_subquery()
+    )
+
+
+def _recent_invoices(limit: int):
+    latest = select(Invoice.id).order_by(Invoice.id.desc()).limit(limit)
+    return (
+        select(
+            Invoice.id, Invoice.invoice_no, Invoice.date,
+            Shop.name.label("shop_name"), Shop.type.label("shop_type"),
+            func.count(InvoiceItem.id).label("items_count"),
+            func.coalesce(func.sum(InvoiceItem.quantity * InvoiceItem.rate), 0.0).label("total_amount"),
+        )
+        .outerjoin(Shop, Shop.id == Invoice.shop_id)
+        .outerjoin(InvoiceItem, InvoiceItem.invoice_id == Invoice.id)
+        .where(Invoice.id.in_(latest))
+        .group_by(Invoice.id)
+        .order_by(Invoice.id.desc())
+    )
+
+
+def _recent_sales(limit: int):
+    return (
+        select(
+            ConsignmentSale.id, ConsignmentSale.date, ConsignmentSale.quantity,
+            Shop.name.label("shop_name"), Product.item_code, Product.description,
+        )
+        .outerjoin(Shop, Shop.id == ConsignmentSale.shop_id)
+        .outerjoin(Product, Product.id == ConsignmentSale.product_id)
+        .order_by(ConsignmentSale.id.desc())
+        .limit(limit)
+    )
+
+
+def build_summary(db: Session, recent: int = RECENT_ROWS) -> dict:
+    """Compute the dashboard summary from the database in one statement"""
+    dialect = db.bind.dialect.name
+    row = db.execute(select(
+        _count(Product).label("products"),
+        _count(Shop).label("shops"),
+        _count(Shop, Shop.type == "consignment").label("consignment_shops"),
+        _count(Invoice).label("invoices"),
+        _total(MasterStock.quantity).label("master_units"),
+        _total(ConsignmentStock.quantity).label("consignment_units"),
+        _stock_value().label("stock_value"),
+        _count(LowStockAlert, LowStockAlert.shop_id == reorder.MASTER_SHOP_ID).label("low_stock_master"),
+        _count(LowStockAlert, LowStockAlert.shop_id != reorder.MASTER_SHOP_ID).label("low_stock_consignment"),
+        _json_rows(dialect, _recent_invoices(recent)).label("recent_invoices"),
+        _json_rows(dialect, _recent_sales(recent)).label("recent_sales"),
+        _json_rows(dialect, reorder.alerts_select(reorder.MASTER_SHOP_ID).limit(5)).label("low_stock"),
+    )).one()
+
+    summary = dict(row._mapping)
+    summary["stock_value"] = round(float(summary["stock_value"]), 2)
+    summary["recent_invoices"] = [
+        {
+            "id": invoice["id"],
+            "invoice_no": invoice["invoice_no"],
+            "date": invoice["date"],
+            "shop_name": invoice["shop_name"],
+            "shop_type": invoice["shop_type"],
+            "items_count": invoice["items_count"],
+            "total_amount": round(float(invoice["total_amount"]), 2),
+        }
+        for invoice in sorted(summary["recent_invoices"] or [], key=lambda i: i["id"], reverse=True)
+    ]
+    summary["recent_sales"] = [
+        {**sale, "quantity": -(sale["quantity"] or 0)}
+        for sale in sorted(summary["recent_sales"] or [], key=lambda s: s["id"], reverse=True)
+    ]
+    summary["low_stock"] = sorted(
+        (reorder.alert_dict(alert) for alert in summary["low_stock"] or []),
+        key=lambda a: (a["quantity"] - a["reorder_level"], a["raised_at"] or ""),
+    )
+    return {"generated_at": datetime.now(timezone.utc).isoformat(), **summary}
+
+
+def dashboard_summary(db: Session) -> dict:
+    """The cached summary, rebuilt when it is older than ``SUMMARY_TTL``"""
+    if SUMMARY_TTL <= 0:
+        return build_summary(db)
+    summary = get_json(CACHE_KEY)
+    if summary is None:
+        summary = build_summary(db)
+        set_json(CACHE_KEY, summary, ttl=SUMMARY_TTL)
+    return summary
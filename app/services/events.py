@@ -0,0 +1,134 @@
+"""
+In-process event broadcasting for server-sent events.
+
+Request handlers run in the threadpool and call ``broker.publish`` after
+their transaction commits. Each connected ``/events`` client owns a
+bounded asyncio queue on the event loop; publishing hands the event to
+every queue with ``call_soon_threadsafe`` and never blocks the writer.
+
+A client that stops reading fills its queue. Its pending events are then
+discarded and replaced by a single ``resync`` event telling it to refetch
+the lists it shows, so one slow dashboard cannot hold memory or delay
+stock writes, and never silently misses an update. Drops are counted in
+``events_dropped_total``.
+
+Event types:
+
+    stock       a stock row changed: shop_id (0 for master), product_id, quantity
+    low_stock   a stock row fell to its reorder level
+    restocked   a stock row rose back above its reorder level
+    resync      events were dropped; refetch instead of applying deltas
+
+Events only reach clients connected to the worker that published them;
+with several workers each dashboard sees the writes its worker served.
+"""
+import asyncio
+import json
+import threading
+from typing import Optional
+
+from app.services import metrics
+
+
+QUEUE_SIZE = 256
+KEEPALIVE_SECONDS = 15.0
+
+
+class Subscription:
+    """One client's bounded queue of pending events"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, types: Optional[set[str]], maxsize: int):
+        self.loop = loop
+        self.types = types
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def wants(self, event: dict) -> bool:
+        return self.types is None or event["type"] in self.types
+
+    def offer(self, events: list[dict]):
+        """Enqueue on the event loop, collapsing to a resync when full"""
+        for event in events:
+            if self.queue.full():
+                discarded = 0
+                while not self.queue.empty():
+                    # An earlier resync marker is replaced, not counted as lost
+                    discarded += self.queue.get_nowait()["type"] != "resync"
+                self.dropped += discarded
+                metrics.EVENTS_DROPPED.inc(amount=discarded)
+                self.queue.put_nowait({"type": "resync", "dropped": self.dropped})
+            self.queue.put_nowait(event)
+
+
+class EventBroker:
+    """Fan-out of published events to every subscription"""
+
+    def __init__(self, queue_size: int = QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscriptions: set[Subscription] = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, types: Optional[set[str]] = None) -> Subscription:
+        """Register a client; must be called from the event loop"""
+        subscription = Subscription(asyncio.get_running_loop(), types, self.queue_size)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, events: list[dict]):
+        """Broadcast events from any thread"""
+        if not events:
+            return
+        for event in events:
+            metrics.EVENTS_PUBLISHED.inc((event["type"],))
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            wanted = [event for event in events if subscription.wants(event)]
+            if not wanted:
+                continue
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, wanted)
+            except RuntimeError:
+                # Loop closed under a client that never unsubscribed
+                self.unsubscribe(subscription)
+
+
+broker = EventBroker()
+
+
+def stock_event(shop_id: int, product_id: int, quantity: int) -> dict:
+    """Compact event for a stock row's new quantity (shop_id 0 for master)"""
+    return {"type": "stock", "shop_id": shop_id, "product_id": product_id, "quantity": quantity}
+
+
+def format_sse(event: dict) -> str:
+    """Encode an event as a server-sent events message"""
+    data = {key: value for key, value in event.items() if key != "type"}
+    return f"event: {event['type']}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def stream(subscription: Subscription, is_disconnected, keepalive: float = KEEPALIVE_SECONDS):
+    """
+    Yield SSE messages for a subscription until the client disconnects.
+
+    Args:
+        subscription: Subscription returned by ``broker.subscribe``
+        is_disconnected: Coroutine function, normally ``request.is_disconnected``
+        keepalive: Seconds of silence before sending a comment line
+    """
+    try:
+        yield ": connected\n\n"
+        while not await is_disconnected():
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield format_sse(event)
+    finally:
+        broker.unsubscribe(subscription)
@@ -0,0 +1,243 @@
+"""
+In-process performance metrics exposed in Prometheus text format.
+
+Counters and histograms keep their series in plain dicts of preallocated
+lists and are updated without locks: request middleware runs on the event
+loop, and the rare lost increment from two threadpool workers updating the
+same series at once is an acceptable trade for zero contention. Per-request
+database statistics are collected through a context variable holding a
+two-element list, so a request allocates nothing beyond that.
+
+Each worker process keeps its own metrics; scrape every worker (or run a
+single worker) when deploying with several.
+
+Prometheus scrapes without credentials, so ``/metrics`` answers only
+clients in INVENTORY_METRICS_ALLOW (comma-separated addresses or
+networks, default loopback). Behind a reverse proxy the client is the
+proxy, so block the path there or list only the scraper's network.
+"""
+import ipaddress
+import os
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+def _networks(spec: str) -> list:
+    return [ipaddress.ip_network(part.strip(), strict=False) for part in spec.split(",") if part.strip()]
+
+
+SCRAPE_NETWORKS = _networks(os.getenv("INVENTORY_METRICS_ALLOW", "127.0.0.1,::1"))
+
+
+# ==================== Metric Types ====================
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonically increasing counter with optional labels"""
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._values: dict[tuple, list] = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        series = self._values.get(labels)
+        if series is None:
+            series = self._values.setdefault(labels, [0])
+        series[0] += amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labels, series in list(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {series[0]}")
+        return lines
+
+
+class Histogram:
+    """
+    Histogram with fixed buckets.
+
+    Each series is one list: per-bucket counts (the last slot is +Inf),
+    followed by the running sum and total count.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS
+    ):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._size = len(buckets) + 1
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, labels: tuple = ()):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series.setdefault(labels, [0] * (self._size + 2))
+        series[bisect_left(self.buckets, value)] += 1
+        series[self._size] += value
+        series[self._size + 1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, series in list(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                label_text = _format_labels(self.labelnames, labels, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{label_text} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {series[self._size]}")
+            lines.append(f"{self.name}_count{label_text} {series[self._size + 1]}")
+        return lines
+
+
+# ==================== Registry ====================
+
+REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route and status",
+    ("method", "route", "status"),
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency",
+    ("method", "route"),
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "Database queries issued per HTTP request",
+    ("method", "route"), buckets=QUERY_COUNT_BUCKETS,
+)
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_seconds", "Database time spent per HTTP request",
+    ("method", "route"),
+)
+DB_QUERIES = Counter("db_queries_total", "Database queries executed")
+DB_QUERY_LATENCY = Histogram("db_query_duration_seconds", "Database query latency")
+OPERATION_LATENCY = Histogram(
+    "operation_duration_seconds", "Latency of expensive operations such as parsing and exports",
+    ("operation",),
+)
+
+EVENTS_PUBLISHED = Counter("events_published_total", "Events published to stream clients", ("type",))
+EVENTS_DROPPED = Counter("events_dropped_total", "Events discarded because a stream client fell behind")
+AUDIT_WRITTEN = Counter("audit_entries_written_total", "Audit log entries written to the database")
+AUDIT_DROPPED = Counter(
+    "audit_entries_dropped_total", "Audit log entries lost to a full queue or a failed write",
+    ("reason",),
+)
+RATE_LIMITED = Counter("rate_limited_requests_total", "Requests rejected by the rate limiter", ("class",))
+
+REGISTRY = [
+    REQUESTS, REQUEST_LATENCY, REQUEST_DB_QUERIES, REQUEST_DB_TIME,
+    DB_QUERIES, DB_QUERY_LATENCY, OPERATION_LATENCY,
+    EVENTS_PUBLISHED, EVENTS_DROPPED, AUDIT_WRITTEN, AUDIT_DROPPED, RATE_LIMITED,
+]
+
+
+def render_metrics() -> str:
+    """Render all metrics in Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def scrape_allowed(host: Optional[str]) -> bool:
+    """Whether a client address may read ``/metrics``"""
+    try:
+        address = ipaddress.ip_address(host)
+    except (TypeError, ValueError):
+        return False
+    return any(address in network for network in SCRAPE_NETWORKS)
+
+
+# ==================== Request Tracking ====================
+
+# [query count, query seconds] for the request being handled
+_request_db_stats: ContextVar[Optional[list]] = ContextVar("request_db_stats", default=None)
+
+
+def begin_request() -> list:
+    """Start collecting database statistics for the current request"""
+    stats = [0, 0.0]
+    _request_db_stats.set(stats)
+    return stats
+
+
+def end_request(method: str, route: str, status_code: int, elapsed: float, stats: list):
+    """Record a finished request"""
+    labels = (method, route)
+    REQUESTS.inc((method, route, status_code))
+    REQUEST_LATENCY.observe(elapsed, labels)
+    REQUEST_DB_QUERIES.observe(stats[0], labels)
+    REQUEST_DB_TIME.observe(stats[1], labels)
+
+
+@contextmanager
+def timed(operation: str):
+    """Record how long the enclosed block takes under ``operation``"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        OPERATION_LATENCY.observe(time.perf_counter() - start, (operation,))
+
+
+# ==================== SQLAlchemy Hooks ====================
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    DB_QUERIES.inc()
+    DB_QUERY_LATENCY.observe(elapsed)
+
+    stats = _request_db_stats.get()
+    if stats is not None:
+        stats[0] += 1
+        stats[1] += elapsed
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute is not called for failed statements
+    starts = exception_context.connection.info.get("query_start_time") if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+
+def instrument_engine(engine: Engine):
+    """Attach query counting and timing hooks to an engine"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
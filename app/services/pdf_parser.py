@@ -1,44 +1,197 @@
-import pdfplumber
+"""
+Invoice PDF parsing through a registry of layout templates.
+
+Each ``InvoiceTemplate`` declares cheap fingerprint checks (keywords that
+must appear on the first page, and optionally customer keywords that must
+appear in the BILL TO block) plus the parse function for its layout.
+``parse_invoice`` extracts only the first page to pick a template, then
+the remaining pages for parsing. Templates are tried in registration
+order, so specific retailers come before the generic GPM layouts.
+
+Regexes are compiled once at import. The retailer and shop type of a
+template replace guessing them from the shop name.
+"""
 import re
+from typing import Callable, Optional
 
-def parse_invoice_pdf(file):
-    items = []
+from app.services.product_codes import infer_retailer
+
+
+class ParsedInvoice:
+    """Header fields and line items read from one invoice"""
+
+    def __init__(
+        self,
+        template: str,
+        shop_name: Optional[str],
+        invoice_no: Optional[str],
+        items: list[dict],
+        retailer: Optional[str] = None,
+        shop_type: str = "normal"
+    ):
+        self.template = template
+        self.shop_name = shop_name
+        self.invoice_no = invoice_no
+        self.items = items
+        self.retailer = retailer
+        self.shop_type = shop_type
+
+
+# ==================== Layouts ====================
+
+# GPM CODE, CODE, DESCRIPTION..., QTY, RATE, AMOUNT; amounts may have thousands separators
+_ITEM_LINE = re.compile(
+    r"^(?P<gpm_code>\d{5,})\s+(?P<item_code>\S+)\s+(?P<description>.*?)\s+"
+    r"(?P<qty>\d+)\s+(?P<rate>-?[\d,]*\.?\d+)\s+(?P<amount>-?[\d,]*\.?\d+)$",
+    re.MULTILINE,
+)
+_INVOICE_NO = re.compile(r"INVOICE\s+(GPM-\d+)")
+_BILL_TO_BLOCK = re.compile(r"BILL TO(.*?)(?:GPM CODE|CODE ITEM|$)", re.DOTALL)
+
+# Tax invoice: "BILL TO INVOICE GPM-1574", then "<customer> DATE dd/mm/yyyy", then the branch
+_TAX_BILL_TO = re.compile(r"BILL TO[^\n]*\n(?P<customer>.*?)\s+DATE\s+\S+\n(?P<branch>[^\n]+)")
+# Plain layout: "BILL TO" alone on a line, shop name on the next
+_PLAIN_BILL_TO = re.compile(r"BILL TO\s*\n(?P<shop>[^\n]+)")
+
+
+def _amount(text: str) -> float:
+    return float(text.replace(",", ""))
+
+
+def _items(text: str) -> list[dict]:
+    return [
+        {
+            "gpm_code": m["gpm_code"],
+            "item_code": m["item_code"],
+            "qty": int(m["qty"]),
+            "rate": _amount(m["rate"]),
+        }
+        for m in _ITEM_LINE.finditer(text)
+    ]
+
+
+def _invoice_no(text: str) -> Optional[str]:
+    match = _INVOICE_NO.search(text)
+    return match.group(1) if match else None
+
+
+def parse_tax_invoice(text: str) -> tuple:
+    """
+    GPM tax invoice. The shop is the customer line beside DATE when it
+    names a branch ("Naivas limited-Ndogo"), otherwise the line under it
+    ("Naivas Limited" / "Naivas Limited-Kahawa Sukari"); the line under a
+    branch customer is an address.
+    """
     shop_name = None
-    invoice_no = None
+    match = _TAX_BILL_TO.search(text)
+    if match:
+        customer = match["customer"].strip()
+        shop_name = customer if "-" in customer else match["branch"].strip()
+    return shop_name, _invoice_no(text), _items(text)
+
+
+def parse_plain_invoice(text: str) -> tuple:
+    """GPM invoice with the shop name on the line after BILL TO"""
+    match = _PLAIN_BILL_TO.search(text)
+    shop_name = match["shop"].strip() if match else None
+    return shop_name, _invoice_no(text), _items(text)
+
+
+# ==================== Templates ====================
+
+class InvoiceTemplate:
+    """A recognisable invoice layout and how to read it"""
+
+    def __init__(
+        self,
+        name: str,
+        parse: Callable[[str], tuple],
+        keywords: tuple[str, ...],
+        customer_keywords: tuple[str, ...] = (),
+        retailer: Optional[str] = None,
+        shop_type: str = "normal"
+    ):
+        self.name = name
+        self.parse_text = parse
+        self.keywords = tuple(k.upper() for k in keywords)
+        self.customer_keywords = tuple(k.upper() for k in customer_keywords)
+        self.retailer = retailer
+        self.shop_type = shop_type
+
+    def matches(self, first_page: str) -> bool:
+        """Fingerprint check against the first page's text"""
+        text = first_page.upper()
+        if not all(keyword in text for keyword in self.keywords):
+            return False
+        if not self.customer_keywords:
+            return True
+        block = _BILL_TO_BLOCK.search(text)
+        return block is not None and any(k in block.group(1) for k in self.customer_keywords)
+
+    def parse(self, text: str) -> ParsedInvoice:
+        shop_name, invoice_no, items = self.parse_text(text)
+        retailer = self.retailer or (infer_retailer(shop_name) if shop_name else None)
+        return ParsedInvoice(self.name, shop_name, invoice_no, items, retailer, self.shop_type)
+
+
+TEMPLATES: list[InvoiceTemplate] = []
+
+
+def register(template: InvoiceTemplate) -> InvoiceTemplate:
+    TEMPLATES.append(template)
+    return template
+
+
+register(InvoiceTemplate(
+    "naivas", parse_tax_invoice, ("TAX INVOICE", "BILL TO"),
+    customer_keywords=("NAIVAS",), retailer="naivas", shop_type="consignment",
+))
+register(InvoiceTemplate(
+    "carrefour", parse_tax_invoice, ("TAX INVOICE", "BILL TO"),
+    customer_keywords=("CARREFOUR", "MAJID AL FUTTAIM"), retailer="carrefour", shop_type="consignment",
+))
+register(InvoiceTemplate(
+    "qm", parse_tax_invoice, ("TAX INVOICE", "BILL TO"),
+    customer_keywords=("QUICK MART", "QUICKMART"), retailer="qm", shop_type="consignment",
+))
+register(InvoiceTemplate("gpm_tax_invoice", parse_tax_invoice, ("TAX INVOICE", "BILL TO")))
+register(InvoiceTemplate("gpm_plain", parse_plain_invoice, ("INVOICE", "BILL TO")))
+
+
+def detect_template(first_page: str) -> Optional[InvoiceTemplate]:
+    return next((t for t in TEMPLATES if t.matches(first_page)), None)
+
+
+def shop_type_for(retailer: Optional[str]) -> str:
+    """Shop type new shops of a retailer get (e.g. from Excel uploads)"""
+    return next(
+        (t.shop_type for t in TEMPLATES if retailer and t.retailer == retailer),
+        "normal",
+    )
+
+
+# ==================== Parsing ====================
+
+def parse_invoice(file) -> ParsedInvoice:
+    """
+    Parse an invoice PDF with the template its first page matches.
+
+    Raises:
+        ValueError: If no template recognises the layout
+    """
+    import pdfplumber  # heavy; imported on first parse
 
     with pdfplumber.open(file) as pdf:
-        text = ""
-        for page in pdf.pages:
-            text += page.extract_text() + "\n"
-
-    # Extract shop
-    shop_match = re.search(r"BILL TO\s+(.*?)\n", text)
-    if shop_match:
-        shop_name = shop_match.group(1).strip()
-
-    # Extract invoice number
-    inv_match = re.search(r"INVOICE\s+(GPM-\d+)", text)
-    if inv_match:
-        invoice_no = inv_match.group(1)
-
-    # Extract items (lines with GPM code)
-    lines = text.split("\n")
-    for line in lines:
-        parts = line.split()
-
-        if len(parts) >= 5 and parts[0].isdigit():
-            try:
-                gpm_code = parts[0]
-                item_code = parts[1]
-                qty = int(parts[-3])
-                rate = float(parts[-2])
-
-                items.append({
-                    "item_code": item_code,
-                    "qty": qty,
-                    "rate": rate
-                })
-            except:
-                continue
-
-    return shop_name, invoice_no, items
+        first_page = (pdf.pages[0].extract_text() or "") if pdf.pages else ""
+        template = detect_template(first_page)
+        if template is None:
+            raise ValueError("Unrecognised invoice layout")
+        rest = [page.extract_text() or "" for page in pdf.pages[1:]]
+
+    return template.parse("\n".join([first_page] + rest) + "\n")
+
+
+def parse_invoice_pdf(file):
+    """Return (shop_name, invoice_no, items) for an invoice PDF"""
+    invoice = parse_invoice(file)
+    return invoice.shop_name, invoice.invoice_no, invoice.items
@@ -0,0 +1,194 @@
+"""
+Retailer product codes.
+
+Each retailer labels our products with its own codes (Naivas uses our
+item codes, Carrefour and QM their own article numbers). ``ProductCode``
+maps (retailer, code) to a product; the label sets in ``Data/newCodes``
+are loaded with:
+
+    python -m app.services.product_codes Data/newCodes [--mapping codes.csv]
+
+Every ``<retailer>/<code>.btw`` label file registers one code. Codes are
+linked to products through the optional mapping CSV (retailer, code,
+item_code), or else when the code is itself a product's item or GPM code;
+the rest are stored unlinked and reported.
+
+Invoice ingestion builds a ``CodeIndex`` for the codes on one invoice in
+two queries, then resolves every line with dict lookups.
+"""
+import argparse
+import csv
+import os
+import re
+from typing import Iterable, Optional
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.models import Product, ProductCode
+
+
+CODES_DIR = os.path.join("Data", "newCodes")
+LABEL_EXTENSION = ".btw"
+
+KNOWN_RETAILERS = ("naivas", "carrefour", "qm")
+
+
+def normalise_retailer(name: str) -> str:
+    return name.strip().lower()
+
+
+def infer_retailer(shop_name: str) -> Optional[str]:
+    """Best-effort retailer for a shop name such as "Naivas Westlands" """
+    words = set(re.findall(r"[a-z]+", shop_name.lower()))
+    return next((retailer for retailer in KNOWN_RETAILERS if retailer in words), None)
+
+
+# ==================== Resolving ====================
+
+class CodeIndex:
+    """
+    Multi-key lookup from invoice codes to product ids.
+
+    Keys are (retailer, code) for retailer codes and (None, code) for our
+    own item and GPM codes; a retailer code wins over an item code.
+    """
+
+    def __init__(self, entries: dict[tuple, int]):
+        self._entries = entries
+
+    @classmethod
+    def for_codes(cls, db: Session, retailer: Optional[str], codes: Iterable[str]) -> "CodeIndex":
+        codes = {str(code).strip() for code in codes if code is not None}
+        entries = {}
+        if not codes:
+            return cls(entries)
+
+        for item_code, gpm_code, product_id in (
+            db.query(Product.item_code, Product.gpm_code, Product.id)
+            .filter(or_(Product.item_code.in_(codes), Product.gpm_code.in_(codes)))
+        ):
+            if gpm_code in codes:
+                entries.setdefault((None, gpm_code), product_id)
+            if item_code in codes:
+                entries[(None, item_code)] = product_id  # item codes beat GPM codes
+
+        if retailer:
+            for code, product_id in (
+                db.query(ProductCode.code, ProductCode.product_id)
+                .filter(ProductCode.retailer == retailer, ProductCode.code.in_(codes))
+                .filter(ProductCode.product_id.isnot(None))
+            ):
+                entries[(retailer, code)] = product_id
+        return cls(entries)
+
+    def resolve(self, retailer: Optional[str], *codes) -> Optional[int]:
+        """Product id for the first of ``codes`` that is known, else None"""
+        for code in codes:
+            if code is None:
+                continue
+            code = str(code).strip()
+            product_id = self._entries.get((retailer, code)) or self._entries.get((None, code))
+            if product_id is not None:
+                return product_id
+        return None
+
+
+# ==================== Loading ====================
+
+def _read_mapping(path: str) -> dict[tuple, str]:
+    """(retailer, code) -> item_code from a CSV with those three columns"""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return {
+            (normalise_retailer(row["retailer"]), row["code"].strip()): row["item_code"].strip()
+            for row in csv.DictReader(f)
+            if row.get("retailer") and row.get("code") and row.get("item_code")
+        }
+
+
+def scan_label_codes(root: str = CODES_DIR) -> dict[str, list[str]]:
+    """Retailer -> codes, one per ``<root>/<Retailer>/<code>.btw`` file"""
+    codes = {}
+    for entry in sorted(os.scandir(root), key=lambda e: e.name):
+        if not entry.is_dir():
+            continue
+        codes[normalise_retailer(entry.name)] = sorted({
+            name[:-len(LABEL_EXTENSION)]
+            for name in os.listdir(entry.path)
+            if name.lower().endswith(LABEL_EXTENSION)
+        })
+    return codes
+
+
+def load_codes(db: Session, codes: dict[str, list[str]], mapping: Optional[dict[tuple, str]] = None) -> dict:
+    """
+    Upsert retailer codes and link them to products.
+
+    Args:
+        db: Database session; committed at the end
+        codes: Retailer -> codes to register
+        mapping: Optional (retailer, code) -> item_code links
+
+    Returns:
+        Per retailer: number of codes, how many are linked, unmatched codes
+    """
+    mapping = mapping or {}
+    wanted = {item_code for item_code in mapping.values()}
+    wanted.update(code for retailer_codes in codes.values() for code in retailer_codes)
+
+    by_code = {}
+    for product_id, item_code, gpm_code in db.query(Product.id, Product.item_code, Product.gpm_code):
+        if gpm_code in wanted:
+            by_code.setdefault(gpm_code, product_id)
+        if item_code in wanted:
+            by_code[item_code] = product_id
+
+    existing = {
+        (c.retailer, c.code): c
+        for c in db.query(ProductCode).filter(ProductCode.retailer.in_(list(codes)))
+    }
+
+    report = {}
+    for retailer, retailer_codes in codes.items():
+        retailer_codes = list(dict.fromkeys(retailer_codes))
+        linked, unmatched = 0, []
+        for code in retailer_codes:
+            item_code = mapping.get((retailer, code), code)
+            product_id = by_code.get(item_code)
+
+            row = existing.get((retailer, code))
+            if row is None:
+                row = ProductCode(retailer=retailer, code=code)
+                db.add(row)
+            if product_id is not None:
+                row.product_id = product_id
+            if row.product_id is None:
+                unmatched.append(code)
+            else:
+                linked += 1
+        report[retailer] = {"codes": len(retailer_codes), "linked": linked, "unmatched": unmatched}
+
+    db.commit()
+    return report
+
+
+def main(argv=None):
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Load retailer label codes")
+    parser.add_argument("root", nargs="?", default=CODES_DIR)
+    parser.add_argument("--mapping", help="CSV with retailer, code, item_code columns")
+    args = parser.parse_args(argv)
+
+    mapping = _read_mapping(args.mapping) if args.mapping else None
+    with SessionLocal() as db:
+        report = load_codes(db, scan_label_codes(args.root), mapping)
+
+    for retailer, result in report.items():
+        print(f"{retailer}: {result['codes']} codes, {result['linked']} linked")
+        if result["unmatched"]:
+            print(f"  unmatched: {', '.join(result['unmatched'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Development-mode detector for N+1 query patterns and slow requests.
+
+When enabled, every SQL statement issued while handling a request is
+normalised (literals and IN-lists collapsed) and grouped by shape. At the
+end of the request the groups are checked against two limits:
+
+* ``repeat_limit``: the same statement shape issued more than N times,
+  which usually means a query inside a loop;
+* ``time_budget_ms``: total database time for the request.
+
+Violations are logged in ``log`` mode or raised as ``QueryBudgetExceeded``
+in ``raise`` mode, which makes test clients fail the offending test.
+
+Configure through the environment:
+
+    INVENTORY_QUERY_DIAGNOSTICS=log|raise   (default: off)
+    QUERY_REPEAT_LIMIT=5
+    QUERY_TIME_BUDGET_MS=500
+
+or at runtime with ``configure()`` from a pytest fixture.
+"""
+import logging
+import os
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+logger = logging.getLogger(__name__)
+
+MODES = ("off", "log", "raise")
+
+_settings = {
+    "mode": os.getenv("INVENTORY_QUERY_DIAGNOSTICS", "off").lower(),
+    "repeat_limit": int(os.getenv("QUERY_REPEAT_LIMIT", "5")),
+    "time_budget_ms": float(os.getenv("QUERY_TIME_BUDGET_MS", "500")),
+}
+_engines: list[Engine] = []
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*\?\s*,?)+\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised in ``raise`` mode when a request breaks a query limit"""
+
+
+def normalize_sql(statement: str) -> str:
+    """Reduce a statement to its shape so repeated queries group together"""
+    shape = _STRING_LITERAL.sub("?", statement)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = _IN_LIST.sub("IN (?)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+class QueryTracker:
+    """Statement shapes and timings collected for one request"""
+
+    def __init__(self, label: str):
+        self.label = label
+        self.shapes: dict[str, list] = {}  # {shape: [count, seconds]}
+        self.total_time = 0.0
+
+    def record(self, statement: str, elapsed: float):
+        shape = normalize_sql(statement)
+        entry = self.shapes.get(shape)
+        if entry is None:
+            entry = self.shapes[shape] = [0, 0.0]
+        entry[0] += 1
+        entry[1] += elapsed
+        self.total_time += elapsed
+
+    @property
+    def query_count(self) -> int:
+        return sum(count for count, _ in self.shapes.values())
+
+    def violations(self, repeat_limit: int, time_budget_ms: float) -> list[str]:
+        """Return a human-readable description of each broken limit"""
+        problems = [
+            f"{count}x ({seconds * 1000:.1f} ms): {shape}"
+            for shape, (count, seconds) in self.shapes.items()
+            if count > repeat_limit
+        ]
+        if self.total_time * 1000 > time_budget_ms:
+            problems.append(
+                f"{self.query_count} queries took {self.total_time * 1000:.1f} ms "
+                f"(budget {time_budget_ms:.0f} ms)"
+            )
+        return problems
+
+
+_current_tracker: ContextVar[Optional[QueryTracker]] = ContextVar("query_tracker", default=None)
+
+
+# ==================== Configuration ====================
+
+def enabled() -> bool:
+    return _settings["mode"] != "off"
+
+
+def configure(
+    mode: Optional[str] = None,
+    repeat_limit: Optional[int] = None,
+    time_budget_ms: Optional[float] = None
+):
+    """
+    Change diagnostics settings at runtime.
+
+    Args:
+        mode: "off", "log" or "raise"
+        repeat_limit: Maximum executions of one statement shape per request
+        time_budget_ms: Maximum total database time per request
+    """
+    if mode is not None:
+        if mode not in MODES:
+            raise ValueError(f"Unknown diagnostics mode: {mode}")
+        _settings["mode"] = mode
+    if repeat_limit is not None:
+        _settings["repeat_limit"] = repeat_limit
+    if time_budget_ms is not None:
+        _settings["time_budget_ms"] = time_budget_ms
+
+    for engine in _engines:
+        _sync_listeners(engine)
+
+
+# ==================== SQLAlchemy Hooks ====================
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_tracker.get() is not None:
+        conn.info.setdefault("diagnostics_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    tracker = _current_tracker.get()
+    starts = conn.info.get("diagnostics_start_time")
+    if tracker is not None and starts:
+        tracker.record(statement, time.perf_counter() - starts.pop())
+
+
+def _sync_listeners(engine: Engine):
+    listening = event.contains(engine, "before_cursor_execute", _before_cursor_execute)
+    if enabled() and not listening:
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    elif not enabled() and listening:
+        event.remove(engine, "before_cursor_execute", _before_cursor_execute)
+        event.remove(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def install(engine: Engine):
+    """Register an engine; hooks are only attached while diagnostics are enabled"""
+    if engine not in _engines:
+        _engines.append(engine)
+    _sync_listeners(engine)
+
+
+# ==================== Tracking ====================
+
+def begin(label: str) -> QueryTracker:
+    """Start tracking queries for the current request"""
+    tracker = QueryTracker(label)
+    _current_tracker.set(tracker)
+    return tracker
+
+
+def finish(tracker: QueryTracker):
+    """
+    Check a finished request against the configured limits.
+
+    Raises:
+        QueryBudgetExceeded: In ``raise`` mode, if any limit was broken
+    """
+    problems = tracker.violations(_settings["repeat_limit"], _settings["time_budget_ms"])
+    if not problems:
+        return
+
+    message = f"Query budget exceeded in {tracker.label}:\n  " + "\n  ".join(problems)
+    if _settings["mode"] == "raise":
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+@contextmanager
+def track_queries(label: str = "block"):
+    """
+    Track queries issued inside a block and check them on exit.
+
+    Useful for service-level tests that call functions directly rather than
+    going through the HTTP middleware.
+    """
+    tracker = QueryTracker(label)
+    token = _current_tracker.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _current_tracker.reset(token)
+    finish(tracker)
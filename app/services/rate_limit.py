@@ -0,0 +1,87 @@
+"""
+Per-user, per-route-class request rate limiting.
+
+Every request outside ``EXEMPT_PATHS`` takes a token from the bucket of
+its client and route class; an empty bucket means ``429 Too Many
+Requests`` with ``Retry-After``. Buckets live in shared state
+(``shared_state.take_token``), so all workers enforce one limit.
+
+The client is the user named by a valid bearer token, else the remote
+address. Route classes separate cheap reads from writes, from uploads
+(invoices, catalogs) and from the heavy endpoints (exports, planners,
+as-of stock) that hold a CPU for seconds, so a client polling stock
+lists cannot starve its own uploads and vice versa. The upload burst
+fits a monthly batch of invoices posted back to back.
+
+Limits are "<tokens per second>,<burst>" in INVENTORY_RATE_<CLASS>;
+INVENTORY_RATE_LIMIT=0 turns limiting off. If the state store fails the
+request is let through: rate limiting must not take the API down with it.
+"""
+import logging
+import math
+import os
+from typing import Optional
+
+from app.services import metrics
+from app.services.shared_state import take_token
+
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("INVENTORY_RATE_LIMIT", "1") != "0"
+
+
+def _limit(route_class: str, default: str) -> tuple[float, int]:
+    rate, burst = os.getenv(f"INVENTORY_RATE_{route_class.upper()}", default).split(",")
+    return float(rate), int(burst)
+
+
+LIMITS = {
+    "read": _limit("read", "10,40"),
+    "write": _limit("write", "5,20"),
+    "upload": _limit("upload", "2,100"),
+    "heavy": _limit("heavy", "0.5,10"),
+}
+
+# Health checks, metrics scrapes and long-lived event streams are not
+# limited; /login has its own lockout in LoginAttemptTracker
+EXEMPT_PATHS = {"/", "/health", "/metrics", "/events", "/login", "/docs", "/openapi.json"}
+UPLOAD_PATHS = {"/upload-invoice", "/products/import"}
+HEAVY_PREFIXES = ("/export/", "/allocation/", "/analytics/", "/stock/as-of")
+
+
+def route_class(method: str, path: str) -> Optional[str]:
+    """The limit class of a request, or None if it is not limited"""
+    if method == "OPTIONS" or path in EXEMPT_PATHS:
+        return None
+    if path in UPLOAD_PATHS:
+        return "upload"
+    if path.startswith(HEAVY_PREFIXES):
+        return "heavy"
+    return "read" if method in ("GET", "HEAD") else "write"
+
+
+def check(client: str, method: str, path: str) -> Optional[int]:
+    """
+    Take a token for this request.
+
+    Returns:
+        None if the request may proceed, otherwise the whole seconds to
+        wait before retrying
+    """
+    if not ENABLED:
+        return None
+    limit_class = route_class(method, path)
+    if limit_class is None:
+        return None
+
+    rate, burst = LIMITS[limit_class]
+    try:
+        wait = take_token(f"ratelimit:{limit_class}:{client}", rate, burst)
+    except Exception:
+        logger.exception("Rate limit check failed; allowing request")
+        return None
+    if wait <= 0:
+        return None
+    metrics.RATE_LIMITED.inc((limit_class,))
+    return max(1, math.ceil(wait))
@@ -0,0 +1,222 @@
+"""
+Low-stock and reorder alerting.
+
+A stock row breaches when its quantity is at or below its reorder level:
+
+* master stock uses ``Product.reorder_level``;
+* consignment stock uses ``ConsignmentStock.reorder_level`` for that shop,
+  then the product level;
+* both fall back to ``DEFAULT_REORDER_LEVEL`` (10, as the frontend assumed).
+
+Breaching rows are materialised in ``low_stock_alerts`` (shop_id 0 for
+master stock), so ``/alerts/low-stock`` reads only the rows that breach.
+Write paths call ``evaluate`` with the products they touched; it rechecks
+just those rows, raises or clears alerts in the caller's transaction and
+returns the transitions for the event stream. ``rebuild_alerts`` recomputes
+everything and runs from the migration step.
+"""
+import os
+from datetime import datetime, timezone
+from typing import Iterable, Mapping, Optional
+
+from sqlalchemy import Select, delete, func, insert, literal, select, update
+from sqlalchemy.orm import Session
+
+from app.models import Product, Shop, MasterStock, ConsignmentStock, LowStockAlert
+
+
+DEFAULT_REORDER_LEVEL = int(os.getenv("INVENTORY_DEFAULT_REORDER_LEVEL", "10"))
+
+# shop_id used for master stock alerts, as in snapshots
+MASTER_SHOP_ID = 0
+
+EVALUATE_BATCH_SIZE = 5000
+
+
+def _breaching(db: Session, shop_id: Optional[int], product_ids: Optional[list[int]]) -> dict:
+    """
+    Return {(shop_id, product_id): (quantity, reorder_level)} for stock rows
+    at or below their level. ``shop_id`` None covers master stock and every
+    consignment shop.
+    """
+    queries = []
+    if shop_id in (None, MASTER_SHOP_ID):
+        level = func.coalesce(Product.reorder_level, DEFAULT_REORDER_LEVEL)
+        query = (
+            db.query(literal(MASTER_SHOP_ID), MasterStock.product_id, MasterStock.quantity, level)
+            .join(Product, Product.id == MasterStock.product_id)
+            .filter(MasterStock.quantity <= level)
+        )
+        if product_ids is not None:
+            query = query.filter(MasterStock.product_id.in_(product_ids))
+        queries.append(query)
+
+    if shop_id != MASTER_SHOP_ID:
+        level = func.coalesce(ConsignmentStock.reorder_level, Product.reorder_level, DEFAULT_REORDER_LEVEL)
+        query = (
+            db.query(ConsignmentStock.shop_id, ConsignmentStock.product_id, ConsignmentStock.quantity, level)
+            .join(Product, Product.id == ConsignmentStock.product_id)
+            .filter(ConsignmentStock.quantity <= level)
+        )
+        if shop_id is not None:
+            query = query.filter(ConsignmentStock.shop_id == shop_id)
+        if product_ids is not None:
+            query = query.filter(ConsignmentStock.product_id.in_(product_ids))
+        queries.append(query)
+
+    return {
+        (shop, product): (quantity, reorder_level)
+        for query in queries
+        for shop, product, quantity, reorder_level in query
+    }
+
+
+def _sync(db: Session, shop_id: Optional[int], product_ids: Optional[list[int]]) -> list[dict]:
+    """Bring the alerts in scope in line with current stock; return transitions"""
+    db.flush()
+    breaching = _breaching(db, shop_id, product_ids)
+
+    current = db.query(LowStockAlert.id, LowStockAlert.shop_id, LowStockAlert.product_id,
+                       LowStockAlert.quantity, LowStockAlert.reorder_level)
+    if shop_id is not None:
+        current = current.filter(LowStockAlert.shop_id == shop_id)
+    if product_ids is not None:
+        current = current.filter(LowStockAlert.product_id.in_(product_ids))
+    existing = {(a.shop_id, a.product_id): a for a in current}
+
+    now = datetime.now(timezone.utc)
+    raised, changed, events = [], [], []
+    for (shop, product), (quantity, level) in breaching.items():
+        alert = existing.pop((shop, product), None)
+        if alert is None:
+            raised.append({
+                "shop_id": shop, "product_id": product,
+                "quantity": quantity, "reorder_level": level, "raised_at": now,
+            })
+            events.append(_event("low_stock", shop, product, quantity, level))
+        elif (alert.quantity, alert.reorder_level) != (quantity, level):
+            changed.append({"id": alert.id, "quantity": quantity, "reorder_level": level})
+
+    # Whatever is left no longer breaches
+    for (shop, product), alert in existing.items():
+        events.append(_event("restocked", shop, product, None, alert.reorder_level))
+
+    if raised:
+        db.execute(insert(LowStockAlert), raised)
+    if changed:
+        db.execute(update(LowStockAlert), changed)
+    if existing:
+        db.execute(
+            delete(LowStockAlert).where(LowStockAlert.id.in_([a.id for a in existing.values()])),
+            execution_options={"synchronize_session": False},
+        )
+    return events
+
+
+def _event(kind: str, shop_id: int, product_id: int, quantity: Optional[int], level: int) -> dict:
+    return {
+        "type": kind,
+        "shop_id": shop_id,
+        "product_id": product_id,
+        "quantity": quantity,
+        "reorder_level": level,
+    }
+
+
+def evaluate(db: Session, shop_id: Optional[int], product_ids: Iterable[int]) -> list[dict]:
+    """
+    Recheck the stock rows a write touched, inside the caller's transaction.
+
+    Args:
+        db: Database session with the stock changes applied (flushed here)
+        shop_id: Consignment shop, MASTER_SHOP_ID for master stock, or None
+            for master stock and every shop
+        product_ids: Products whose stock changed; large sets are checked
+            in batches of EVALUATE_BATCH_SIZE to stay within the database's
+            bound parameter limit
+
+    Returns:
+        low_stock / restocked events for rows whose state flipped
+    """
+    product_ids = sorted(set(product_ids))
+    events = []
+    for start in range(0, len(product_ids), EVALUATE_BATCH_SIZE):
+        events += _sync(db, shop_id, product_ids[start:start + EVALUATE_BATCH_SIZE])
+    return events
+
+
+def rebuild_alerts(db: Session) -> list[dict]:
+    """Recompute every alert, e.g. after reorder levels change in bulk"""
+    return _sync(db, None, None)
+
+
+def alerts_select(shop_id: Optional[int] = None) -> Select:
+    """
+    Current alerts with product and shop details, most urgent first.
+
+    A statement rather than a query, so the dashboard can embed it; rows
+    are turned into dicts by ``alert_dict``.
+    """
+    statement = (
+        select(
+            LowStockAlert.shop_id, Shop.name.label("shop_name"), LowStockAlert.product_id,
+            Product.item_code, Product.description,
+            LowStockAlert.quantity, LowStockAlert.reorder_level, LowStockAlert.raised_at,
+        )
+        .join(Product, Product.id == LowStockAlert.product_id)
+        .outerjoin(Shop, Shop.id == LowStockAlert.shop_id)
+    )
+    if shop_id is not None:
+        statement = statement.where(LowStockAlert.shop_id == shop_id)
+    return statement.order_by(
+        (LowStockAlert.quantity - LowStockAlert.reorder_level).asc(),
+        LowStockAlert.raised_at.asc(),
+        LowStockAlert.id.asc(),
+    )
+
+
+def alert_dict(row: Mapping) -> dict:
+    """API form of an ``alerts_select`` row (raised_at may arrive as text from JSON)"""
+    raised_at = row["raised_at"]
+    if isinstance(raised_at, str):
+        raised_at = datetime.fromisoformat(raised_at)
+    return {
+        "shop_id": row["shop_id"],
+        "shop_name": row["shop_name"] if row["shop_id"] != MASTER_SHOP_ID else "Master stock",
+        "product_id": row["product_id"],
+        "item_code": row["item_code"],
+        "description": row["description"],
+        "quantity": row["quantity"],
+        "reorder_level": row["reorder_level"],
+        "raised_at": raised_at.isoformat() if raised_at else None,
+    }
+
+
+def count_alerts(db: Session, shop_id: Optional[int] = None) -> int:
+    """Number of current alerts, for one shop or all of them"""
+    query = db.query(func.count(LowStockAlert.id))
+    if shop_id is not None:
+        query = query.filter(LowStockAlert.shop_id == shop_id)
+    return query.scalar()
+
+
+def list_alerts(
+    db: Session,
+    shop_id: Optional[int] = None,
+    limit: Optional[int] = None,
+    offset: int = 0,
+) -> list[dict]:
+    """
+    Current alerts, most urgent first.
+
+    Args:
+        db: Database session
+        shop_id: Only this shop (MASTER_SHOP_ID for master stock)
+        limit: Return at most this many alerts
+        offset: Skip this many alerts, for paging
+
+    Returns:
+        List of alert dicts with product and shop details
+    """
+    statement = alerts_select(shop_id).limit(limit).offset(offset or None)
+    return [alert_dict(row) for row in db.execute(statement).mappings()]
@@ -0,0 +1,185 @@
+"""
+Full-text product search backed by SQLite FTS5.
+
+``products_fts`` is an external-content FTS5 index over ``products``
+(description, item_code, gpm_code). Triggers keep it in sync on every
+insert, update and delete, so products added through ``/products/add`` or
+bulk imports are searchable immediately without rebuilding the index.
+
+Queries are tokenised and every token is matched as a prefix, so "gpm anim"
+finds "GPM ANIMALSASSORTED" and "N0550" finds item code N055039. Results
+are ranked with bm25, weighting description matches above code matches.
+
+Databases without the index (not SQLite, or SQLite built without FTS5)
+are searched with an unranked LIKE query instead.
+"""
+import logging
+import re
+
+from sqlalchemy import or_, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.models import Product
+
+
+FTS_TABLE = "products_fts"
+
+_FTS_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        description, item_code, gpm_code,
+        content='products', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3 4'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, description, item_code, gpm_code)
+        VALUES (new.id, new.description, new.item_code, new.gpm_code);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description, item_code, gpm_code)
+        VALUES ('delete', old.id, old.description, old.item_code, old.gpm_code);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE ON products BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description, item_code, gpm_code)
+        VALUES ('delete', old.id, old.description, old.item_code, old.gpm_code);
+        INSERT INTO {FTS_TABLE}(rowid, description, item_code, gpm_code)
+        VALUES (new.id, new.description, new.item_code, new.gpm_code);
+    END
+    """,
+]
+
+# bm25 column weights: description, item_code, gpm_code
+_RANK = f"bm25({FTS_TABLE}, 10.0, 5.0, 5.0)"
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+logger = logging.getLogger(__name__)
+
+# URLs of databases known to have the index; a missing one is looked up
+# again on each search, so migrating a running database takes effect
+_indexed: set[str] = set()
+
+
+def ensure_search_index(connection: Connection) -> bool:
+    """
+    Create the FTS index and its triggers if missing, filling it from the
+    existing products. No-op on databases other than SQLite and on SQLite
+    builds without FTS5.
+
+    Returns:
+        True if the index was created
+    """
+    if connection.dialect.name != "sqlite":
+        return False
+
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": FTS_TABLE},
+    ).first()
+
+    if not exists:
+        try:
+            with connection.begin_nested():
+                connection.execute(text(_FTS_DDL[0]))
+        except OperationalError as e:
+            logger.warning("Product search falls back to LIKE; FTS5 index not created: %s", e)
+            return False
+
+    for statement in _FTS_DDL[1:]:
+        connection.execute(text(statement))
+
+    if not exists:
+        connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    return not exists
+
+
+def fts_available(db: Session) -> bool:
+    """Whether the database has the FTS index"""
+    url = str(db.bind.url)
+    if url in _indexed:
+        return True
+    if db.bind.dialect.name != "sqlite":
+        return False
+    exists = db.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": FTS_TABLE},
+    ).first()
+    if exists:
+        _indexed.add(url)
+    return exists is not None
+
+
+def build_match_query(query: str) -> str:
+    """Turn free text into an FTS5 query matching every token as a prefix"""
+    return " ".join(f'"{token}"*' for token in _TOKEN.findall(query))
+
+
+def search_products(db: Session, query: str, limit: int = 20, offset: int = 0) -> dict:
+    """
+    Search products by description, item code and GPM code.
+
+    Args:
+        db: Database session
+        query: Free text; every token must match as a prefix
+        limit: Page size
+        offset: Rows to skip
+
+    Returns:
+        Dict with the total match count and the requested page of products
+    """
+    match = build_match_query(query)
+    if not match:
+        return {"total": 0, "items": []}
+
+    if not fts_available(db):
+        return _search_products_like(db, query, limit, offset)
+
+    total = db.execute(
+        text(f"SELECT count(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match"),
+        {"match": match},
+    ).scalar()
+    rows = db.execute(
+        text(
+            f"SELECT p.id, p.gpm_code, p.item_code, p.description "
+            f"FROM {FTS_TABLE} JOIN products p ON p.id = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH :match ORDER BY {_RANK} LIMIT :limit OFFSET :offset"
+        ),
+        {"match": match, "limit": limit, "offset": offset},
+    ).all()
+
+    return {
+        "total": total,
+        "items": [
+            {"id": r.id, "gpm_code": r.gpm_code, "item_code": r.item_code, "description": r.description}
+            for r in rows
+        ],
+    }
+
+
+def _search_products_like(db: Session, query: str, limit: int, offset: int) -> dict:
+    """Unranked fallback for databases without FTS5"""
+    filters = [
+        or_(
+            Product.description.ilike(f"%{token}%"),
+            Product.item_code.ilike(f"{token}%"),
+            Product.gpm_code.ilike(f"{token}%"),
+        )
+        for token in _TOKEN.findall(query)
+    ]
+    matches = db.query(Product).filter(*filters)
+    return {
+        "total": matches.count(),
+        "items": [
+            {"id": p.id, "gpm_code": p.gpm_code, "item_code": p.item_code, "description": p.description}
+            for p in matches.order_by(Product.description).limit(limit).offset(offset)
+        ],
+    }
@@ -0,0 +1,225 @@
+"""
+Shared state for multi-worker deployments.
+
+Rate limiting, caches and job status must agree across worker processes,
+so they live behind a small Redis-compatible interface instead of in
+process memory. ``get_state_backend()`` returns:
+
+* a ``redis.Redis`` client when ``INVENTORY_STATE_URL`` is a redis:// URL;
+* otherwise ``SQLiteStateBackend``, a local stand-in implementing the same
+  subset of redis-py methods on a SQLite file shared by all workers on
+  the host.
+
+Only ``get``, ``set`` (with ``ex``/``nx``), ``delete``, ``incr``, ``expire``
+and ``ttl`` are used, with string values, so either backend can be swapped
+in without touching callers. The one compound operation, ``take_token``
+for rate limiting, runs as a Lua script on Redis and in a single
+transaction on SQLite.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+
+STATE_URL = os.getenv("INVENTORY_STATE_URL", "sqlite:///./inventory_state.db")
+
+
+class SQLiteStateBackend:
+    """
+    Redis-like key/value store on a SQLite file.
+
+    Keys carry an optional absolute expiry time and are purged lazily when
+    read. Each thread gets its own connection; WAL mode lets workers read
+    while another writes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS kv ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM kv WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at is not None and expires_at <= time.time():
+            self.delete(key)
+            return None
+        return value
+
+    def set(self, key: str, value: Any, ex: Optional[int] = None, nx: bool = False) -> Optional[bool]:
+        expires_at = time.time() + ex if ex else None
+        conn = self._conn()
+        if nx:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if self.get(key) is not None:
+                    conn.execute("COMMIT")
+                    return None
+                conn.execute(
+                    "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, str(value), expires_at),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return True
+
+        conn.execute(
+            "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, str(value), expires_at),
+        )
+        return True
+
+    def delete(self, *keys: str) -> int:
+        if not keys:
+            return 0
+        placeholders = ",".join("?" * len(keys))
+        return self._conn().execute(f"DELETE FROM kv WHERE key IN ({placeholders})", keys).rowcount
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        now = time.time()
+        # Expired counters restart from zero, like a missing key in Redis
+        row = self._conn().execute(
+            "INSERT INTO kv (key, value, expires_at) VALUES (?, ?, NULL) "
+            "ON CONFLICT(key) DO UPDATE SET "
+            "value = CASE WHEN expires_at IS NOT NULL AND expires_at <= ? "
+            "        THEN excluded.value ELSE CAST(value AS INTEGER) + excluded.value END, "
+            "expires_at = CASE WHEN expires_at IS NOT NULL AND expires_at <= ? "
+            "        THEN NULL ELSE expires_at END "
+            "RETURNING value",
+            (key, amount, now, now),
+        ).fetchone()
+        return int(row[0])
+
+    def expire(self, key: str, seconds: int) -> bool:
+        cursor = self._conn().execute(
+            "UPDATE kv SET expires_at = ? WHERE key = ?", (time.time() + seconds, key)
+        )
+        return cursor.rowcount > 0
+
+    def ttl(self, key: str) -> int:
+        row = self._conn().execute("SELECT expires_at FROM kv WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return -2
+        if row[0] is None:
+            return -1
+        return max(0, int(row[0] - time.time()))
+
+    def take_token(self, key: str, interval: float, burst: int, now: float) -> float:
+        """SQLite counterpart of ``_TAKE_TOKEN_LUA``; see ``take_token``"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, now),
+            ).fetchone()
+            tat = max(float(row[0]) if row else now, now) + interval
+            wait = tat - burst * interval - now
+            if wait <= 0:
+                conn.execute(
+                    "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, repr(tat), tat),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return max(wait, 0.0)
+
+
+# ==================== Backend Selection ====================
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_state_backend():
+    """Return the process-wide shared state backend"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if STATE_URL.startswith(("redis://", "rediss://")):
+                    import redis
+                    _backend = redis.Redis.from_url(STATE_URL, decode_responses=True)
+                else:
+                    _backend = SQLiteStateBackend(STATE_URL.removeprefix("sqlite:///"))
+    return _backend
+
+
+# ==================== Token Buckets ====================
+
+# Same algorithm as SQLiteStateBackend.take_token, atomic inside Redis.
+# Numbers cross the Lua boundary as strings: Lua results are truncated
+# to integers.
+_TAKE_TOKEN_LUA = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local burst = tonumber(ARGV[3])
+local tat = math.max(tonumber(redis.call('GET', KEYS[1]) or now), now) + interval
+local wait = tat - burst * interval - now
+if wait > 0 then
+    return tostring(wait)
+end
+redis.call('SET', KEYS[1], tostring(tat), 'PX', math.ceil((tat - now) * 1000))
+return '0'
+"""
+_take_token_script = None
+
+
+def take_token(key: str, rate: float, burst: int) -> float:
+    """
+    Take one token from the bucket ``key``, refilled at ``rate`` tokens
+    per second up to ``burst``.
+
+    The bucket is stored as a single timestamp (the generic cell rate
+    algorithm): the time at which it would be full again. Each call reads
+    and moves it once, so the cost is O(1) whatever the rate, and an idle
+    bucket simply expires.
+
+    Returns:
+        0 if a token was taken, otherwise seconds until one is available
+    """
+    backend = get_state_backend()
+    interval, now = 1.0 / rate, time.time()
+    if isinstance(backend, SQLiteStateBackend):
+        return backend.take_token(key, interval, burst, now)
+
+    global _take_token_script
+    if _take_token_script is None:
+        _take_token_script = backend.register_script(_TAKE_TOKEN_LUA)
+    return float(_take_token_script(keys=[key], args=[now, interval, burst]))
+
+
+# ==================== JSON Helpers ====================
+
+def get_json(key: str) -> Optional[Any]:
+    """Read a JSON value (cache entry, job status) from shared state"""
+    value = get_state_backend().get(key)
+    return json.loads(value) if value is not None else None
+
+
+def set_json(key: str, value: Any, ttl: Optional[int] = None):
+    """Store a JSON value in shared state, optionally expiring after ``ttl`` seconds"""
+    get_state_backend().set(key, json.dumps(value, default=str), ex=ttl)
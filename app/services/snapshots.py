@@ -0,0 +1,328 @@
+"""
+Daily stock snapshots stored as Arrow IPC files.
+
+Each run collects the current stock state (master stock plus per-shop
+consignment stock, units sold and stock value), compares it with the state
+written by the previous run and stores only the rows that changed in a
+date partition:
+
+    <root>/date=2026-03-15/stock.arrow
+
+A full copy of the most recent state is kept in ``<root>/_latest.arrow`` so
+the next run can diff against it without replaying history. Readers
+memory-map the partitions, so trend analysis never touches the live SQLite
+database.
+
+Run once a day from cron or a systemd timer:
+
+    python -m app.services.snapshots --root snapshots
+"""
+import argparse
+import os
+from datetime import date
+from typing import Optional
+
+import pandas as pd
+import pyarrow as pa
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models import (
+    Product, Shop, MasterStock, ConsignmentStock,
+    InvoiceItem, ConsignmentSale,
+)
+
+
+SNAPSHOT_DIR = os.getenv("INVENTORY_SNAPSHOT_DIR", "snapshots")
+SNAPSHOT_FILE = "stock.arrow"
+LATEST_FILE = "_latest.arrow"
+
+# shop_id used for master stock rows
+MASTER_SHOP_ID = 0
+
+KEY_COLUMNS = ["product_id", "shop_id"]
+VALUE_COLUMNS = ["quantity", "sold", "unit_price", "value"]
+
+SNAPSHOT_SCHEMA = pa.schema([
+    ("product_id", pa.int64()),
+    ("shop_id", pa.int64()),
+    ("quantity", pa.int64()),
+    ("sold", pa.int64()),
+    ("unit_price", pa.float64()),
+    ("value", pa.float64()),
+    ("deleted", pa.bool_()),
+    ("snapshot_date", pa.date32()),
+])
+
+
+# ==================== Collecting State ====================
+
+def collect_stock_state(db: Session) -> pd.DataFrame:
+    """
+    Build the current stock state from the database.
+
+    Args:
+        db: Database session
+
+    Returns:
+        DataFrame with one row per (product_id, shop_id). Master stock rows
+        use shop_id 0; ``sold`` on those rows is the total across all shops.
+    """
+    # Latest invoiced rate per product is used as the unit price
+    latest_item = (
+        db.query(func.max(InvoiceItem.id).label("id"))
+        .group_by(InvoiceItem.product_id)
+        .subquery()
+    )
+    prices = dict(
+        db.query(InvoiceItem.product_id, InvoiceItem.rate)
+        .join(latest_item, InvoiceItem.id == latest_item.c.id)
+        .all()
+    )
+
+    sold_by_shop = {
+        (product_id, shop_id): int(qty or 0)
+        for product_id, shop_id, qty in db.query(
+            ConsignmentSale.product_id,
+            ConsignmentSale.shop_id,
+            func.sum(ConsignmentSale.quantity),
+        ).group_by(ConsignmentSale.product_id, ConsignmentSale.shop_id)
+    }
+    sold_total = {}
+    for (product_id, _), qty in sold_by_shop.items():
+        sold_total[product_id] = sold_total.get(product_id, 0) + qty
+
+    rows = []
+    for product_id, qty in (
+        db.query(MasterStock.product_id, func.sum(MasterStock.quantity))
+        .group_by(MasterStock.product_id)
+    ):
+        rows.append((product_id, MASTER_SHOP_ID, int(qty or 0), sold_total.get(product_id, 0)))
+
+    for product_id, shop_id, qty in (
+        db.query(ConsignmentStock.product_id, ConsignmentStock.shop_id, ConsignmentStock.quantity)
+        .join(Shop, Shop.id == ConsignmentStock.shop_id)
+        .join(Product, Product.id == ConsignmentStock.product_id)
+    ):
+        rows.append((product_id, shop_id, int(qty or 0), sold_by_shop.get((product_id, shop_id), 0)))
+
+    df = pd.DataFrame(rows, columns=["product_id", "shop_id", "quantity", "sold"])
+    df = df.astype({"product_id": "int64", "shop_id": "int64", "quantity": "int64", "sold": "int64"})
+    df["unit_price"] = df["product_id"].map(prices).fillna(0.0).astype("float64")
+    df["value"] = df["quantity"] * df["unit_price"]
+    return df.sort_values(KEY_COLUMNS, ignore_index=True)
+
+
+def diff_stock_state(previous: Optional[pd.DataFrame], current: pd.DataFrame) -> pd.DataFrame:
+    """
+    Return the rows of ``current`` that differ from ``previous``.
+
+    Rows that disappeared since the previous state are returned with zero
+    values and ``deleted`` set to True.
+    """
+    if previous is None or previous.empty:
+        changed = current.copy()
+        changed["deleted"] = False
+        return changed
+
+    merged = current.merge(
+        previous[KEY_COLUMNS + VALUE_COLUMNS],
+        on=KEY_COLUMNS,
+        how="outer",
+        suffixes=("", "_prev"),
+        indicator=True,
+    )
+
+    is_new = merged["_merge"] == "left_only"
+    is_gone = merged["_merge"] == "right_only"
+    is_changed = pd.Series(False, index=merged.index)
+    for column in VALUE_COLUMNS:
+        is_changed |= merged[column] != merged[f"{column}_prev"]
+
+    changed = merged[is_new | is_gone | is_changed].copy()
+    changed["deleted"] = changed["_merge"] == "right_only"
+    changed.loc[changed["deleted"], VALUE_COLUMNS] = 0
+    return changed[KEY_COLUMNS + VALUE_COLUMNS + ["deleted"]].astype(
+        {"quantity": "int64", "sold": "int64", "unit_price": "float64", "value": "float64"}
+    )
+
+
+# ==================== Writing ====================
+
+def _partition_path(root: str, snapshot_date: date) -> str:
+    return os.path.join(root, f"date={snapshot_date.isoformat()}", SNAPSHOT_FILE)
+
+
+def _write_table(table: pa.Table, path: str):
+    """Write an Arrow IPC file atomically"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+def _read_table(path: str) -> pa.Table:
+    """Memory-map an Arrow IPC file"""
+    with pa.memory_map(path, "r") as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def _to_table(df: pd.DataFrame, snapshot_date: date) -> pa.Table:
+    df = df.assign(snapshot_date=snapshot_date)
+    return pa.Table.from_pandas(df, schema=SNAPSHOT_SCHEMA, preserve_index=False)
+
+
+def load_latest_state(root: str = SNAPSHOT_DIR) -> tuple[Optional[pd.DataFrame], Optional[date]]:
+    """
+    Load the state written by the most recent snapshot.
+
+    Returns:
+        Tuple of (state DataFrame, snapshot date), or (None, None) if no
+        snapshot has been written yet
+    """
+    path = os.path.join(root, LATEST_FILE)
+    if not os.path.exists(path):
+        return None, None
+
+    df = _read_table(path).to_pandas()
+    if df.empty:
+        return df, None
+    return df, df["snapshot_date"].iloc[0]
+
+
+def write_snapshot(
+    db: Session,
+    root: str = SNAPSHOT_DIR,
+    snapshot_date: Optional[date] = None
+) -> dict:
+    """
+    Write the stock rows that changed since the previous snapshot.
+
+    Args:
+        db: Database session
+        root: Snapshot directory
+        snapshot_date: Partition date (defaults to today)
+
+    Returns:
+        Summary with the partition path and number of changed rows
+
+    Raises:
+        ValueError: If a snapshot for the same or a later date already exists
+    """
+    snapshot_date = snapshot_date or date.today()
+
+    previous, previous_date = load_latest_state(root)
+    if previous_date is not None and snapshot_date <= previous_date:
+        raise ValueError(
+            f"Snapshot for {previous_date.isoformat()} already exists; "
+            "snapshots must be written in date order"
+        )
+
+    current = collect_stock_state(db)
+    changed = diff_stock_state(previous, current)
+
+    path = _partition_path(root, snapshot_date)
+    _write_table(_to_table(changed, snapshot_date), path)
+
+    latest = current.assign(deleted=False)
+    _write_table(_to_table(latest, snapshot_date), os.path.join(root, LATEST_FILE))
+
+    return {
+        "date": snapshot_date.isoformat(),
+        "path": path,
+        "changed_rows": len(changed),
+        "total_rows": len(current),
+    }
+
+
+# ==================== Reading ====================
+
+def list_snapshot_dates(root: str = SNAPSHOT_DIR) -> list[date]:
+    """Return the dates of all snapshot partitions in ascending order"""
+    if not os.path.isdir(root):
+        return []
+
+    dates = []
+    for name in os.listdir(root):
+        if name.startswith("date=") and os.path.exists(os.path.join(root, name, SNAPSHOT_FILE)):
+            dates.append(date.fromisoformat(name[len("date="):]))
+    return sorted(dates)
+
+
+def read_snapshots(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    root: str = SNAPSHOT_DIR,
+    columns: Optional[list[str]] = None
+) -> pa.Table:
+    """
+    Memory-map the change rows of all partitions between two dates.
+
+    Args:
+        start: First partition date (inclusive), or None for the beginning
+        end: Last partition date (inclusive), or None for the latest
+        root: Snapshot directory
+        columns: Optional subset of columns to return
+
+    Returns:
+        Arrow table of change rows ordered by snapshot date. Call
+        ``.to_pandas()`` for a DataFrame.
+    """
+    tables = []
+    for snapshot_date in list_snapshot_dates(root):
+        if start and snapshot_date < start:
+            continue
+        if end and snapshot_date > end:
+            break
+        table = _read_table(_partition_path(root, snapshot_date))
+        tables.append(table.select(columns) if columns else table)
+
+    if not tables:
+        schema = pa.schema([SNAPSHOT_SCHEMA.field(c) for c in columns]) if columns else SNAPSHOT_SCHEMA
+        return schema.empty_table()
+    return pa.concat_tables(tables)
+
+
+def stock_state_as_of(as_of: date, root: str = SNAPSHOT_DIR) -> pd.DataFrame:
+    """
+    Reconstruct the full stock state on a date by replaying change rows.
+
+    Args:
+        as_of: Date to reconstruct
+        root: Snapshot directory
+
+    Returns:
+        DataFrame with one row per (product_id, shop_id) that existed on that date
+    """
+    changes = read_snapshots(end=as_of, root=root).to_pandas()
+    if changes.empty:
+        return changes
+
+    state = changes.drop_duplicates(KEY_COLUMNS, keep="last")
+    state = state[~state["deleted"]]
+    return state.sort_values(KEY_COLUMNS, ignore_index=True)
+
+
+# ==================== CLI ====================
+
+def main(argv: Optional[list[str]] = None):
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Write a daily stock snapshot")
+    parser.add_argument("--root", default=SNAPSHOT_DIR, help="Snapshot directory")
+    parser.add_argument("--date", type=date.fromisoformat, default=None, help="Snapshot date (YYYY-MM-DD)")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        summary = write_snapshot(db, root=args.root, snapshot_date=args.date)
+    finally:
+        db.close()
+
+    print(f"{summary['date']}: {summary['changed_rows']} of {summary['total_rows']} rows changed -> {summary['path']}")
+
+
+if __name__ == "__main__":
+    main()
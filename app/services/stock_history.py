@@ -0,0 +1,272 @@
+"""
+Point-in-time consignment stock balances.
+
+Balances are reconstructed from invoice items (stock sent to a consignment
+shop), stock transfers (moved between shops or returned to master stock)
+and consignment sales (stock sold by the shop). To keep historical
+queries cheap, balances are materialised every ``CHECKPOINT_INTERVAL_DAYS``
+days in ``stock_checkpoints``. Checkpoints are sparse: a run writes only
+the pairs whose balance changed since the previous one, so a pair's
+balance at a checkpoint is its latest row on or before it. A query reads
+those rows plus the deltas since the checkpoint.
+
+Checkpoints are written by the migration step and by a daily job, never
+by a query, so ``/stock/as-of`` stays read-only. Without the job the
+deltas a query replays grow by a day every day; schedule it (see
+``app/serve.py``):
+
+    python -m app.services.stock_history
+"""
+import argparse
+import os
+from datetime import date, timedelta
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models import (
+    Product, Shop, Invoice, InvoiceItem, ConsignmentSale, StockCheckpoint, StockTransfer
+)
+
+
+CHECKPOINT_INTERVAL_DAYS = int(os.getenv("STOCK_CHECKPOINT_INTERVAL_DAYS", "7"))
+
+
+# ==================== Deltas ====================
+
+def _stock_deltas(
+    db: Session,
+    after: Optional[date],
+    up_to: date,
+    shop_id: Optional[int] = None
+) -> dict[tuple[int, int], int]:
+    """
+    Net consignment stock movement per (shop_id, product_id) in (after, up_to].
+    """
+    deltas: dict[tuple[int, int], int] = {}
+
+    received = (
+        db.query(Invoice.shop_id, InvoiceItem.product_id, func.sum(InvoiceItem.quantity))
+        .join(Invoice, Invoice.id == InvoiceItem.invoice_id)
+        .join(Shop, Shop.id == Invoice.shop_id)
+        .filter(Shop.type == "consignment", Invoice.date <= up_to)
+    )
+    sold = (
+        db.query(ConsignmentSale.shop_id, ConsignmentSale.product_id, func.sum(ConsignmentSale.quantity))
+        .filter(ConsignmentSale.date <= up_to)
+    )
+    sent = (
+        db.query(StockTransfer.from_shop_id, StockTransfer.product_id, func.sum(StockTransfer.quantity))
+        .filter(StockTransfer.date <= up_to)
+    )
+    transferred_in = (
+        db.query(StockTransfer.to_shop_id, StockTransfer.product_id, func.sum(StockTransfer.quantity))
+        .filter(StockTransfer.date <= up_to, StockTransfer.to_shop_id != 0)
+    )
+    if after is not None:
+        received = received.filter(Invoice.date > after)
+        sold = sold.filter(ConsignmentSale.date > after)
+        sent = sent.filter(StockTransfer.date > after)
+        transferred_in = transferred_in.filter(StockTransfer.date > after)
+    if shop_id is not None:
+        received = received.filter(Invoice.shop_id == shop_id)
+        sold = sold.filter(ConsignmentSale.shop_id == shop_id)
+        sent = sent.filter(StockTransfer.from_shop_id == shop_id)
+        transferred_in = transferred_in.filter(StockTransfer.to_shop_id == shop_id)
+
+    for sid, pid, qty in received.group_by(Invoice.shop_id, InvoiceItem.product_id):
+        deltas[(sid, pid)] = deltas.get((sid, pid), 0) + int(qty or 0)
+    for sid, pid, qty in transferred_in.group_by(StockTransfer.to_shop_id, StockTransfer.product_id):
+        deltas[(sid, pid)] = deltas.get((sid, pid), 0) + int(qty or 0)
+    for sid, pid, qty in sent.group_by(StockTransfer.from_shop_id, StockTransfer.product_id):
+        deltas[(sid, pid)] = deltas.get((sid, pid), 0) - int(qty or 0)
+    for sid, pid, qty in sold.group_by(ConsignmentSale.shop_id, ConsignmentSale.product_id):
+        deltas[(sid, pid)] = deltas.get((sid, pid), 0) - int(qty or 0)
+
+    return deltas
+
+
+def _first_event_date(db: Session) -> Optional[date]:
+    first_invoice = db.query(func.min(Invoice.date)).scalar()
+    first_sale = db.query(func.min(ConsignmentSale.date)).scalar()
+    first_transfer = db.query(func.min(StockTransfer.date)).scalar()
+    dates = [d for d in (first_invoice, first_sale, first_transfer) if d is not None]
+    return min(dates) if dates else None
+
+
+# ==================== Checkpoints ====================
+
+def checkpoint_floor(day: date, interval: int = CHECKPOINT_INTERVAL_DAYS) -> date:
+    """Return the latest checkpoint date on or before ``day``"""
+    ordinal = day.toordinal()
+    return date.fromordinal(ordinal - ordinal % interval)
+
+
+def _checkpoint_statement(dialect: str):
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    # A concurrent build may have written the same balances already
+    return insert(StockCheckpoint.__table__).on_conflict_do_nothing(
+        index_elements=[StockCheckpoint.shop_id, StockCheckpoint.date, StockCheckpoint.product_id]
+    )
+
+
+def _latest_balances(db: Session, on: date, shop_id: Optional[int] = None) -> dict[tuple[int, int], int]:
+    """Balance per (shop_id, product_id) at checkpoint ``on``, from each pair's latest row"""
+    latest = db.query(
+        StockCheckpoint.shop_id, StockCheckpoint.product_id, func.max(StockCheckpoint.date).label("date")
+    ).filter(StockCheckpoint.date <= on)
+    if shop_id is not None:
+        latest = latest.filter(StockCheckpoint.shop_id == shop_id)
+    latest = latest.group_by(StockCheckpoint.shop_id, StockCheckpoint.product_id).subquery()
+
+    rows = db.query(StockCheckpoint.shop_id, StockCheckpoint.product_id, StockCheckpoint.quantity).join(
+        latest,
+        (StockCheckpoint.shop_id == latest.c.shop_id)
+        & (StockCheckpoint.product_id == latest.c.product_id)
+        & (StockCheckpoint.date == latest.c.date),
+    )
+    return {(sid, pid): qty for sid, pid, qty in rows}
+
+
+def build_checkpoints(
+    db: Session,
+    up_to: Optional[date] = None,
+    interval: int = CHECKPOINT_INTERVAL_DAYS
+) -> int:
+    """
+    Materialise missing checkpoints up to ``up_to``.
+
+    Only days that are already over (before today) are checkpointed, since
+    later invoices or sales may still change today's balance. Each
+    checkpoint holds only the pairs whose balance changed since the
+    previous one.
+
+    Args:
+        db: Database session
+        up_to: Last day that may be checkpointed (defaults to yesterday)
+        interval: Days between checkpoints
+
+    Returns:
+        Number of checkpoint rows written
+    """
+    yesterday = date.today() - timedelta(days=1)
+    up_to = min(up_to or yesterday, yesterday)
+    target = checkpoint_floor(up_to, interval)
+
+    last = db.query(func.max(StockCheckpoint.date)).scalar()
+    if last is not None:
+        if last >= target:
+            return 0
+        balances = _latest_balances(db, last)
+        next_date = last + timedelta(days=interval)
+    else:
+        first = _first_event_date(db)
+        if first is None:
+            return 0
+        balances = {}
+        next_date = checkpoint_floor(first, interval)
+
+    statement = _checkpoint_statement(db.bind.dialect.name)
+    written = 0
+    while next_date <= target:
+        changed = []
+        for (sid, pid), qty in _stock_deltas(db, last, next_date).items():
+            if qty:
+                balances[(sid, pid)] = balances.get((sid, pid), 0) + qty
+                changed.append({
+                    "shop_id": sid, "product_id": pid, "quantity": balances[(sid, pid)], "date": next_date,
+                })
+
+        if changed:
+            db.execute(statement, changed)
+            written += len(changed)
+        last = next_date
+        next_date += timedelta(days=interval)
+
+    db.commit()
+    return written
+
+
+def invalidate_checkpoints(db: Session, since: date):
+    """
+    Drop checkpoints on or after ``since``.
+
+    Call this after back-dating invoices or sales to a day that has already
+    been checkpointed; the next ``build_checkpoints`` run rebuilds them.
+    """
+    db.query(StockCheckpoint).filter(StockCheckpoint.date >= since).delete(synchronize_session=False)
+    db.commit()
+
+
+# ==================== Queries ====================
+
+def consignment_stock_as_of(db: Session, shop_id: int, as_of: date) -> list[dict]:
+    """
+    Reconstruct the consignment balances of a shop at the end of a day
+    from the latest checkpoint on or before it. Writes nothing.
+
+    Args:
+        db: Database session
+        shop_id: Consignment shop
+        as_of: Day to reconstruct
+
+    Returns:
+        List of non-zero balances with product details
+    """
+    checkpoint_date = (
+        db.query(func.max(StockCheckpoint.date))
+        .filter(StockCheckpoint.date <= as_of)
+        .scalar()
+    )
+
+    balances: dict[int, int] = {}
+    if checkpoint_date is not None:
+        for (_, pid), qty in _latest_balances(db, checkpoint_date, shop_id=shop_id).items():
+            balances[pid] = qty
+
+    for (_, pid), qty in _stock_deltas(db, checkpoint_date, as_of, shop_id=shop_id).items():
+        balances[pid] = balances.get(pid, 0) + qty
+
+    balances = {pid: qty for pid, qty in balances.items() if qty}
+    if not balances:
+        return []
+
+    products = db.query(Product).filter(Product.id.in_(balances)).all()
+    return [
+        {
+            "product_id": p.id,
+            "item_code": p.item_code,
+            "gpm_code": p.gpm_code,
+            "description": p.description,
+            "quantity": balances[p.id],
+        }
+        for p in sorted(products, key=lambda p: p.id)
+    ]
+
+
+# ==================== CLI ====================
+
+def main(argv: Optional[list[str]] = None):
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Materialise consignment stock checkpoints")
+    parser.add_argument("--up-to", type=date.fromisoformat, default=None,
+                        help="Last day to checkpoint (YYYY-MM-DD, defaults to yesterday)")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        written = build_checkpoints(db, up_to=args.up_to)
+    finally:
+        db.close()
+
+    print(f"{written} checkpoint row(s) written")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Delta sync for clients keeping a local replica.
+
+Every insert, update and delete on the synced tables is recorded by
+triggers in ``sync_changes``, one row per table row: rewriting the entry
+gives it the next ``version`` from an AUTOINCREMENT key, so versions only
+grow and the entry doubles as the row's version and, after a delete, its
+tombstone. Triggers see every write path alike (ORM, bulk executemany,
+raw SQL), so nothing in the handlers has to remember to bump a version.
+
+``/sync?since=<cursor>`` pages through the entries above the cursor in
+version order and joins in the current rows; the last version returned
+is the next cursor. A client starting from 0 receives every row, since
+the migration records the rows that existed before the triggers. SQLite
+serialises writers, so versions are committed in order and a cursor
+never skips a change that commits later.
+
+Like product search this relies on SQLite triggers; on other databases
+``ensure_sync_triggers`` is a no-op.
+"""
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.models import (
+    Product, Shop, MasterStock, ConsignmentStock, Invoice, InvoiceItem, SyncChange,
+)
+
+
+SYNC_MODELS = {
+    model.__tablename__: model
+    for model in (Product, Shop, MasterStock, ConsignmentStock, Invoice, InvoiceItem)
+}
+SYNC_TABLE = SyncChange.__tablename__
+PAGE_SIZE = 1000
+
+
+def _trigger_ddl(table: str) -> list[str]:
+    # Delete then insert rather than INSERT OR REPLACE: an outer upsert's
+    # conflict policy would override the trigger's REPLACE
+    record = (
+        f"DELETE FROM {SYNC_TABLE} WHERE table_name = '{table}' AND row_id = {{row}}.id; "
+        f"INSERT INTO {SYNC_TABLE} (table_name, row_id, deleted, changed_at) "
+        f"VALUES ('{table}', {{row}}.id, {{deleted}}, CURRENT_TIMESTAMP);"
+    )
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {table}_sync_ai AFTER INSERT ON {table} BEGIN "
+        f"{record.format(row='new', deleted=0)} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_sync_au AFTER UPDATE ON {table} BEGIN "
+        f"{record.format(row='new', deleted=0)} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_sync_ad AFTER DELETE ON {table} BEGIN "
+        f"{record.format(row='old', deleted=1)} END",
+    ]
+
+
+def ensure_sync_triggers(connection: Connection) -> list[str]:
+    """
+    Create the change triggers that are missing, first recording the rows
+    their table already holds. No-op on databases other than SQLite.
+
+    Returns:
+        Tables whose triggers were created
+    """
+    if connection.dialect.name != "sqlite":
+        return []
+
+    existing = set(connection.execute(
+        text("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE '%_sync_a_'")
+    ).scalars())
+
+    created = []
+    for table in SYNC_MODELS:
+        if f"{table}_sync_ai" in existing:
+            continue
+        connection.execute(text(
+            f"INSERT OR IGNORE INTO {SYNC_TABLE} (table_name, row_id, deleted, changed_at) "
+            f"SELECT '{table}', id, 0, CURRENT_TIMESTAMP FROM {table}"
+        ))
+        for statement in _trigger_ddl(table):
+            connection.execute(text(statement))
+        created.append(table)
+    return created
+
+
+def _serialise(row) -> dict:
+    return {
+        key: value.isoformat() if hasattr(value, "isoformat") else value
+        for key, value in row._mapping.items()
+    }
+
+
+def changes_since(db: Session, since: int = 0, limit: int = PAGE_SIZE, tables: Optional[set[str]] = None) -> dict:
+    """
+    Rows inserted, changed or deleted after version ``since``.
+
+    Args:
+        db: Database session
+        since: Cursor from the previous call (0 for a full sync)
+        limit: Maximum changes per page
+        tables: Only these synced tables
+
+    Returns:
+        Dict with the next ``cursor``, ``has_more``, ``changes`` (table ->
+        current rows, each with its ``version``) and ``deleted`` (table ->
+        [{id, version}])
+    """
+    query = (
+        db.query(SyncChange.version, SyncChange.table_name, SyncChange.row_id, SyncChange.deleted)
+        .filter(SyncChange.version > since)
+        .order_by(SyncChange.version)
+    )
+    if tables is not None:
+        query = query.filter(SyncChange.table_name.in_(tables))
+    entries = query.limit(limit + 1).all()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    versions: dict[str, dict[int, int]] = {}
+    deleted: dict[str, list[dict]] = {}
+    for version, table, row_id, is_deleted in entries:
+        if table not in SYNC_MODELS:
+            continue
+        if is_deleted:
+            deleted.setdefault(table, []).append({"id": row_id, "version": version})
+        else:
+            versions.setdefault(table, {})[row_id] = version
+
+    changes = {}
+    for table, row_versions in versions.items():
+        model = SYNC_MODELS[table]
+        rows = db.execute(
+            model.__table__.select().where(model.__table__.c.id.in_(list(row_versions)))
+        ).all()
+        changes[table] = sorted(
+            ({**_serialise(row), "version": row_versions[row.id]} for row in rows),
+            key=lambda row: row["version"],
+        )
+
+    return {
+        "cursor": entries[-1].version if entries else since,
+        "has_more": has_more,
+        "changes": changes,
+        "deleted": deleted,
+    }
@@ -0,0 +1,192 @@
+"""
+Consignment stock transfers between shops and returns to master stock.
+
+Master stock counts every unit we own, including units on consignment
+(sales reduce both), so a transfer only moves consignment stock: the
+source shop is debited and the destination shop credited, or nothing is
+credited for a return to master.
+
+A batch of any size is applied in one transaction with a fixed number of
+statements:
+
+* one lookup each for the shops and products named in the batch;
+* one read of the source rows, validating every debit up front so a
+  rejected batch reports all of its shortfalls and changes nothing;
+* one guarded ``UPDATE`` executemany for the debits (the guard catches
+  stock sold between the read and the write);
+* one ``INSERT ... ON CONFLICT (shop_id, product_id) DO UPDATE``
+  executemany for the credits;
+* one insert of the ``StockTransfer`` history rows, which the as-of
+  reconstruction in ``stock_history`` replays.
+"""
+import uuid
+from datetime import date
+from typing import Iterable, Optional
+
+from sqlalchemy import insert, text
+from sqlalchemy.orm import Session
+
+from app.models import Product, Shop, ConsignmentStock, StockTransfer
+from app.services import events, reorder
+
+
+class TransferError(ValueError):
+    """A batch was rejected; ``problems`` lists every offending line"""
+
+    def __init__(self, message: str, problems: list[dict]):
+        super().__init__(message)
+        self.problems = problems
+
+
+def _credit_statement(dialect: str):
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+    stmt = dialect_insert(ConsignmentStock.__table__)
+    return stmt.on_conflict_do_update(
+        index_elements=[ConsignmentStock.shop_id, ConsignmentStock.product_id],
+        set_={"quantity": ConsignmentStock.__table__.c.quantity + stmt.excluded.quantity},
+    )
+
+
+def ensure_consignment_rows(db: Session, shop_id: int, product_ids: Iterable[int]):
+    """
+    Create empty stock rows for products the shop does not hold yet.
+
+    Concurrent invoice uploads to one shop may add the same products; the
+    unique index settles which insert wins instead of failing the other.
+    """
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+    rows = [{"shop_id": shop_id, "product_id": product_id, "quantity": 0} for product_id in product_ids]
+    if rows:
+        db.execute(dialect_insert(ConsignmentStock.__table__).on_conflict_do_nothing(
+            index_elements=[ConsignmentStock.shop_id, ConsignmentStock.product_id],
+        ), rows)
+
+
+_DEBIT = text(
+    "UPDATE consignment_stock SET quantity = quantity - :qty "
+    "WHERE shop_id = :shop_id AND product_id = :product_id AND quantity >= :qty"
+)
+
+
+def apply_transfers(db: Session, lines: Iterable[dict], on: Optional[date] = None) -> tuple[dict, list[dict]]:
+    """
+    Validate and apply a batch of transfers in the caller's transaction.
+
+    Args:
+        db: Database session; the caller commits, or rolls back on error
+        lines: Dicts with from_shop, to_shop (None to return to master
+            stock), item_code and qty
+        on: Transfer date (defaults to today)
+
+    Returns:
+        (summary, events): batch id, line and unit counts, and the stock
+        and alert events to publish after commit
+
+    Raises:
+        TransferError: If any line names an unknown or non-consignment
+            shop or product, or a source lacks the stock
+    """
+    lines = list(lines)
+    shop_names = {line["from_shop"] for line in lines} | {line["to_shop"] for line in lines if line["to_shop"]}
+    item_codes = {line["item_code"] for line in lines}
+    shops = {s.name: s for s in db.query(Shop.id, Shop.name, Shop.type).filter(Shop.name.in_(shop_names))}
+    products = dict(db.query(Product.item_code, Product.id).filter(Product.item_code.in_(item_codes)))
+
+    problems = []
+    moves = []  # (from_shop_id, to_shop_id, product_id, qty)
+    for number, line in enumerate(lines, 1):
+        source, target = shops.get(line["from_shop"]), shops.get(line["to_shop"])
+        product_id = products.get(line["item_code"])
+        if source is None or source.type != "consignment":
+            problems.append({"line": number, "error": f"Invalid consignment shop: {line['from_shop']}"})
+        elif line["to_shop"] and (target is None or target.type != "consignment"):
+            problems.append({"line": number, "error": f"Invalid consignment shop: {line['to_shop']}"})
+        elif target is not None and target.id == source.id:
+            problems.append({"line": number, "error": "Source and destination are the same shop"})
+        elif product_id is None:
+            problems.append({"line": number, "error": f"Product not found: {line['item_code']}"})
+        else:
+            to_shop_id = target.id if target is not None else reorder.MASTER_SHOP_ID
+            moves.append((source.id, to_shop_id, product_id, line["qty"]))
+    if problems:
+        raise TransferError("Invalid transfer lines", problems)
+
+    # Net change per (shop, product); a shop may both send and receive a product
+    change: dict[tuple, int] = {}
+    for from_shop_id, to_shop_id, product_id, qty in moves:
+        change[(from_shop_id, product_id)] = change.get((from_shop_id, product_id), 0) - qty
+        if to_shop_id != reorder.MASTER_SHOP_ID:
+            change[(to_shop_id, product_id)] = change.get((to_shop_id, product_id), 0) + qty
+
+    touched_shops = {shop_id for shop_id, _ in change}
+    touched_products = {product_id for _, product_id in change}
+    current = {
+        (shop_id, product_id): quantity
+        for shop_id, product_id, quantity in db.query(
+            ConsignmentStock.shop_id, ConsignmentStock.product_id, ConsignmentStock.quantity
+        ).filter(
+            ConsignmentStock.shop_id.in_(touched_shops),
+            ConsignmentStock.product_id.in_(touched_products),
+        )
+    }
+
+    debits, credits = [], []
+    names = {s.id: s.name for s in shops.values()}
+    codes = {product_id: code for code, product_id in products.items()}
+    for (shop_id, product_id), delta in change.items():
+        on_hand = current.get((shop_id, product_id), 0)
+        if delta < 0 and on_hand + delta < 0:
+            problems.append({
+                "shop": names[shop_id], "item_code": codes[product_id],
+                "available": on_hand, "requested": -delta,
+                "error": "Not enough consignment stock",
+            })
+        elif delta < 0:
+            debits.append({"shop_id": shop_id, "product_id": product_id, "qty": -delta})
+        elif delta > 0:
+            credits.append({"shop_id": shop_id, "product_id": product_id, "quantity": delta})
+    if problems:
+        raise TransferError("Not enough consignment stock", problems)
+
+    if debits:
+        result = db.execute(_DEBIT, debits)
+        if db.bind.dialect.supports_sane_multi_rowcount and result.rowcount != len(debits):
+            raise TransferError("Stock changed during the transfer; retry", [])
+    if credits:
+        db.execute(_credit_statement(db.bind.dialect.name), credits)
+
+    batch_id = uuid.uuid4().hex
+    on = on or date.today()
+    db.execute(insert(StockTransfer), [
+        {
+            "batch_id": batch_id, "from_shop_id": from_shop_id, "to_shop_id": to_shop_id,
+            "product_id": product_id, "quantity": qty, "date": on,
+        }
+        for from_shop_id, to_shop_id, product_id, qty in moves
+    ])
+
+    changes = [
+        events.stock_event(shop_id, product_id, current.get((shop_id, product_id), 0) + delta)
+        for (shop_id, product_id), delta in change.items()
+        if delta
+    ]
+    by_shop: dict[int, set] = {}
+    for shop_id, product_id in change:
+        by_shop.setdefault(shop_id, set()).add(product_id)
+    for shop_id, product_ids in by_shop.items():
+        changes += reorder.evaluate(db, shop_id, product_ids)
+
+    summary = {
+        "batch_id": batch_id,
+        "lines": len(moves),
+        "units": sum(qty for *_, qty in moves),
+    }
+    return summary, changes
@@ -0,0 +1,214 @@
+"""
+Upload staging.
+
+Starlette spools multipart file parts to a temporary file (in memory up
+to 1 MiB, on disk beyond), so an upload never has to be held in worker
+memory. ``receive`` then validates the spooled file before any parser
+touches it:
+
+* it is read once in ``CHUNK_SIZE`` chunks, hashing as it goes and
+  failing as soon as it passes ``MAX_UPLOAD_BYTES``;
+* its type comes from its leading magic bytes, not its filename.
+
+Parsers read the result through ``StagedUpload.open()``, a read-only
+memory map when the file is on disk, so pages are loaded on demand by
+the OS instead of copied into Python buffers.
+
+``UploadSizeLimit`` guards the upload routes before any of that: it
+refuses a request whose Content-Length is over the limit without reading
+the body, and counts the body as it streams in, so a chunked request with
+no Content-Length is cut off with a 413 as soon as it passes the limit
+instead of being spooled in full.
+"""
+import hashlib
+import io
+import mmap
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import BinaryIO, Optional
+
+from fastapi import UploadFile
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+MAX_UPLOAD_BYTES = int(float(os.getenv("INVENTORY_MAX_UPLOAD_MB", "20")) * 1024 * 1024)
+CHUNK_SIZE = 1024 * 1024
+UPLOAD_PATHS = {"/upload-invoice", "/products/import"}
+MULTIPART_OVERHEAD = 64 * 1024  # boundaries and part headers around the file
+
+# Leading bytes of each format; PDF readers accept a header anywhere in
+# the first kilobyte
+_MAGIC = (
+    ("pdf", b"%PDF-"),
+    ("xlsx", b"PK\x03\x04"),
+    ("xls", b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"),
+)
+
+
+class UploadTooLarge(ValueError):
+    """The upload exceeds ``MAX_UPLOAD_BYTES``"""
+
+
+class _BodyTooLarge(Exception):
+    """Raised from ``receive`` to stop reading a request body over the limit"""
+
+
+class _MappedFile(mmap.mmap):
+    """
+    Read-only memory map with the file methods zipfile (xlsx) and
+    io.TextIOWrapper (CSV) expect
+    """
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def writable(self) -> bool:
+        return False
+
+
+class StagedUpload:
+    """A validated upload: its spooled file, size, SHA-256 and sniffed type"""
+
+    def __init__(self, file: BinaryIO, filename: str, size: int, sha256: str, kind: Optional[str]):
+        self.file = file
+        self.filename = filename
+        self.size = size
+        self.sha256 = sha256
+        self.kind = kind
+
+    @contextmanager
+    def open(self):
+        """
+        File-like view for a parser, positioned at the start: a read-only
+        memory map if the file was spooled to disk, else the file itself.
+        """
+        self.file.seek(0)
+        if self.size == 0 or not _on_disk(self.file):
+            yield self.file
+            return
+        try:
+            mapped = _MappedFile(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (AttributeError, OSError, ValueError):
+            yield self.file
+            return
+        with mapped:
+            yield mapped
+
+
+def _on_disk(file: BinaryIO) -> bool:
+    """Whether a file is backed by a real file that can be memory mapped"""
+    if isinstance(file, tempfile.SpooledTemporaryFile):
+        # A spool still in memory holds a BytesIO, and asking it for a
+        # fileno would write it to disk; there is no public way to tell
+        return not isinstance(file._file, io.BytesIO)
+    return not isinstance(file, io.BytesIO)
+
+
+def sniff(head: bytes) -> Optional[str]:
+    """File type from its first bytes, or None if unrecognised"""
+    for kind, magic in _MAGIC:
+        if kind == "pdf" and magic in head[:1024]:
+            return kind
+        if head.startswith(magic):
+            return kind
+    return None
+
+
+def _body_limit() -> int:
+    return MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD
+
+
+def too_large(content_length: Optional[str]) -> bool:
+    """Whether a request's Content-Length already rules its upload out"""
+    try:
+        return int(content_length) > _body_limit()
+    except (TypeError, ValueError):
+        return False
+
+
+class UploadSizeLimit:
+    """
+    ASGI middleware answering 413 for upload requests over the limit, from
+    the Content-Length header or, without one, while the body streams in.
+    """
+
+    def __init__(self, app: ASGIApp, paths: set[str] = UPLOAD_PATHS):
+        self.app = app
+        self.paths = paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        if too_large(Headers(scope=scope).get("content-length")):
+            await self._refuse(scope, receive, send)
+            return
+
+        received = 0
+        started = overflowed = False
+
+        async def counting_receive() -> Message:
+            nonlocal received, overflowed
+            if not overflowed:
+                message = await receive()
+                if message["type"] != "http.request":
+                    return message
+                received += len(message.get("body", b""))
+                overflowed = received > _body_limit()
+                if not overflowed:
+                    return message
+            raise _BodyTooLarge()
+
+        async def guarded_send(message: Message):
+            nonlocal started
+            # Body parsing turns the cut-off into its own error; replace it
+            if not overflowed:
+                started = started or message["type"] == "http.response.start"
+                await send(message)
+
+        try:
+            await self.app(scope, counting_receive, guarded_send)
+        except Exception:
+            if not overflowed:
+                raise
+        if overflowed and not started:
+            await self._refuse(scope, receive, send)
+
+    @staticmethod
+    async def _refuse(scope: Scope, receive: Receive, send: Send):
+        response = JSONResponse(
+            status_code=413,
+            content={"detail": f"Upload exceeds the {MAX_UPLOAD_BYTES / (1024 * 1024):g} MB limit"},
+        )
+        await response(scope, receive, send)
+
+
+def receive(upload: UploadFile, max_bytes: Optional[int] = None) -> StagedUpload:
+    """
+    Hash, measure and sniff an uploaded file in one chunked pass.
+
+    Raises:
+        UploadTooLarge: As soon as more than ``max_bytes`` (default
+            ``MAX_UPLOAD_BYTES``) have been read
+    """
+    max_bytes = max_bytes or MAX_UPLOAD_BYTES
+    source = upload.file
+    source.seek(0)
+    digest = hashlib.sha256()
+    size = 0
+    head = b""
+    while chunk := source.read(CHUNK_SIZE):
+        if not head:
+            head = chunk[:1024]
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadTooLarge(f"Upload exceeds the {max_bytes / (1024 * 1024):g} MB limit")
+        digest.update(chunk)
+    source.seek(0)
+    return StagedUpload(source, upload.filename or "", size, digest.hexdigest(), sniff(head))
@@ -0,0 +1,110 @@
+"""
+Startup import-time check.
+
+Imports ``main`` in a fresh interpreter with ``python -X importtime`` and
+fails if the cumulative import time exceeds a budget or if any heavy
+library that should load lazily (pandas, reportlab, pdfplumber, pyarrow)
+was imported at startup:
+
+    python -m benchmarks.import_time --max-ms 1200
+
+The framework (FastAPI, SQLAlchemy) is most of the total and its cost
+tracks the machine, so it is also imported on its own; what remains is
+the application's share, with a budget of its own that holds on slow or
+busy machines too.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAZY_MODULES = ("pandas", "reportlab", "pdfplumber", "pyarrow", "numpy")
+DEFAULT_BUDGET_MS = 1200.0  # FastAPI itself accounts for most of this
+APP_BUDGET_MS = 300.0
+FRAMEWORK_MODULES = ("fastapi", "sqlalchemy.orm")
+
+
+def _import_timings(code: str, env: dict) -> dict:
+    """{name: (depth, cumulative us)} from one ``-X importtime`` run"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        name = name[1:]
+        depth = (len(name) - len(name.lstrip())) // 2
+        timings[name.strip()] = (depth, int(cumulative))
+    return timings
+
+
+def measure_import(module: str = "main", runs: int = 3) -> dict:
+    """
+    Import ``module`` in fresh interpreters and return the fastest run.
+
+    Returns:
+        Dict with total_ms, framework_ms (the framework imported alone),
+        app_ms (the difference), the slowest top-level imports and any
+        lazy modules that were imported eagerly
+    """
+    best = None
+    framework_us = None
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'startup.db')}")
+        for _ in range(runs):
+            timings = _import_timings(f"import {module}", env)
+            if best is None or timings[module][1] < best[module][1]:
+                best = timings
+            baseline = _import_timings(f"import {', '.join(FRAMEWORK_MODULES)}", env)
+            us = sum(cumulative for depth, cumulative in baseline.values() if depth == 0)
+            framework_us = us if framework_us is None else min(framework_us, us)
+
+    # Direct imports of the module sit one level below it
+    depth = best[module][0] + 1
+    direct = [(name, us) for name, (d, us) in best.items() if d == depth]
+    slowest = sorted(direct, key=lambda item: item[1], reverse=True)[:10]
+    return {
+        "total_ms": best[module][1] / 1000,
+        "framework_ms": framework_us / 1000,
+        "app_ms": max(best[module][1] - framework_us, 0) / 1000,
+        "slowest": {name: us / 1000 for name, us in slowest},
+        "eager_heavy_modules": sorted(name for name in best if name in LAZY_MODULES),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check application import time")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--max-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--max-app-ms", type=float, default=APP_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    result = measure_import(args.module, args.runs)
+    print(f"import {args.module}: {result['total_ms']:.0f} ms (budget {args.max_ms:.0f} ms)")
+    print(f"  framework alone: {result['framework_ms']:.0f} ms, "
+          f"application: {result['app_ms']:.0f} ms (budget {args.max_app_ms:.0f} ms)")
+    for name, ms in result["slowest"].items():
+        print(f"  {name:<40}{ms:>8.0f} ms")
+
+    failed = False
+    if result["eager_heavy_modules"]:
+        print(f"Heavy modules imported at startup: {', '.join(result['eager_heavy_modules'])}")
+        failed = True
+    if result["total_ms"] > args.max_ms:
+        print("Import time is over budget")
+        failed = True
+    if result["app_ms"] > args.max_app_ms:
+        print("Application import time is over budget")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+"""
+HTTP load-testing harness for the FastAPI app.
+
+Starts uvicorn against a throwaway database filled by the synthetic data
+generator (or targets a running instance with --url), then drives N
+concurrent authenticated clients through a weighted mix of scenarios:
+
+    login      POST /login
+    dashboard  the summary call the dashboard makes on every load
+    upload     POST /upload-invoice with a generated GPM invoice PDF
+               for a consignment shop
+    sale       POST /consignment/sale against stock that exists
+
+Throughput, error rate and p50/p95/p99 latency are reported per route.
+Results can be saved and compared with a baseline to gate releases on
+regressions in latency, throughput or errors:
+
+    python -m benchmarks.load_test --clients 50 --duration 30 \\
+        --mix login=1,dashboard=6,upload=1,sale=2 --json run.json
+    python -m benchmarks.load_test --baseline run.json --max-regression 0.2
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Optional
+
+import httpx
+
+
+DASHBOARD_ROUTES = ["/dashboard/summary"]
+DEFAULT_MIX = "login=1,dashboard=6,upload=1,sale=2"
+ADMIN_CREDENTIALS = {"username": "admin", "password": "admin123"}
+
+
+# ==================== Helpers ====================
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Return the ``pct`` percentile of ``samples`` (nearest rank)"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def parse_mix(text: str) -> dict[str, int]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario: {name}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def prepare_database(path: str, args) -> list[str]:
+    """
+    Fill a fresh database with synthetic data, migrate it as a deployment
+    would (search index, sync triggers, alerts) and emit invoice PDFs.
+
+    Returns:
+        Paths of the generated invoice PDFs
+    """
+    from benchmarks.synthetic import generate_database, generate_invoice_pdfs
+
+    url = f"sqlite:///{path}"
+    generate_database(
+        url,
+        shops=args.shops,
+        products=args.products,
+        invoices=args.products // 10,
+        sales=args.products * 10,
+    )
+    # In a subprocess: this process's app engine is bound to the default URL
+    subprocess.run([sys.executable, "-m", "app.migrate"], env=dict(os.environ, DATABASE_URL=url), check=True)
+    if not args.mix.get("upload"):
+        return []
+    # Replayed at random for the whole run: invoices to consignment shops
+    # only credit the shop, so replays never run master stock short and a
+    # healthy server answers every upload with 200
+    pdf_dir = os.path.join(os.path.dirname(path), "invoices")
+    return generate_invoice_pdfs(url, pdf_dir, count=20, lines_per_invoice=20, shop_type="consignment")
+
+
+def sale_candidates(path: str, limit: int = 2000) -> list[dict]:
+    """Pick (shop, item) pairs that have consignment stock to sell"""
+    conn = sqlite3.connect(path)
+    rows = conn.execute(
+        "SELECT s.name, p.item_code FROM consignment_stock cs "
+        "JOIN shops s ON s.id = cs.shop_id JOIN products p ON p.id = cs.product_id "
+        "WHERE s.type = 'consignment' AND cs.quantity > 10 ORDER BY cs.quantity DESC LIMIT ?",
+        (limit,),
+    ).fetchall()
+    conn.close()
+    return [{"shop_name": shop, "item_code": code, "qty": 1} for shop, code in rows]
+
+
+def start_server(db_path: str, port: int, workers: int = 1) -> subprocess.Popen:
+    # Every simulated client logs in as admin, so per-user limits would
+    # throttle the whole run
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", INVENTORY_RATE_LIMIT="0")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        env=env,
+    )
+
+
+async def wait_until_ready(base_url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not start within {timeout}s")
+
+
+async def login(client: httpx.AsyncClient) -> str:
+    response = await client.post("/login", json=ADMIN_CREDENTIALS)
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+# ==================== Scenarios ====================
+
+class Recorder:
+    """Latency samples and error counts per route"""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+
+    async def call(self, route: str, request) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await request
+        except httpx.TransportError:
+            response = None
+        elapsed = time.perf_counter() - start
+
+        if response is not None and response.status_code < 400:
+            self.latencies.setdefault(route, []).append(elapsed)
+        else:
+            self.errors[route] = self.errors.get(route, 0) + 1
+        return response
+
+
+async def scenario_login(client, headers, recorder, context):
+    await recorder.call("POST /login", client.post("/login", json=ADMIN_CREDENTIALS))
+
+
+async def scenario_dashboard(client, headers, recorder, context):
+    await asyncio.gather(*(
+        recorder.call(f"GET {route}", client.get(route, headers=headers))
+        for route in DASHBOARD_ROUTES
+    ))
+
+
+async def scenario_upload(client, headers, recorder, context):
+    path = random.choice(context["invoices"])
+    with open(path, "rb") as f:
+        payload = f.read()
+    await recorder.call("POST /upload-invoice", client.post(
+        "/upload-invoice",
+        headers=headers,
+        files={"file": (os.path.basename(path), payload, "application/pdf")},
+    ))
+
+
+async def scenario_sale(client, headers, recorder, context):
+    await recorder.call("POST /consignment/sale", client.post(
+        "/consignment/sale", headers=headers, json=random.choice(context["sales"]),
+    ))
+
+
+SCENARIOS = {
+    "login": scenario_login,
+    "dashboard": scenario_dashboard,
+    "upload": scenario_upload,
+    "sale": scenario_sale,
+}
+
+
+# ==================== Load ====================
+
+async def run_clients(
+    base_url: str,
+    clients: int,
+    duration: float,
+    mix: dict[str, int],
+    context: dict
+) -> Recorder:
+    """Drive ``clients`` concurrent sessions through the scenario mix"""
+    recorder = Recorder()
+    names = [name for name in mix if mix[name] > 0 and (name != "upload" or context["invoices"])]
+    names = [name for name in names if name != "sale" or context["sales"]]
+    weights = [mix[name] for name in names]
+
+    limits = httpx.Limits(max_connections=clients * 4, max_keepalive_connections=clients * 4)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120.0) as client:
+        # The first admin login creates the user; do it before sessions race on it
+        await login(client)
+        deadline = time.monotonic() + duration
+
+        async def session():
+            headers = {"Authorization": f"Bearer {await login(client)}"}
+            while time.monotonic() < deadline:
+                name = random.choices(names, weights)[0]
+                await SCENARIOS[name](client, headers, recorder, context)
+
+        await asyncio.gather(*(session() for _ in range(clients)))
+
+    return recorder
+
+
+def error_rate(row: dict) -> float:
+    total = row["requests"] + row["errors"]
+    return row["errors"] / total if total else 0.0
+
+
+def summarize(recorder: Recorder, duration: float) -> dict[str, dict]:
+    routes = sorted(set(recorder.latencies) | set(recorder.errors))
+    summary = {}
+    for route in routes:
+        samples = recorder.latencies.get(route, [])
+        summary[route] = {
+            "requests": len(samples),
+            "errors": recorder.errors.get(route, 0),
+            "rps": len(samples) / duration,
+            "p50_ms": percentile(samples, 50) * 1000,
+            "p95_ms": percentile(samples, 95) * 1000,
+            "p99_ms": percentile(samples, 99) * 1000,
+        }
+        summary[route]["error_rate"] = error_rate(summary[route])
+    return summary
+
+
+def report(summary: dict[str, dict]):
+    print(f"{'route':<28}{'requests':>10}{'errors':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for route, row in summary.items():
+        print(
+            f"{route:<28}{row['requests']:>10}{row['errors']:>8}{row['rps']:>9.1f}"
+            f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}"
+        )
+
+
+def regressions(summary: dict, baseline: dict, max_regression: float, max_error_rate: float) -> list[str]:
+    """
+    Return routes that got worse than the baseline:
+
+    * error rate up by more than ``max_error_rate`` (also for new routes);
+    * successful requests per second down by more than ``max_regression``;
+    * p95/p99 latency up by more than ``max_regression``.
+
+    Latency only covers successful requests, so a run that mostly fails
+    is caught by the first two checks.
+    """
+    problems = []
+    for route in sorted(baseline.keys() - summary.keys()):
+        problems.append(f"{route}: no requests")
+    for route, row in summary.items():
+        before = baseline.get(route)
+        errors_before = error_rate(before) if before else 0.0
+        if error_rate(row) > errors_before + max_error_rate:
+            problems.append(f"{route} error rate: {errors_before:.1%} -> {error_rate(row):.1%}")
+        if not before:
+            continue
+        if before["rps"] and row["rps"] < before["rps"] * (1 - max_regression):
+            problems.append(f"{route} rps: {before['rps']:.1f} -> {row['rps']:.1f}")
+        for key in ("p95_ms", "p99_ms"):
+            if before[key] and row[key] > before[key] * (1 + max_regression):
+                problems.append(f"{route} {key}: {before[key]:.1f} -> {row[key]:.1f}")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP load test with a scenario mix")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"Scenario weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--products", type=int, default=500, help="Synthetic catalog size")
+    parser.add_argument("--shops", type=int, default=50, help="Synthetic shop count")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--url", help="Target a running instance instead of starting one "
+                                      "(upload and sale scenarios are skipped)")
+    parser.add_argument("--json", help="Write the per-route summary to this file")
+    parser.add_argument("--baseline", help="Compare with a summary written by --json")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="Allowed p95/p99 growth and rps drop against the baseline (0.2 = 20%%)")
+    parser.add_argument("--max-error-rate", type=float, default=0.01,
+                        help="Allowed error rate growth over the baseline (0.01 = 1 point)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server = None
+        if args.url:
+            base_url = args.url.rstrip("/")
+            context = {"invoices": [], "sales": []}
+        else:
+            db_path = os.path.join(tmp, "load.db")
+            invoices = prepare_database(db_path, args)
+            context = {"invoices": invoices, "sales": sale_candidates(db_path)}
+            port = free_port()
+            server = start_server(db_path, port, args.workers)
+            base_url = f"http://127.0.0.1:{port}"
+
+        try:
+            asyncio.run(wait_until_ready(base_url))
+            recorder = asyncio.run(run_clients(base_url, args.clients, args.duration, args.mix, context))
+        finally:
+            if server:
+                server.terminate()
+                server.wait()
+
+    summary = summarize(recorder, args.duration)
+    report(summary)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = regressions(summary, json.load(f), args.max_regression, args.max_error_rate)
+        if problems:
+            print("Regressions:\n  " + "\n  ".join(problems))
+            sys.exit(1)
+        print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
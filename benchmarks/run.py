@@ -0,0 +1,336 @@
+"""
+Benchmark suite for the inventory backend.
+
+Suites:
+    parser  - parse_invoice_pdf throughput over the real invoice corpus
+              (Data/March plus the sample invoices in the repo root)
+    upload  - end-to-end POST /upload-invoice latency for the same corpus
+    list    - list endpoint throughput at growing synthetic table sizes
+    export  - Excel and PDF stock export time at the same sizes
+    startup - import time of the app module (see benchmarks.import_time)
+
+Everything runs in-process against a throwaway SQLite database. Results
+are written as JSON so runs can be compared across commits:
+
+    python -m benchmarks.run --suites parser,upload --output benchmarks/results
+    python -m benchmarks.run --compare benchmarks/results/a.json benchmarks/results/b.json
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS_GLOBS = [
+    os.path.join(REPO_ROOT, "Data", "March", "*.pdf"),
+    os.path.join(REPO_ROOT, "Invoice GPM-*.pdf"),
+]
+SUITES = ["startup", "parser", "upload", "list", "export"]
+LIST_ROUTES = ["/products", "/stock/master", "/invoices", "/stock-movements"]
+
+
+# ==================== Helpers ====================
+
+def corpus_files() -> list[str]:
+    files = []
+    for pattern in CORPUS_GLOBS:
+        files.extend(sorted(glob.glob(pattern)))
+    return files
+
+
+def summarize(samples: list[float]) -> dict:
+    """Summary statistics in milliseconds"""
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def make_client():
+    """Migrate DATABASE_URL, import the app and return a logged-in test client"""
+    from fastapi.testclient import TestClient
+    from app.migrate import migrate
+    import main
+
+    migrate()
+
+    client = TestClient(main.app)
+    response = client.post("/login", json={"username": "admin", "password": "admin123"})
+    response.raise_for_status()
+    client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+    return client
+
+
+def grow_tables(db_path: str, rows: int):
+    """
+    Grow products, master stock, invoices and sales to ``rows`` rows each
+    (invoices to a tenth of that).
+    """
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT OR IGNORE INTO shops (id, name, type) VALUES (1, 'N_Benchmark', 'consignment')")
+
+    start = conn.execute("SELECT COALESCE(MAX(id), 0) FROM products").fetchone()[0] + 1
+    new_ids = range(start, rows + 1)
+    conn.executemany(
+        "INSERT INTO products (id, gpm_code, item_code, description) VALUES (?, ?, ?, ?)",
+        ((i, f"9{i:09d}", f"B{i:08d}", f"BENCHMARK PRODUCT {i}") for i in new_ids),
+    )
+    conn.executemany(
+        "INSERT INTO master_stock (product_id, quantity) VALUES (?, ?)",
+        ((i, 1000) for i in new_ids),
+    )
+
+    start = conn.execute("SELECT COALESCE(MAX(id), 0) FROM invoices").fetchone()[0] + 1
+    conn.executemany(
+        "INSERT INTO invoices (id, invoice_no, shop_id, date) VALUES (?, ?, 1, DATE('now'))",
+        ((i, f"BENCH-{i}") for i in range(start, rows // 10 + 1)),
+    )
+
+    start = conn.execute("SELECT COALESCE(MAX(id), 0) FROM consignment_sales").fetchone()[0] + 1
+    conn.executemany(
+        "INSERT INTO consignment_sales (id, shop_id, product_id, quantity, date) VALUES (?, 1, ?, 1, DATE('now'))",
+        ((i, i) for i in range(start, rows + 1)),
+    )
+    conn.commit()
+    conn.close()
+
+
+# ==================== Suites ====================
+
+def bench_parser(files: list[str]) -> dict:
+    import pdfplumber
+    from app.services.pdf_parser import parse_invoice_pdf
+
+    per_file, per_page = [], []
+    total_pages = 0
+    for path in files:
+        with pdfplumber.open(path) as pdf:
+            pages = len(pdf.pages)
+        with open(path, "rb") as f:
+            start = time.perf_counter()
+            parse_invoice_pdf(f)
+            elapsed = time.perf_counter() - start
+        per_file.append(elapsed)
+        per_page.append(elapsed / max(pages, 1))
+        total_pages += pages
+
+    total = sum(per_file)
+    return {
+        "files": len(files),
+        "pages": total_pages,
+        "files_per_second": len(files) / total,
+        "pages_per_second": total_pages / total,
+        "per_file": summarize(per_file),
+        "per_page": summarize(per_page),
+    }
+
+
+def bench_upload(client, db_path: str, files: list[str]) -> dict:
+    from app.services.pdf_parser import parse_invoice_pdf
+
+    # Seed every item code in the corpus so each line goes through ingestion
+    codes = set()
+    for path in files:
+        with open(path, "rb") as f:
+            codes.update(item["item_code"] for item in parse_invoice_pdf(f)[2])
+    conn = sqlite3.connect(db_path)
+    for code in sorted(codes):
+        cursor = conn.execute(
+            "INSERT INTO products (gpm_code, item_code, description) VALUES (?, ?, ?)",
+            (code, code, f"CORPUS {code}"),
+        )
+        conn.execute("INSERT INTO master_stock (product_id, quantity) VALUES (?, ?)", (cursor.lastrowid, 10 ** 9))
+    conn.commit()
+    conn.close()
+
+    latencies, failures = [], 0
+    for path in files:
+        with open(path, "rb") as f:
+            payload = f.read()
+        start = time.perf_counter()
+        response = client.post(
+            "/upload-invoice",
+            files={"file": (os.path.basename(path), payload, "application/pdf")},
+        )
+        latencies.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            failures += 1
+
+    return {"files": len(files), "failures": failures, "latency": summarize(latencies)}
+
+
+def _time_route(client, route: str, repeat: int) -> tuple[list[float], object]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(route)
+        samples.append(time.perf_counter() - start)
+        response.raise_for_status()
+    return samples, response
+
+
+def bench_scaled(
+    client,
+    db_path: str,
+    list_scales: list[int],
+    export_scales: list[int],
+    repeat: int
+) -> tuple[dict, dict]:
+    """
+    Run list and export benchmarks while growing the tables.
+
+    Tables only grow, so scales from both suites are visited in ascending order.
+
+    Returns:
+        Tuple of (list results, export results) keyed by row count
+    """
+    list_results, export_results = {}, {}
+    for rows in sorted(set(list_scales) | set(export_scales)):
+        grow_tables(db_path, rows)
+
+        if rows in list_scales:
+            scale = {}
+            for route in LIST_ROUTES:
+                samples, response = _time_route(client, route, repeat)
+                returned = len(response.json())
+                scale[route] = {
+                    **summarize(samples),
+                    "rows": returned,
+                    "rows_per_second": returned / statistics.fmean(samples),
+                }
+            list_results[str(rows)] = scale
+
+        if rows in export_scales:
+            scale = {}
+            for route in ("/export/stock", "/export/stock-pdf"):
+                samples, response = _time_route(client, route, repeat)
+                scale[route] = {**summarize(samples), "bytes": len(response.content)}
+            export_results[str(rows)] = scale
+
+    return list_results, export_results
+
+
+# ==================== Comparison ====================
+
+def _flatten(data: dict, prefix: str = "") -> dict[str, float]:
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+def compare(before_path: str, after_path: str):
+    """Print the relative change of every timing metric between two runs"""
+    with open(before_path) as f:
+        before = _flatten(json.load(f)["results"])
+    with open(after_path) as f:
+        after = _flatten(json.load(f)["results"])
+
+    for name in sorted(before.keys() & after.keys()):
+        if not (name.endswith("_ms") or name.endswith("_per_second")) or not before[name]:
+            continue
+        change = (after[name] - before[name]) / before[name] * 100
+        print(f"{name:<70}{before[name]:>12.2f}{after[name]:>12.2f}{change:>+9.1f}%")
+
+
+# ==================== CLI ====================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run inventory benchmarks")
+    parser.add_argument("--suites", default=",".join(SUITES), help="Comma-separated suites to run")
+    parser.add_argument("--scales", default="10000,100000,1000000", help="Row counts for list benchmarks")
+    parser.add_argument("--export-scales", default="1000,10000", help="Row counts for export benchmarks")
+    parser.add_argument("--repeat", type=int, default=3, help="Requests per route and scale")
+    parser.add_argument("--output", default=os.path.join(REPO_ROOT, "benchmarks", "results"))
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="Compare two result files")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    suites = [s for s in args.suites.split(",") if s]
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        parser.error(f"Unknown suites: {', '.join(sorted(unknown))}")
+
+    files = corpus_files()
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "benchmark.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+        # Suites measure handlers, not the per-client request limits
+        os.environ["INVENTORY_RATE_LIMIT"] = "0"
+        sys.path.insert(0, REPO_ROOT)
+
+        if "startup" in suites:
+            from benchmarks.import_time import measure_import
+            results["startup"] = measure_import()
+
+        if "parser" in suites:
+            results["parser"] = bench_parser(files)
+
+        if {"upload", "list", "export"} & set(suites):
+            client = make_client()
+            if "upload" in suites:
+                results["upload"] = bench_upload(client, db_path, files)
+            list_scales = [int(n) for n in args.scales.split(",")] if "list" in suites else []
+            export_scales = [int(n) for n in args.export_scales.split(",")] if "export" in suites else []
+            if list_scales or export_scales:
+                list_results, export_results = bench_scaled(
+                    client, db_path, list_scales, export_scales, args.repeat
+                )
+                if list_results:
+                    results["list"] = list_results
+                if export_results:
+                    results["export"] = export_results
+
+    revision = git_revision()
+    report = {
+        "revision": revision,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+    os.makedirs(args.output, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    path = os.path.join(args.output, f"{stamp}-{revision}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(json.dumps(results, indent=2))
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
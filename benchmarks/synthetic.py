@@ -0,0 +1,449 @@
+"""
+Synthetic data generator for scale and load testing.
+
+Populates shops, products, master and consignment stock, invoices, invoice
+items and consignment sales with skewed, realistic-looking distributions:
+
+* a few hundred shops, most of them consignment branches;
+* tens of thousands of SKUs whose popularity follows a Zipf law;
+* invoice deliveries to consignment shops, with sales drawn from what was
+  delivered so no balance ever goes negative (every sale of a product at a
+  shop is dated after the last delivery of it).
+
+Rows are generated with NumPy and written with executemany inserts through
+a session with autoflush disabled, so a database with over a million rows
+takes well under a minute. It can also emit GPM-style invoice PDFs that
+``parse_invoice_pdf`` reads, for parser load tests.
+
+    python -m benchmarks.synthetic --database /tmp/synthetic.db --sales 1000000
+    python -m benchmarks.synthetic --database /tmp/synthetic.db --pdfs 200 --pdf-dir /tmp/invoices
+"""
+import argparse
+import os
+import time
+from datetime import date, timedelta
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import Session
+
+from app import models
+from app.models import (
+    Product, Shop, MasterStock, ConsignmentStock,
+    Invoice, InvoiceItem, ConsignmentSale,
+)
+
+
+TOWNS = [
+    "Westlands", "Kilimani", "Karen", "Langata", "Buruburu", "Embakasi", "Kasarani", "Ruaka",
+    "Thika", "Kiambu", "Machakos", "Kitengela", "Ngong", "Nakuru", "Naivasha", "Eldoret",
+    "Kisumu", "Kakamega", "Kisii", "Kericho", "Nyeri", "Meru", "Embu", "Nanyuki",
+    "Mombasa", "Nyali", "Bamburi", "Likoni", "Malindi", "Kilifi", "Ukunda", "Narok",
+]
+WORDS = [
+    "ANIMALS", "ASSORTED", "BLOCKS", "PUZZLE", "CRAYONS", "BOOK", "COLOURING", "STICKERS",
+    "MARKERS", "PENCILS", "BALL", "DOLL", "CAR", "TRUCK", "GAME", "CARDS", "CLAY", "PAINT",
+    "BRUSH", "ERASER", "RULER", "SHARPENER", "BAG", "BOTTLE", "LUNCHBOX", "KIT",
+]
+BATCH_SIZE = 50_000
+
+
+# ==================== Row Generation ====================
+
+def generate_shops(count: int, consignment_share: float, rng: np.random.Generator) -> list[dict]:
+    shops = []
+    for i in range(1, count + 1):
+        town = TOWNS[(i - 1) % len(TOWNS)]
+        if rng.random() < consignment_share:
+            shops.append({"id": i, "name": f"N_{town} {i}", "type": "consignment"})
+        else:
+            retailer = "Carrefour" if rng.random() < 0.5 else "QM"
+            shops.append({"id": i, "name": f"{retailer} {town} {i}", "type": "normal"})
+    return shops
+
+
+def generate_products(count: int, rng: np.random.Generator) -> tuple[list[dict], np.ndarray]:
+    """
+    Returns:
+        Tuple of (product rows, unit price per product index)
+    """
+    words = rng.integers(0, len(WORDS), size=(count, 2))
+    prices = np.round(np.exp(rng.normal(5.5, 0.8, size=count)), 0)
+    products = [
+        {
+            "id": i + 1,
+            "gpm_code": f"{736000000 + i}",
+            "item_code": f"N{100000 + i}",
+            "description": f"GPM {WORDS[words[i, 0]]} {WORDS[words[i, 1]]}",
+        }
+        for i in range(count)
+    ]
+    return products, prices
+
+
+def popularity(count: int, rng: np.random.Generator, exponent: float = 1.1) -> np.ndarray:
+    """Zipf-like selection probabilities over ``count`` items in random order"""
+    weights = 1.0 / np.arange(1, count + 1) ** exponent
+    rng.shuffle(weights)
+    return weights / weights.sum()
+
+
+def generate_invoices(
+    shops: list[dict],
+    product_count: int,
+    prices: np.ndarray,
+    invoices: int,
+    lines_per_invoice: int,
+    days: int,
+    rng: np.random.Generator
+) -> tuple[list[dict], dict[str, np.ndarray]]:
+    """
+    Returns:
+        Tuple of (invoice rows, invoice item columns)
+    """
+    today = date.today()
+    shop_ids = np.array([s["id"] for s in shops])
+    shop_weights = popularity(len(shops), rng, exponent=0.6)
+
+    invoice_shops = rng.choice(shop_ids, size=invoices, p=shop_weights)
+    invoice_days = rng.integers(1, days + 1, size=invoices)
+    invoice_rows = [
+        {
+            "id": i + 1,
+            "invoice_no": f"GPM-{10000 + i}",
+            "shop_id": int(invoice_shops[i]),
+            "date": today - timedelta(days=int(invoice_days[i])),
+        }
+        for i in range(invoices)
+    ]
+
+    line_counts = np.maximum(1, rng.poisson(lines_per_invoice, size=invoices))
+    total_lines = int(line_counts.sum())
+    product_ids = rng.choice(product_count, size=total_lines, p=popularity(product_count, rng)) + 1
+    items = {
+        "invoice_id": np.repeat(np.arange(1, invoices + 1), line_counts),
+        "product_id": product_ids,
+        "quantity": rng.integers(1, 25, size=total_lines) * 6,
+        "rate": prices[product_ids - 1],
+    }
+    return invoice_rows, items
+
+
+def generate_sales(
+    shops: list[dict],
+    invoice_rows: list[dict],
+    items: dict[str, np.ndarray],
+    sales: int,
+    rng: np.random.Generator
+) -> tuple[dict[str, np.ndarray], dict[tuple[int, int], int]]:
+    """
+    Draw sales from the stock delivered to consignment shops.
+
+    Returns:
+        Tuple of (sale columns, remaining consignment stock per (shop, product))
+    """
+    today = date.today()
+    consignment = {s["id"] for s in shops if s["type"] == "consignment"}
+    invoice_shop = np.array([0] + [row["shop_id"] for row in invoice_rows])
+    invoice_day = np.array([0] + [(today - row["date"]).days for row in invoice_rows])
+
+    line_shop = invoice_shop[items["invoice_id"]]
+    mask = np.isin(line_shop, list(consignment))
+
+    # Aggregate deliveries per (shop, product); keep the latest delivery day
+    keys = line_shop[mask].astype(np.int64) * 10_000_000 + items["product_id"][mask]
+    pairs, inverse = np.unique(keys, return_inverse=True)
+    delivered = np.bincount(inverse, weights=items["quantity"][mask]).astype(np.int64)
+    last_day = np.full(len(pairs), np.iinfo(np.int64).max)
+    np.minimum.at(last_day, inverse, invoice_day[items["invoice_id"][mask]])
+
+    if len(pairs) == 0 or sales == 0:
+        empty = np.array([], dtype=np.int64)
+        sale_columns = {"shop_id": empty, "product_id": empty, "quantity": empty, "days_ago": empty}
+        return sale_columns, {
+            (int(k // 10_000_000), int(k % 10_000_000)): int(q) for k, q in zip(pairs, delivered)
+        }
+
+    chosen = rng.choice(len(pairs), size=sales, p=delivered / delivered.sum())
+    quantity = 1 + rng.poisson(0.6, size=sales)
+
+    # Keep sales while the running total per pair stays within what was delivered
+    order = np.argsort(chosen, kind="stable")
+    sorted_pairs = chosen[order]
+    running = np.cumsum(quantity[order])
+    group_start = np.r_[0, np.flatnonzero(np.diff(sorted_pairs)) + 1]
+    offsets = np.repeat(running[group_start] - quantity[order][group_start], np.diff(np.r_[group_start, sales]))
+    within = (running - offsets) <= delivered[sorted_pairs]
+    kept = order[within]
+
+    sold = np.bincount(chosen[kept], weights=quantity[kept], minlength=len(pairs)).astype(np.int64)
+    sale_days = (rng.random(len(kept)) * (last_day[chosen[kept]] + 1)).astype(np.int64)
+
+    sale_columns = {
+        "shop_id": pairs[chosen[kept]] // 10_000_000,
+        "product_id": pairs[chosen[kept]] % 10_000_000,
+        "quantity": quantity[kept],
+        "days_ago": sale_days,
+    }
+    remaining = {
+        (int(k // 10_000_000), int(k % 10_000_000)): int(q)
+        for k, q in zip(pairs, delivered - sold)
+    }
+    return sale_columns, remaining
+
+
+# ==================== Writing ====================
+
+def _bulk_insert(session: Session, model, rows):
+    """Insert rows with executemany in fixed-size batches"""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            session.execute(insert(model.__table__), batch)
+            batch = []
+    if batch:
+        session.execute(insert(model.__table__), batch)
+
+
+def _fast_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=MEMORY")
+    cursor.execute("PRAGMA synchronous=OFF")
+    cursor.close()
+
+
+def generate_database(
+    database_url: str,
+    shops: int = 300,
+    products: int = 20_000,
+    invoices: int = 5_000,
+    lines_per_invoice: int = 20,
+    sales: int = 1_000_000,
+    days: int = 180,
+    consignment_share: float = 0.8,
+    seed: int = 42
+) -> dict[str, int]:
+    """
+    Create the schema at ``database_url`` and fill it with synthetic data.
+
+    Returns:
+        Number of rows written per table
+    """
+    rng = np.random.default_rng(seed)
+    engine = create_engine(database_url)
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _fast_sqlite_pragmas)
+    models.Base.metadata.create_all(bind=engine)
+
+    shop_rows = generate_shops(shops, consignment_share, rng)
+    product_rows, prices = generate_products(products, rng)
+    invoice_rows, items = generate_invoices(
+        shop_rows, products, prices, invoices, lines_per_invoice, days, rng
+    )
+    sale_columns, remaining = generate_sales(shop_rows, invoice_rows, items, sales, rng)
+
+    on_consignment = np.zeros(products + 1, dtype=np.int64)
+    for (_, product_id), qty in remaining.items():
+        on_consignment[product_id] += qty
+    warehouse = rng.integers(0, 500, size=products + 1)
+
+    today = date.today()
+    with Session(engine, autoflush=False) as session:
+        _bulk_insert(session, Shop, shop_rows)
+        _bulk_insert(session, Product, product_rows)
+        _bulk_insert(session, MasterStock, (
+            {"product_id": p, "quantity": int(on_consignment[p] + warehouse[p])}
+            for p in range(1, products + 1)
+        ))
+        _bulk_insert(session, ConsignmentStock, (
+            {"shop_id": shop_id, "product_id": product_id, "quantity": qty}
+            for (shop_id, product_id), qty in remaining.items()
+        ))
+        _bulk_insert(session, Invoice, invoice_rows)
+        _bulk_insert(session, InvoiceItem, (
+            {"invoice_id": int(i), "product_id": int(p), "quantity": int(q), "rate": float(r)}
+            for i, p, q, r in zip(items["invoice_id"], items["product_id"], items["quantity"], items["rate"])
+        ))
+        _bulk_insert(session, ConsignmentSale, (
+            {"shop_id": int(s), "product_id": int(p), "quantity": int(q), "date": today - timedelta(days=int(d))}
+            for s, p, q, d in zip(
+                sale_columns["shop_id"], sale_columns["product_id"],
+                sale_columns["quantity"], sale_columns["days_ago"],
+            )
+        ))
+        session.commit()
+
+    counts = {
+        "shops": len(shop_rows),
+        "products": len(product_rows),
+        "master_stock": products,
+        "consignment_stock": len(remaining),
+        "invoices": len(invoice_rows),
+        "invoice_items": len(items["invoice_id"]),
+        "consignment_sales": len(sale_columns["shop_id"]),
+    }
+    engine.dispose()
+    return counts
+
+
+# ==================== Invoice PDFs ====================
+
+def write_invoice_pdf(path: str, shop_name: str, invoice_no: str, items: list[dict]):
+    """
+    Write a GPM-style invoice PDF.
+
+    Args:
+        path: Output file
+        shop_name: Printed under BILL TO
+        invoice_no: e.g. "GPM-1574"
+        items: Dicts with gpm_code, item_code, description, qty and rate
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    pdf = canvas.Canvas(path, pagesize=A4)
+    width, height = A4
+    lines_per_page = 45
+
+    def header():
+        pdf.setFont("Helvetica-Bold", 14)
+        pdf.drawString(40, height - 50, f"INVOICE {invoice_no}")
+        pdf.setFont("Helvetica", 10)
+        pdf.drawString(40, height - 80, "BILL TO")
+        pdf.drawString(40, height - 95, shop_name)
+        pdf.drawString(40, height - 125, "CODE ITEM DESCRIPTION QTY RATE AMOUNT")
+        return height - 145
+
+    y = header()
+    for n, item in enumerate(items):
+        if n and n % lines_per_page == 0:
+            pdf.showPage()
+            y = header()
+        amount = item["qty"] * item["rate"]
+        pdf.drawString(
+            40, y,
+            f"{item['gpm_code']} {item['item_code']} {item['description']} "
+            f"{item['qty']} {item['rate']:.2f} {amount:.2f}",
+        )
+        y -= 14
+
+    pdf.showPage()
+    pdf.save()
+
+
+def generate_invoice_pdfs(
+    database_url: str,
+    out_dir: str,
+    count: int,
+    lines_per_invoice: int = 40,
+    seed: int = 7,
+    shop_type: Optional[str] = None
+) -> list[str]:
+    """
+    Emit ``count`` invoice PDFs for random shops and products already in
+    the database, so uploads resolve against real rows.
+
+    Quantities are drawn from master stock: across all the invoices a
+    product never totals more than it has, so uploading the set once never
+    runs master stock short. Invoices to consignment shops only credit the
+    shop, so with ``shop_type="consignment"`` the set can be uploaded any
+    number of times.
+
+    Args:
+        shop_type: Only bill shops of this type ("normal" or
+            "consignment"); None for any shop
+    """
+    rng = np.random.default_rng(seed)
+    engine = create_engine(database_url)
+    os.makedirs(out_dir, exist_ok=True)
+
+    with Session(engine) as session:
+        shops = session.query(Shop.name)
+        if shop_type is not None:
+            shops = shops.filter(Shop.type == shop_type)
+        shop_names = [name for (name,) in shops]
+        products = (
+            session.query(Product.gpm_code, Product.item_code, Product.description, MasterStock.quantity)
+            .join(MasterStock, MasterStock.product_id == Product.id)
+            .filter(MasterStock.quantity > 0)
+            .all()
+        )
+    engine.dispose()
+    if not shop_names or not products:
+        raise ValueError("Generate the database before generating invoices")
+
+    available = np.array([p.quantity for p in products], dtype=np.int64)
+    paths = []
+    weights = popularity(len(products), rng)
+    for n in range(count):
+        picks = rng.choice(len(products), size=max(1, rng.poisson(lines_per_invoice)), p=weights)
+        items = []
+        for i in picks:
+            qty = min(int(rng.integers(1, 25) * 6), int(available[i]))
+            if qty <= 0:
+                continue
+            available[i] -= qty
+            items.append({
+                "gpm_code": products[i].gpm_code,
+                "item_code": products[i].item_code,
+                "description": products[i].description,
+                "qty": qty,
+                "rate": float(round(np.exp(rng.normal(5.5, 0.8)))),
+            })
+        if not items:
+            continue
+        invoice_no = f"GPM-{90000 + n}"
+        path = os.path.join(out_dir, f"{invoice_no}.pdf")
+        write_invoice_pdf(path, shop_names[int(rng.integers(len(shop_names)))], invoice_no, items)
+        paths.append(path)
+    return paths
+
+
+# ==================== CLI ====================
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description="Generate synthetic inventory data")
+    parser.add_argument("--database", required=True, help="SQLite file (or SQLAlchemy URL) to populate")
+    parser.add_argument("--shops", type=int, default=300)
+    parser.add_argument("--products", type=int, default=20_000)
+    parser.add_argument("--invoices", type=int, default=5_000)
+    parser.add_argument("--lines-per-invoice", type=int, default=20)
+    parser.add_argument("--sales", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=180)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--pdfs", type=int, default=0, help="Number of invoice PDFs to emit")
+    parser.add_argument("--pdf-dir", default="synthetic_invoices")
+    parser.add_argument("--pdf-shop-type", choices=["normal", "consignment"], default=None,
+                        help="Only bill shops of this type")
+    parser.add_argument("--skip-database", action="store_true", help="Only emit PDFs for an existing database")
+    args = parser.parse_args(argv)
+
+    url = args.database if "://" in args.database else f"sqlite:///{args.database}"
+
+    if not args.skip_database:
+        start = time.perf_counter()
+        counts = generate_database(
+            url,
+            shops=args.shops,
+            products=args.products,
+            invoices=args.invoices,
+            lines_per_invoice=args.lines_per_invoice,
+            sales=args.sales,
+            days=args.days,
+            seed=args.seed,
+        )
+        elapsed = time.perf_counter() - start
+        for table, rows in counts.items():
+            print(f"{table:<20}{rows:>12,}")
+        print(f"{sum(counts.values()):,} rows in {elapsed:.1f}s")
+
+    if args.pdfs:
+        start = time.perf_counter()
+        paths = generate_invoice_pdfs(url, args.pdf_dir, args.pdfs, shop_type=args.pdf_shop_type)
+        print(f"{len(paths)} invoices written to {args.pdf_dir} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
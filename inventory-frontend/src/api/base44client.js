@@ -166,6 +166,20 @@ export const base44 = {
     }
   },
 
+  /**
+   * Dashboard counts, stock totals, recent activity and low-stock alerts
+   * @returns {Promise<Object>}
+   */
+  getDashboardSummary: async () => {
+    try {
+      const response = await api.get("/dashboard/summary");
+      return response.data;
+    } catch (error) {
+      console.error("Error fetching dashboard summary:", error);
+      throw error;
+    }
+  },
+
   /**
    * Application logs
    */
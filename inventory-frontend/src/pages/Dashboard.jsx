@@ -25,35 +25,24 @@ import UserRequestsCard from "@/components/admin/UserRequestsCard";
 
 
 export default function Dashboard() {
-  const { data: products = [], isLoading: loadingProducts } = useQuery({
-    queryKey: ["products"],
-    queryFn: () => base44.entities.Product.list("-created_date", 100),
+  // One request for all stats and recent activity (cached briefly server-side)
+  const { data: summary, isLoading } = useQuery({
+    queryKey: ["dashboardSummary"],
+    queryFn: () => base44.getDashboardSummary(),
   });
 
-  const { data: shops = [], isLoading: loadingShops } = useQuery({
-    queryKey: ["shops"],
-    queryFn: () => base44.entities.Shop.list("-created_date", 50),
-  });
-
-  const { data: invoices = [], isLoading: loadingInvoices } = useQuery({
-    queryKey: ["invoices"],
-    queryFn: () => base44.entities.Invoice.list("-created_date", 10),
-  });
-
-  const { data: movements = [], isLoading: loadingMovements } = useQuery({
-    queryKey: ["movements"],
-    queryFn: () => base44.entities.StockMovement.list("-created_date", 10),
-  });
-
-  const isLoading = loadingProducts || loadingShops || loadingInvoices;
-
-  // Calculate stats
-  const totalMasterStock = products.reduce((sum, p) => sum + (p.master_stock || 0), 0);
-  const totalConsignment = products.reduce((sum, p) => sum + (p.total_consignment || 0), 0);
-  const totalOwned = totalMasterStock + totalConsignment;
-  const lowStockProducts = products.filter(p => (p.master_stock || 0) <= (p.reorder_level || 10));
-  const activeShops = shops.filter(s => s.status === "active").length;
-  const consignmentShops = shops.filter(s => s.type === "consignment").length;
+  // Master stock counts every owned unit, including those on consignment
+  const totalOwned = summary?.master_units || 0;
+  const totalConsignment = summary?.consignment_units || 0;
+  const totalMasterStock = totalOwned - totalConsignment;
+  const lowStockProducts = summary?.low_stock || [];
+  const lowStockCount = summary?.low_stock_master || 0;
+  const shopCount = summary?.shops || 0;
+  const consignmentShops = summary?.consignment_shops || 0;
+  const invoices = summary?.recent_invoices || [];
+  const movements = summary?.recent_sales || [];
+  const loadingInvoices = isLoading;
+  const loadingMovements = isLoading;
 
   return (
     <div className="min-h-screen bg-slate-50 p-4 sm:p-6 lg:p-8">
@@ -92,8 +81,8 @@ export default function Dashboard() {
             icon={ShoppingCart}
           />
           <StatsCard
-            title="Active Shops"
-            value={isLoading ? "..." : `${activeShops} / ${consignmentShops} consign`}
+            title="Shops"
+            value={isLoading ? "..." : shopCount.toLocaleString()}
             subtitle={`${consignmentShops} consignment shops`}
             icon={Store}
           />
@@ -104,7 +93,7 @@ export default function Dashboard() {
         </div>
 
         {/* Low Stock Alert */}
-        {lowStockProducts.length > 0 && (
+        {lowStockCount > 0 && (
           <Card className="p-6 mb-8 border-amber-200 bg-amber-50">
             <div className="flex items-start gap-4">
               <div className="p-2 rounded-lg bg-amber-100">
@@ -113,17 +102,17 @@ export default function Dashboard() {
               <div className="flex-1">
                 <h3 className="font-semibold text-amber-900 mb-2">Low Stock Alert</h3>
                 <p className="text-amber-700 text-sm mb-3">
-                  {lowStockProducts.length} product(s) are running low on stock
+                  {lowStockCount} product(s) are running low on stock
                 </p>
                 <div className="flex flex-wrap gap-2">
-                  {lowStockProducts.slice(0, 5).map(product => (
-                    <Badge key={product.id} variant="secondary" className="bg-white text-amber-800 border-amber-200">
-                      {product.description} ({product.master_stock || 0})
+                  {lowStockProducts.map(alert => (
+                    <Badge key={alert.product_id} variant="secondary" className="bg-white text-amber-800 border-amber-200">
+                      {alert.description} ({alert.quantity || 0})
                     </Badge>
                   ))}
-                  {lowStockProducts.length > 5 && (
+                  {lowStockCount > lowStockProducts.length && (
                     <Badge variant="secondary" className="bg-amber-100 text-amber-700">
-                      +{lowStockProducts.length - 5} more
+                      +{lowStockCount - lowStockProducts.length} more
                     </Badge>
                   )}
                 </div>
@@ -169,7 +158,7 @@ export default function Dashboard() {
                   >
                     <div className="flex items-center justify-between p-3 rounded-lg bg-slate-50 hover:bg-slate-100 transition-colors">
                       <div>
-                        <p className="font-medium text-slate-900">{invoice.invoice_number}</p>
+                        <p className="font-medium text-slate-900">{invoice.invoice_no}</p>
                         <p className="text-sm text-slate-500">{invoice.shop_name}</p>
                       </div>
                       <div className="text-right">
@@ -178,12 +167,12 @@ export default function Dashboard() {
                         </p>
                         <Badge 
                           variant="secondary" 
-                          className={invoice.invoice_type === "consignment" 
+                          className={invoice.shop_type === "consignment" 
                             ? "bg-violet-100 text-violet-700" 
                             : "bg-sky-100 text-sky-700"
                           }
                         >
-                          {invoice.invoice_type}
+                          {invoice.shop_type}
                         </Badge>
                       </div>
                     </div>
@@ -224,10 +213,10 @@ export default function Dashboard() {
                       }`} />
                       <div>
                         <p className="font-medium text-slate-900 text-sm">
-                          {movement.product_description || movement.product_code}
+                          {movement.description || movement.item_code}
                         </p>
                         <p className="text-xs text-slate-500">
-                          {movement.movement_type?.replace(/_/g, " ")} • {movement.shop_name || "Master Store"}
+                          sale • {movement.shop_name || "Master Store"}
                         </p>
                       </div>
                     </div>
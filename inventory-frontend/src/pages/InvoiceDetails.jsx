@@ -31,18 +31,13 @@ export default function InvoiceDetails() {
   const params = new URLSearchParams(window.location.search);
   const invoiceId = params.get("id");
 
+  // Header, shop and lines with products and totals in one request
   const { data: invoice, isLoading } = useQuery({
     queryKey: ["invoice", invoiceId],
-    queryFn: () => base44.entities.Invoice.filter({ id: invoiceId }),
-    select: (data) => data[0],
-    enabled: !!invoiceId,
-  });
-
-  const { data: items = [], isLoading: loadingItems } = useQuery({
-    queryKey: ["invoiceItems", invoiceId],
-    queryFn: () => base44.entities.InvoiceItem.filter({ invoice_id: invoiceId }),
+    queryFn: () => base44.entities.Invoice.read(invoiceId),
     enabled: !!invoiceId,
   });
+  const items = invoice?.items || [];
 
   if (isLoading) {
     return (
@@ -85,7 +80,7 @@ export default function InvoiceDetails() {
         </div>
 
         <PageHeader
-          title={`Invoice ${invoice.invoice_number}`}
+          title={`Invoice ${invoice.invoice_no}`}
           actions={
             invoice.file_url && (
               <a href={invoice.file_url} target="_blank" rel="noopener noreferrer">
@@ -107,16 +102,16 @@ export default function InvoiceDetails() {
               </div>
               <div>
                 <p className="text-sm text-slate-500">Shop</p>
-                <p className="font-semibold text-slate-900">{invoice.shop_name}</p>
+                <p className="font-semibold text-slate-900">{invoice.shop?.name}</p>
                 <Badge 
                   variant="secondary" 
                   className={`mt-1 ${
-                    invoice.invoice_type === "consignment" 
+                    invoice.shop?.type === "consignment" 
                       ? "bg-violet-100 text-violet-700" 
                       : "bg-sky-100 text-sky-700"
                   }`}
                 >
-                  {invoice.invoice_type}
+                  {invoice.shop?.type}
                 </Badge>
               </div>
             </div>
@@ -128,8 +123,8 @@ export default function InvoiceDetails() {
               <div>
                 <p className="text-sm text-slate-500">Invoice Date</p>
                 <p className="font-semibold text-slate-900">
-                  {invoice.invoice_date 
-                    ? format(new Date(invoice.invoice_date), "MMM d, yyyy")
+                  {invoice.date 
+                    ? format(new Date(invoice.date), "MMM d, yyyy")
                     : "-"
                   }
                 </p>
@@ -162,10 +157,10 @@ export default function InvoiceDetails() {
             </div>
           </div>
 
-          {invoice.invoice_type === "consignment" && (
+          {invoice.shop?.type === "consignment" && (
             <div className="mt-6 p-4 rounded-lg bg-violet-50 border border-violet-200">
               <p className="text-violet-800 text-sm">
-                <strong>Consignment Note:</strong> Stock from this invoice is tracked as "on consignment" at {invoice.shop_name}. 
+                <strong>Consignment Note:</strong> Stock from this invoice is tracked as "on consignment" at {invoice.shop?.name}. 
                 It remains your ownership until sales are confirmed.
               </p>
             </div>
@@ -188,15 +183,7 @@ export default function InvoiceDetails() {
               </TableRow>
             </TableHeader>
             <TableBody>
-              {loadingItems ? (
-                [...Array(3)].map((_, i) => (
-                  <TableRow key={i}>
-                    {[...Array(5)].map((_, j) => (
-                      <TableCell key={j}><Skeleton className="h-5 w-full" /></TableCell>
-                    ))}
-                  </TableRow>
-                ))
-              ) : items.length === 0 ? (
+              {items.length === 0 ? (
                 <TableRow>
                   <TableCell colSpan={5} className="text-center py-8 text-slate-500">
                     No items found
@@ -205,10 +192,10 @@ export default function InvoiceDetails() {
               ) : (
                 items.map((item) => (
                   <TableRow key={item.id}>
-                    <TableCell className="font-medium">{item.product_description}</TableCell>
-                    <TableCell className="text-slate-500">{item.product_code || "-"}</TableCell>
+                    <TableCell className="font-medium">{item.description}</TableCell>
+                    <TableCell className="text-slate-500">{item.item_code || "-"}</TableCell>
                     <TableCell className="text-right">{item.quantity}</TableCell>
-                    <TableCell className="text-right">KES {(item.unit_price || 0).toLocaleString()}</TableCell>
+                    <TableCell className="text-right">KES {(item.rate || 0).toLocaleString()}</TableCell>
                     <TableCell className="text-right font-semibold">
                       KES {(item.line_total || 0).toLocaleString()}
                     </TableCell>
@@ -224,7 +211,7 @@ export default function InvoiceDetails() {
                 <div className="w-64 space-y-2">
                   <div className="flex justify-between text-slate-600">
                     <span>Subtotal</span>
-                    <span>KES {(invoice.subtotal || invoice.total_amount || 0).toLocaleString()}</span>
+                    <span>KES {(invoice.total_amount || 0).toLocaleString()}</span>
                   </div>
                   <div className="flex justify-between text-lg font-bold text-slate-900 pt-2 border-t">
                     <span>Total</span>
@@ -1,31 +1,36 @@
 """
 Production-ready FastAPI application with secure authentication.
 """
-from fastapi import FastAPI, Depends, HTTPException, status, Request
+from fastapi import FastAPI, Depends, HTTPException, status, Request, Query
 from fastapi.security import OAuth2PasswordBearer
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload, selectinload
 from datetime import timedelta, date
 from typing import Optional
-import pandas as pd
 from fastapi import UploadFile, File
 from pydantic import BaseModel, EmailStr, Field
 import io
-from fastapi.responses import StreamingResponse, FileResponse
-from reportlab.platypus import SimpleDocTemplate, Table
-from reportlab.lib.pagesizes import A4
+import time
+import zipfile
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
 
 from app.database import engine, SessionLocal
-from app import models
 from app.models import (
     Product, Shop, MasterStock, ConsignmentStock,
     Invoice, InvoiceItem, ConsignmentSale,
     UserRequest, User
 )
-from app.services.pdf_parser import parse_invoice_pdf
+from app.services.stock_history import consignment_stock_as_of
+from app.services.transfers import ensure_consignment_rows
+from app.services.search import search_products
+from app.services.catalog_import import import_catalog, read_catalog
+from app.services.dashboard import dashboard_summary
+from app.services.product_codes import CodeIndex, infer_retailer
+from app.services import audit, events, metrics, query_diagnostics, rate_limit, reorder, uploads
 
 # Import our production-ready auth utilities
-from auth_utils import (
+from app.auth_utils import (
     hash_password,
     verify_password,
     generate_secure_password,
@@ -39,7 +44,10 @@ from auth_utils import (
 
 
 # ==================== Database Setup ====================
-models.Base.metadata.create_all(bind=engine)
+# The schema is created by the explicit migration step (python -m app.migrate),
+# not on import, so workers start fast and never race on it.
+metrics.instrument_engine(engine)
+query_diagnostics.install(engine)
 
 
 # ==================== FastAPI App ====================
@@ -67,6 +75,34 @@ app.add_middleware(
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
 
+# ==================== Rate Limiting Middleware ====================
+# Declared first so it runs innermost: rejected requests still get security
+# headers, metrics and an audit entry, but never reach a handler.
+@app.middleware("http")
+async def limit_request_rate(request: Request, call_next):
+    """Reject clients that exceed their token bucket for the route class"""
+    client = request.client.host if request.client else "unknown"
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        token_data = decode_access_token(token)
+        if token_data is not None and token_data.username:
+            client = f"user:{token_data.username}"
+
+    retry_after = await run_in_threadpool(rate_limit.check, client, request.method, request.url.path)
+    if retry_after is not None:
+        return JSONResponse(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            content={"detail": "Too many requests"},
+            headers={"Retry-After": str(retry_after)},
+        )
+    return await call_next(request)
+
+
+# ==================== Upload Size Middleware ====================
+# Refuses oversized uploads by Content-Length, or while a chunked body streams
+app.add_middleware(uploads.UploadSizeLimit)
+
+
 # ==================== Security Middleware ====================
 @app.middleware("http")
 async def add_security_headers(request: Request, call_next):
@@ -77,7 +113,62 @@ async def add_security_headers(request: Request, call_next):
     return response
 
 
+# ==================== Metrics Middleware ====================
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Record latency and database usage per route"""
+    stats = metrics.begin_request()
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        # Label by route template rather than raw path to bound cardinality
+        route = request.scope.get("route")
+        metrics.end_request(
+            request.method,
+            route.path if route else "unmatched",
+            status_code,
+            time.perf_counter() - start,
+            stats,
+        )
+
+
+@app.middleware("http")
+async def record_audit(request: Request, call_next):
+    """Queue an audit entry for mutating requests (all requests if configured)"""
+    response = await call_next(request)
+    if audit.should_log_request(request.method):
+        route = request.scope.get("route")
+        audit.record(
+            "request",
+            f"{request.method} {route.path if route else 'unmatched'}",
+            getattr(request.state, "username", None),
+            response.status_code,
+        )
+    return response
+
+
+@app.middleware("http")
+async def check_query_budget(request: Request, call_next):
+    """Flag N+1 query patterns and slow requests when diagnostics are enabled"""
+    if not query_diagnostics.enabled():
+        return await call_next(request)
+
+    tracker = query_diagnostics.begin(f"{request.method} {request.url.path}")
+    response = await call_next(request)
+    route = request.scope.get("route")
+    if route:
+        tracker.label = f"{request.method} {route.path}"
+    query_diagnostics.finish(tracker)
+    return response
+
+
 # ==================== Database Dependency ====================
+# Session access is synchronous, so handlers and dependencies that use it are
+# plain `def`: FastAPI runs them in its threadpool instead of on the event loop.
 def get_db():
     """Database session dependency"""
     db = SessionLocal()
@@ -88,7 +179,8 @@ def get_db():
 
 
 # ==================== Authentication Dependencies ====================
-async def get_current_user(
+def get_current_user(
+    request: Request,
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
 ) -> User:
@@ -116,11 +208,12 @@ async def get_current_user(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="User account is inactive"
         )
-    
+
+    request.state.username = user.username  # for the audit log
     return user
 
 
-async def get_current_active_admin(
+def get_current_active_admin(
     current_user: User = Depends(get_current_user)
 ) -> User:
     """
@@ -137,6 +230,26 @@ async def get_current_active_admin(
     return current_user
 
 
+def get_stream_user(
+    request: Request,
+    access_token: Optional[str] = Query(None),
+    db: Session = Depends(get_db)
+) -> User:
+    """
+    Authenticate an event stream. Browsers' EventSource cannot send headers,
+    so the token may also come as the access_token query parameter.
+    """
+    authorization = request.headers.get("Authorization", "")
+    token = authorization[7:] if authorization.lower().startswith("bearer ") else access_token
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return get_current_user(request, token, db)
+
+
 # ==================== Pydantic Models ====================
 class Token(BaseModel):
     """Token response model"""
@@ -181,6 +294,7 @@ class ProductCreate(BaseModel):
     gpm_code: str
     item_code: str
     description: str
+    reorder_level: Optional[int] = Field(None, ge=0)
 
 
 class ShopCreate(BaseModel):
@@ -196,10 +310,35 @@ class SaleInput(BaseModel):
     qty: int = Field(..., gt=0)
 
 
+class TransferLine(BaseModel):
+    """One line of a stock transfer; no destination returns the stock to master"""
+    from_shop: str
+    to_shop: Optional[str] = None
+    item_code: str
+    qty: int = Field(..., gt=0)
+
+
+class TransferBatch(BaseModel):
+    """Stock transfers applied together or not at all"""
+    lines: list[TransferLine] = Field(..., min_length=1)
+
+
+class ReorderLevelInput(BaseModel):
+    """Reorder level for a product, or for its stock at one consignment shop"""
+    item_code: str
+    shop_name: Optional[str] = None
+    reorder_level: Optional[int] = Field(None, ge=0)  # None restores the default
+
+
+class ActivityInput(BaseModel):
+    """A page view reported by the frontend"""
+    page: str = Field(..., max_length=200)
+
+
 # ==================== Authentication Routes ====================
 
 @app.post("/login", response_model=Token)
-async def login(
+def login(
     credentials: LoginRequest,
     db: Session = Depends(get_db)
 ):
@@ -276,7 +415,7 @@ async def login(
 
 
 @app.post("/auth/request-access")
-async def request_access(
+def request_access(
     data: AccessRequest,
     db: Session = Depends(get_db)
 ):
@@ -315,7 +454,7 @@ async def request_access(
 
 
 @app.get("/admin/requests")
-async def get_pending_requests(
+def get_pending_requests(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_admin)
 ):
@@ -328,7 +467,7 @@ async def get_pending_requests(
 
 
 @app.post("/admin/approve/{request_id}", response_model=ApprovalResponse)
-async def approve_request(
+def approve_request(
     request_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_admin)
@@ -385,18 +524,45 @@ async def approve_request(
     )
 
 
+@app.get("/admin/audit-log")
+def view_audit_log(
+    kind: Optional[str] = Query(None, description="request, mutation or activity"),
+    username: Optional[str] = None,
+    action: Optional[str] = None,
+    before_id: Optional[int] = Query(None, description="Last id of the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_admin)
+):
+    """
+    Audit and activity log, newest first.
+    Admin only endpoint.
+    """
+    return audit.list_entries(db, kind, username, action, before_id, limit)
+
+
 @app.get("/me", response_model=UserResponse)
-async def get_current_user_info(
+def get_current_user_info(
     current_user: User = Depends(get_current_user)
 ):
     """Get current authenticated user information"""
     return current_user
 
 
+@app.post("/logs/user-activity", status_code=status.HTTP_202_ACCEPTED)
+def log_user_activity(
+    data: ActivityInput,
+    current_user: User = Depends(get_current_user)
+):
+    """Queue a page view for the activity log"""
+    audit.record("activity", "page_view", current_user.username, detail={"page": data.page})
+    return {"message": "Activity logged"}
+
+
 # ==================== Product Routes ====================
 
 @app.get("/products")
-async def list_products(
+def list_products(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -407,20 +573,37 @@ async def list_products(
             "id": p.id,
             "gpm_code": p.gpm_code,
             "item_code": p.item_code,
-            "description": p.description
+            "description": p.description,
+            "reorder_level": p.reorder_level
         }
         for p in products
     ]
 
 
+@app.get("/products/search")
+def search_products_endpoint(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Full-text product search over description, item code and GPM code"""
+    result = search_products(db, q, limit=limit, offset=offset)
+    return {"query": q, "limit": limit, "offset": offset, **result}
+
+
 @app.post("/products/add")
-async def add_product(
+def add_product(
     product: ProductCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Add new product"""
-    db_product = Product(**product.dict())
+    if db.query(Product.id).filter(Product.item_code == product.item_code).first():
+        raise HTTPException(status_code=400, detail="Item code already exists")
+
+    db_product = Product(**product.model_dump())
     db.add(db_product)
     db.commit()
     db.refresh(db_product)
@@ -428,15 +611,47 @@ async def add_product(
     # Initialize master stock
     stock = MasterStock(product_id=db_product.id, quantity=0)
     db.add(stock)
+    alerts = reorder.evaluate(db, reorder.MASTER_SHOP_ID, [db_product.id])
     db.commit()
+    events.broker.publish(alerts)
+    audit.record("mutation", "add_product", current_user.username,
+                 detail={"product_id": db_product.id, **product.model_dump()})
 
     return {"message": "Product added successfully", "product_id": db_product.id}
 
 
+@app.post("/products/import")
+def import_products(
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Bulk upsert products from a CSV, Excel or JSON catalog keyed on item code"""
+    try:
+        upload = uploads.receive(file)
+    except uploads.UploadTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    try:
+        # CSV rows stream from the file, so import while it is open
+        with upload.open() as stream, metrics.timed("import_catalog"):
+            result = import_catalog(db, read_catalog(stream, upload.filename))
+    except (ValueError, UnicodeDecodeError, KeyError, ImportError, zipfile.BadZipFile) as e:
+        raise HTTPException(status_code=400, detail=f"Could not read catalog: {e}")
+
+    # New products start with empty master stock; nothing else changed stock
+    alerts = reorder.evaluate(db, reorder.MASTER_SHOP_ID, result.pop("stocked_ids"))
+    db.commit()
+    events.broker.publish(alerts)
+    audit.record("mutation", "import_products", current_user.username,
+                 detail={"file": file.filename, **result})
+
+    return {"message": "Catalog imported", **result}
+
+
 # ==================== Shop Routes ====================
 
 @app.get("/shops")
-async def list_shops(
+def list_shops(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -453,22 +668,24 @@ async def list_shops(
 
 
 @app.post("/shops/add")
-async def add_shop(
+def add_shop(
     shop: ShopCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Add new shop"""
-    db_shop = Shop(**shop.dict())
+    db_shop = Shop(**shop.model_dump())
     db.add(db_shop)
     db.commit()
+    audit.record("mutation", "add_shop", current_user.username,
+                 detail={"shop_id": db_shop.id, **shop.model_dump()})
     return {"message": "Shop added successfully", "shop_id": db_shop.id}
 
 
 # ==================== Stock Routes ====================
 
 @app.get("/stock/master")
-async def view_master_stock(
+def view_master_stock(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -478,7 +695,7 @@ async def view_master_stock(
 
 
 @app.get("/stock/consignment")
-async def view_consignment(
+def view_consignment(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -486,39 +703,107 @@ async def view_consignment(
     return db.query(ConsignmentStock).all()
 
 
+@app.get("/stock/as-of")
+def view_stock_as_of(
+    as_of: date = Query(..., alias="date"),
+    shop_id: int = Query(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """View consignment stock of a shop as it was at the end of a given day"""
+    if as_of > date.today():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Date cannot be in the future"
+        )
+
+    shop = db.query(Shop).filter(Shop.id == shop_id).first()
+    if not shop or shop.type != "consignment":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid consignment shop"
+        )
+
+    return {
+        "shop_id": shop.id,
+        "shop_name": shop.name,
+        "date": as_of.isoformat(),
+        "items": consignment_stock_as_of(db, shop.id, as_of),
+    }
+
+
 # ==================== Invoice Routes ====================
 
 @app.post("/upload-invoice")
-async def upload_invoice(
+def upload_invoice(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Upload and process invoice (PDF or Excel)"""
-    
-    if file.filename.endswith(".pdf"):
-        shop_name, invoice_no, items = parse_invoice_pdf(file.file)
+    try:
+        upload = uploads.receive(file)
+    except uploads.UploadTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+
+    # Heavy parsers are imported on first use to keep startup fast
+    if upload.kind == "pdf":
+        from app.services.pdf_parser import parse_invoice
+
+        try:
+            with metrics.timed("parse_invoice_pdf"), upload.open() as stream:
+                parsed = parse_invoice(stream)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        shop_name, invoice_no, items = parsed.shop_name, parsed.invoice_no, parsed.items
+        retailer, shop_type = parsed.retailer, parsed.shop_type
+    elif upload.kind in ("xlsx", "xls"):
+        import pandas as pd
+        from app.services.pdf_parser import shop_type_for
+
+        try:
+            with metrics.timed("parse_invoice_excel"), upload.open() as stream:
+                df = pd.read_excel(stream)
+            shop_name = df.iloc[0]["Shop"]
+            invoice_no = df.iloc[0]["InvoiceNo"]
+            items = [
+                {
+                    "item_code": row["ItemCode"],
+                    "qty": int(row["Qty"]),
+                    "rate": row["Rate"]
+                }
+                for _, row in df.iterrows()
+            ]
+        # A zip that is not a workbook, an .xls without xlrd, a missing
+        # column or no rows
+        except (ValueError, KeyError, IndexError, ImportError, zipfile.BadZipFile) as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Could not read the invoice workbook: {e}"
+            )
+        retailer = infer_retailer(shop_name)
+        shop_type = shop_type_for(retailer)
     else:
-        df = pd.read_excel(file.file)
-        shop_name = df.iloc[0]["Shop"]
-        invoice_no = df.iloc[0]["InvoiceNo"]
-        items = [
-            {
-                "item_code": row["ItemCode"],
-                "qty": int(row["Qty"]),
-                "rate": row["Rate"]
-            }
-            for _, row in df.iterrows()
-        ]
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Invoice must be a PDF or Excel file"
+        )
+
+    if not shop_name:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Could not read the shop name from the invoice"
+        )
 
     # Get or create shop
     shop = db.query(Shop).filter(Shop.name == shop_name).first()
     if not shop:
-        shop_type = "consignment" if "naivas" in shop_name.lower() else "normal"
-        shop = Shop(name=shop_name, type=shop_type)
+        shop = Shop(name=shop_name, type=shop_type, retailer=retailer)
         db.add(shop)
         db.commit()
         db.refresh(shop)
+    elif shop.retailer is None and retailer:
+        shop.retailer = retailer
 
     # Create invoice
     invoice = Invoice(invoice_no=invoice_no, shop_id=shop.id, date=date.today())
@@ -526,47 +811,82 @@ async def upload_invoice(
     db.commit()
     db.refresh(invoice)
 
-    # Process items
-    for row in items:
-        product = db.query(Product).filter(Product.item_code == row["item_code"]).first()
-        if not product:
-            continue
+    # Resolve every line's code (retailer code, item code or GPM code) up front
+    retailer = shop.retailer
+    codes = CodeIndex.for_codes(
+        db, retailer, [code for row in items for code in (row["item_code"], row.get("gpm_code"))]
+    )
+    resolved, unmatched = [], []
+    for line, row in enumerate(items, 1):
+        product_id = codes.resolve(retailer, row["item_code"], row.get("gpm_code"))
+        if product_id is None:
+            unmatched.append({"line": line, "item_code": str(row["item_code"]), "qty": row["qty"]})
+        else:
+            resolved.append((product_id, row))
+
+    product_ids = {product_id for product_id, _ in resolved}
+    if shop.type == "normal":
+        stock_rows = {
+            s.product_id: s
+            for s in db.query(MasterStock).filter(MasterStock.product_id.in_(product_ids))
+        }
+    else:
+        ensure_consignment_rows(db, shop.id, product_ids)
+        stock_rows = {
+            s.product_id: s
+            for s in db.query(ConsignmentStock).filter(
+                ConsignmentStock.shop_id == shop.id,
+                ConsignmentStock.product_id.in_(product_ids)
+            )
+        }
 
+    # Process items
+    touched = {}  # product_id -> stock row it changed
+    for product_id, row in resolved:
         qty = row["qty"]
 
         db.add(InvoiceItem(
             invoice_id=invoice.id,
-            product_id=product.id,
+            product_id=product_id,
             quantity=qty,
             rate=row["rate"]
         ))
 
+        stock = stock_rows.get(product_id)
         if shop.type == "normal":
-            stock = db.query(MasterStock).filter_by(product_id=product.id).first()
-            if stock.quantity < qty:
+            if stock is None or stock.quantity < qty:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="Not enough master stock"
                 )
             stock.quantity -= qty
         else:
-            cons = db.query(ConsignmentStock).filter_by(
-                product_id=product.id,
-                shop_id=shop.id
-            ).first()
-
-            if not cons:
-                cons = ConsignmentStock(product_id=product.id, shop_id=shop.id, quantity=0)
-                db.add(cons)
-
-            cons.quantity += qty
+            stock.quantity += qty
+        touched[product_id] = stock
 
+    event_shop_id = reorder.MASTER_SHOP_ID if shop.type == "normal" else shop.id
+    changes = [
+        events.stock_event(event_shop_id, product_id, row.quantity)
+        for product_id, row in touched.items()
+    ]
+    changes += reorder.evaluate(db, event_shop_id, touched)
     db.commit()
-    return {"message": "Invoice processed successfully", "invoice_id": invoice.id}
+    events.broker.publish(changes)
+    audit.record("mutation", "upload_invoice", current_user.username, detail={
+        "invoice_id": invoice.id, "invoice_no": invoice_no, "shop": shop.name,
+        "lines": len(items), "matched": len(resolved), "sha256": upload.sha256,
+    })
+    return {
+        "message": "Invoice processed successfully",
+        "invoice_id": invoice.id,
+        "lines": len(items),
+        "matched": len(resolved),
+        "unmatched": unmatched
+    }
 
 
 @app.get("/invoices")
-async def list_invoices(
+def list_invoices(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -583,10 +903,85 @@ async def list_invoices(
     ]
 
 
+@app.get("/invoices/{invoice_id}")
+def get_invoice(
+    invoice_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Invoice header, shop and line items with product details and totals"""
+    invoice = (
+        db.query(Invoice)
+        .options(
+            joinedload(Invoice.shop),
+            selectinload(Invoice.items).joinedload(InvoiceItem.product),
+        )
+        .filter(Invoice.id == invoice_id)
+        .first()
+    )
+    if not invoice:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Invoice not found"
+        )
+
+    items = [
+        {
+            "id": item.id,
+            "product_id": item.product_id,
+            "item_code": item.product.item_code if item.product else None,
+            "gpm_code": item.product.gpm_code if item.product else None,
+            "description": item.product.description if item.product else None,
+            "quantity": item.quantity or 0,
+            "rate": item.rate or 0.0,
+            "line_total": round((item.quantity or 0) * (item.rate or 0.0), 2),
+        }
+        for item in invoice.items
+    ]
+    return {
+        "id": invoice.id,
+        "invoice_no": invoice.invoice_no,
+        "date": invoice.date.isoformat() if invoice.date else None,
+        "shop": {
+            "id": invoice.shop.id,
+            "name": invoice.shop.name,
+            "type": invoice.shop.type,
+        } if invoice.shop else None,
+        "items": items,
+        "items_count": len(items),
+        "total_quantity": sum(item["quantity"] for item in items),
+        "total_amount": round(sum(item["line_total"] for item in items), 2),
+    }
+
+
+@app.post("/stock/transfers")
+def transfer_stock(
+    data: TransferBatch,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Move consignment stock between shops or back to master, as one atomic batch"""
+    from app.services.transfers import TransferError, apply_transfers
+
+    try:
+        with metrics.timed("apply_transfers"):
+            summary, changes = apply_transfers(db, (line.model_dump() for line in data.lines))
+    except TransferError as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT if not e.problems else status.HTTP_400_BAD_REQUEST,
+            detail={"message": str(e), "problems": e.problems}
+        )
+    db.commit()
+    events.broker.publish(changes)
+    audit.record("mutation", "transfer_stock", current_user.username, detail=summary)
+    return {"message": "Transfer recorded", **summary}
+
+
 # ==================== Sales Routes ====================
 
 @app.post("/consignment/sale")
-async def record_sale(
+def record_sale(
     data: SaleInput,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -638,12 +1033,22 @@ async def record_sale(
         date=date.today()
     ))
 
+    changes = [
+        events.stock_event(shop.id, product.id, cons_stock.quantity),
+        events.stock_event(reorder.MASTER_SHOP_ID, product.id, master.quantity),
+    ]
+    changes += reorder.evaluate(db, shop.id, [product.id])
+    changes += reorder.evaluate(db, reorder.MASTER_SHOP_ID, [product.id])
     db.commit()
+    events.broker.publish(changes)
+    audit.record("mutation", "record_sale", current_user.username, detail={
+        "shop": shop.name, "item_code": product.item_code, "qty": data.qty,
+    })
     return {"message": "Sale recorded successfully"}
 
 
 @app.get("/sales/consignment")
-async def view_sales(
+def view_sales(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -652,7 +1057,7 @@ async def view_sales(
 
 
 @app.get("/stock-movements")
-async def list_stock_movements(
+def list_stock_movements(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -670,20 +1075,216 @@ async def list_stock_movements(
     ]
 
 
+# ==================== Dashboard Routes ====================
+
+@app.get("/dashboard/summary")
+def view_dashboard_summary(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Counts, stock totals and value, recent invoices and sales, and low-stock alerts"""
+    with metrics.timed("dashboard_summary"):
+        return dashboard_summary(db)
+
+
+# ==================== Sync Routes ====================
+
+@app.get("/sync")
+def sync_changes(
+    since: int = Query(0, ge=0, description="Cursor returned by the previous call"),
+    limit: int = Query(1000, ge=1, le=10000),
+    tables: Optional[str] = Query(None, description="Comma-separated table names"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Rows inserted, changed or deleted since a cursor, for local replicas"""
+    from app.services.sync import changes_since
+
+    wanted = {t.strip() for t in tables.split(",") if t.strip()} if tables else None
+    with metrics.timed("sync_changes"):
+        return changes_since(db, since, limit, wanted)
+
+
+# ==================== Alert Routes ====================
+
+@app.get("/alerts/low-stock")
+def view_low_stock(
+    shop_id: Optional[int] = Query(None, description="0 for master stock"),
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Stock rows at or below their reorder level, most urgent first, one page at a time"""
+    return {
+        "limit": limit,
+        "offset": offset,
+        "total": reorder.count_alerts(db, shop_id),
+        "items": reorder.list_alerts(db, shop_id, limit=limit, offset=offset),
+    }
+
+
+@app.post("/alerts/reorder-level")
+def set_reorder_level(
+    data: ReorderLevelInput,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Set a product's reorder level, or override it for one consignment shop"""
+    product = db.query(Product).filter(Product.item_code == data.item_code).first()
+    if not product:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Product not found"
+        )
+
+    if data.shop_name is None:
+        product.reorder_level = data.reorder_level
+        # The product level also applies to shops without an override
+        alerts = reorder.evaluate(db, None, [product.id])
+    else:
+        cons = (
+            db.query(ConsignmentStock)
+            .join(Shop, Shop.id == ConsignmentStock.shop_id)
+            .filter(Shop.name == data.shop_name, ConsignmentStock.product_id == product.id)
+            .first()
+        )
+        if not cons:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Product is not stocked at this consignment shop"
+            )
+        cons.reorder_level = data.reorder_level
+        alerts = reorder.evaluate(db, cons.shop_id, [product.id])
+
+    db.commit()
+    events.broker.publish(alerts)
+    audit.record("mutation", "set_reorder_level", current_user.username, detail=data.model_dump())
+    return {"message": "Reorder level updated", "alerts_changed": len(alerts)}
+
+
+@app.get("/events")
+async def event_stream(
+    request: Request,
+    types: Optional[str] = Query(None, description="Comma-separated event types"),
+    current_user: User = Depends(get_stream_user)
+):
+    """
+    Server-sent events for live dashboards: stock changes (product, shop,
+    new quantity), low_stock / restocked alerts, and resync when the
+    client fell behind and should refetch.
+    """
+    wanted = {t.strip() for t in types.split(",") if t.strip()} if types else None
+    subscription = events.broker.subscribe(wanted)
+    return StreamingResponse(
+        events.stream(subscription, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ==================== Analytics Routes ====================
+
+@app.get("/analytics/replenishment")
+def view_replenishment(
+    shop_id: Optional[int] = Query(None),
+    target_days: int = Query(14, ge=1, le=365, description="Days of cover to top up to"),
+    lookback_days: int = Query(90, ge=7, le=730),
+    limit: int = Query(200, ge=1, le=10000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Sell-through velocity, forecast and days of cover per consignment shop and product"""
+    # NumPy/pandas are imported on first use to keep startup fast
+    from app.services.analytics import replenishment_plan
+
+    with metrics.timed("replenishment_plan"):
+        return replenishment_plan(db, shop_id, target_days, lookback_days, limit)
+
+
+# ==================== Allocation Routes ====================
+
+def _allocation_shops(db: Session, shop_id: Optional[int], retailer: Optional[str]) -> Optional[list[int]]:
+    if shop_id is not None:
+        return [shop_id]
+    if retailer:
+        return [s for (s,) in db.query(Shop.id).filter(Shop.retailer == retailer.strip().lower())]
+    return None
+
+
+@app.get("/allocation/plan")
+def view_allocation_plan(
+    shop_id: Optional[int] = Query(None),
+    retailer: Optional[str] = Query(None, description="Only shops of this retailer, e.g. naivas"),
+    target_days: int = Query(14, ge=1, le=365, description="Days of cover to top up to"),
+    lookback_days: int = Query(90, ge=7, le=730),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Proposed dispatch of master stock to consignment shops, as draft invoice lines"""
+    from app.services.allocation import draft_invoices, plan_allocation
+
+    with metrics.timed("plan_allocation"):
+        plan = plan_allocation(db, _allocation_shops(db, shop_id, retailer), target_days, lookback_days)
+    drafts = draft_invoices(db, plan)
+    return {
+        "shops": len(drafts),
+        "units": int(plan["qty"].sum()) if not plan.empty else 0,
+        "drafts": [
+            {
+                "shop": shop_name,
+                "invoice_no": frame["InvoiceNo"].iloc[0],
+                "lines": [
+                    {"item_code": item_code, "qty": int(qty), "rate": rate}
+                    for item_code, qty, rate in zip(frame["ItemCode"], frame["Qty"], frame["Rate"])
+                ],
+            }
+            for shop_name, frame in drafts.items()
+        ],
+    }
+
+
+@app.get("/allocation/drafts")
+def export_allocation_drafts(
+    shop_id: Optional[int] = Query(None),
+    retailer: Optional[str] = Query(None),
+    target_days: int = Query(14, ge=1, le=365),
+    lookback_days: int = Query(90, ge=7, le=730),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Draft invoices as a zip of Excel files, each ready for /upload-invoice"""
+    from app.services.allocation import draft_invoices, drafts_archive, plan_allocation
+
+    with metrics.timed("plan_allocation"):
+        plan = plan_allocation(db, _allocation_shops(db, shop_id, retailer), target_days, lookback_days)
+    with metrics.timed("export_allocation_drafts"):
+        stream = drafts_archive(draft_invoices(db, plan))
+
+    return StreamingResponse(
+        stream,
+        media_type="application/zip",
+        headers={"Content-Disposition": "attachment; filename=allocation_drafts.zip"}
+    )
+
+
 # ==================== Export Routes ====================
 
 @app.get("/export/stock")
-async def export_stock(
+def export_stock(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Export stock data to Excel"""
+    import pandas as pd
+
     stock = db.query(MasterStock).all()
     data = [{"Product ID": s.product_id, "Quantity": s.quantity} for s in stock]
     df = pd.DataFrame(data)
 
     stream = io.BytesIO()
-    df.to_excel(stream, index=False)
+    with metrics.timed("export_stock_excel"):
+        df.to_excel(stream, index=False)
     stream.seek(0)
 
     return StreamingResponse(
@@ -694,21 +1295,31 @@ async def export_stock(
 
 
 @app.get("/export/stock-pdf")
-async def export_pdf(
+def export_pdf(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Export stock data to PDF"""
-    file_path = "stock_report.pdf"
-    doc = SimpleDocTemplate(file_path, pagesize=A4)
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Table
+
+    # Built in memory: a shared file path would collide between concurrent requests
+    stream = io.BytesIO()
+    doc = SimpleDocTemplate(stream, pagesize=A4)
 
     stock = db.query(MasterStock).all()
     data = [["Product ID", "Qty"]] + [[s.product_id, s.quantity] for s in stock]
 
     table = Table(data)
-    doc.build([table])
+    with metrics.timed("export_stock_pdf"):
+        doc.build([table])
+    stream.seek(0)
 
-    return FileResponse(file_path)
+    return StreamingResponse(
+        stream,
+        media_type="application/pdf",
+        headers={"Content-Disposition": "attachment; filename=stock_report.pdf"}
+    )
 
 
 # ==================== Health Check ====================
@@ -723,6 +1334,17 @@ async def root():
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint(request: Request):
+    """Performance metrics in Prometheus text format, for allow-listed scrapers"""
+    if not metrics.scrape_allowed(request.client.host if request.client else None):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Metrics are not available from this address"
+        )
+    return PlainTextResponse(metrics.render_metrics(), media_type=metrics.CONTENT_TYPE)
+
+
 @app.get("/health")
 async def health_check():
     """Detailed health check"""
@@ -0,0 +1,107 @@
+"""
+Shared fixtures.
+
+The app binds its engine to DATABASE_URL on import, so the environment
+points at a throwaway directory before anything from ``app`` is
+imported. The database is migrated once per session (tables, search
+index, sync triggers) and emptied after every test.
+
+Every test runs with query diagnostics in ``raise`` mode. The middleware
+checks each request through the test client on its own, so an N+1
+pattern in a handler fails the test that hit it while fixtures seed data
+however they like; a test calling a service directly wraps that call in
+``query_diagnostics.track_queries``.
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+_TMP = tempfile.mkdtemp(prefix="inventory-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_TMP}/test.db"
+os.environ["INVENTORY_STATE_URL"] = f"sqlite:///{_TMP}/state.db"
+os.environ["INVENTORY_RATE_LIMIT"] = "0"
+os.environ["INVENTORY_DASHBOARD_TTL"] = "0"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import insert, text  # noqa: E402
+
+import main  # noqa: E402
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.migrate import migrate  # noqa: E402
+from app.models import Product, Shop, MasterStock, ConsignmentStock, User  # noqa: E402
+from app.services import analytics, audit, query_diagnostics  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    migrate()
+    yield engine
+    audit.writer.close()  # flush before the database goes away
+    engine.dispose()
+    shutil.rmtree(_TMP, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def clean_database(database):
+    yield
+    with engine.begin() as connection:
+        for table in reversed(Base.metadata.sorted_tables):
+            connection.execute(table.delete())
+        connection.execute(text("DELETE FROM sync_changes"))  # refilled by the delete triggers
+    # A fresh table can repeat the old sales watermark
+    analytics._sales.update(since=None, days=0, max_id=None, count=0, frame=None)
+    analytics._velocity.clear()
+
+
+@pytest.fixture(autouse=True)
+def query_budget(clean_database):
+    """Fail a request that repeats a statement shape or blows the time budget"""
+    query_diagnostics.configure(mode="raise")
+    yield
+    query_diagnostics.configure(mode="off")
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def client():
+    main.app.dependency_overrides[main.get_current_user] = lambda: User(username="admin")
+    yield TestClient(main.app)
+    main.app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def stock(db):
+    """
+    Three products with 100 units of master stock each, 30 of them out on
+    consignment: P1 and P2 at consignment shop "Branch A" (10 each), P1 at
+    "Branch B" (10). "Retail C" is a normal shop.
+    """
+    db.execute(insert(Product), [
+        {"id": i, "item_code": f"P{i}", "gpm_code": f"G{i}", "description": f"Product {i}"}
+        for i in (1, 2, 3)
+    ])
+    db.execute(insert(Shop), [
+        {"id": 1, "name": "Branch A", "type": "consignment"},
+        {"id": 2, "name": "Branch B", "type": "consignment"},
+        {"id": 3, "name": "Retail C", "type": "normal"},
+    ])
+    db.execute(insert(MasterStock), [{"product_id": i, "quantity": 100} for i in (1, 2, 3)])
+    db.execute(insert(ConsignmentStock), [
+        {"shop_id": 1, "product_id": 1, "quantity": 10},
+        {"shop_id": 1, "product_id": 2, "quantity": 10},
+        {"shop_id": 2, "product_id": 1, "quantity": 10},
+    ])
+    db.commit()
+    return {
+        "products": {"P1": 1, "P2": 2, "P3": 3},
+        "shops": {"Branch A": 1, "Branch B": 2, "Retail C": 3},
+    }
@@ -0,0 +1,43 @@
+from datetime import date, timedelta
+
+from sqlalchemy import insert
+
+from app.models import MasterStock, ConsignmentSale
+from app.services.allocation import plan_allocation
+
+
+def _sell(db, per_day: int):
+    """Sales of P1 at both consignment shops over the last four weeks"""
+    today = date.today()
+    db.execute(insert(ConsignmentSale), [
+        {"shop_id": shop_id, "product_id": 1, "quantity": per_day, "date": today - timedelta(days=age)}
+        for shop_id in (1, 2)
+        for age in range(28)
+    ])
+    db.commit()
+
+
+def test_consigned_units_are_not_dispatched_again(db, stock):
+    _sell(db, 20)  # each shop needs far more than master stock holds
+    plan = plan_allocation(db, target_days=14, lookback_days=28)
+
+    p1 = plan[plan["product_id"] == 1]
+    assert set(p1["shop_id"]) == {1, 2}
+    # 100 units in master stock, 20 of them already at the two shops
+    assert p1["qty"].sum() == 80
+
+
+def test_nothing_to_dispatch_when_all_stock_is_consigned(db, stock):
+    db.query(MasterStock).filter_by(product_id=1).update({"quantity": 20})
+    db.commit()
+    _sell(db, 20)
+    assert plan_allocation(db, target_days=14, lookback_days=28).empty
+
+
+def test_plan_route_reports_the_capped_units(client, db, stock):
+    _sell(db, 20)
+    response = client.get("/allocation/plan", params={"lookback_days": 28})
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["units"] == 80
+    assert {draft["shop"] for draft in body["drafts"]} == {"Branch A", "Branch B"}
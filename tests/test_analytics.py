@@ -0,0 +1,39 @@
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+from sqlalchemy import insert
+
+from app.models import ConsignmentSale
+from app.services import analytics
+
+
+def test_cached_sales_drop_rows_the_window_moved_past(db, stock):
+    today = date.today()
+    db.execute(insert(ConsignmentSale), [
+        {"shop_id": 1, "product_id": 1, "quantity": 1, "date": today - timedelta(days=age)}
+        for age in range(30)
+    ])
+    db.commit()
+
+    watermark = analytics._sales_watermark(db)
+    assert len(analytics._recent_sales(db, today, 30, watermark)) == 30
+
+    # Ten days later, with no new sales, only the last 20 days remain in the window
+    later = analytics._recent_sales(db, today + timedelta(days=10), 30, watermark)
+    assert len(later) == 20
+    assert later["date"].min() == pd.Timestamp(today - timedelta(days=19))
+
+
+def test_short_lookback_velocity_is_per_day_of_window():
+    today = date.today()
+    sales = pd.DataFrame({
+        "id": range(7),
+        "shop_id": [1] * 7,
+        "product_id": [1] * 7,
+        "date": pd.to_datetime([today - timedelta(days=age) for age in range(7)]),
+        "quantity": [2] * 7,
+    })
+    velocity = analytics.compute_velocity(sales, today, lookback_days=7)
+    assert velocity["velocity_7d"].iloc[0] == pytest.approx(2.0)
+    assert velocity["velocity_28d"].iloc[0] == pytest.approx(2.0)
@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+from app.models import AuditLog
+from app.services import audit, metrics
+
+
+def _dropped() -> float:
+    return metrics.AUDIT_DROPPED._values.get(("queue_full",), [0])[0]
+
+
+def _logged(db, *actions) -> list[tuple]:
+    return sorted(
+        db.query(AuditLog.action, AuditLog.username).filter(AuditLog.action.in_(actions))
+    )
+
+
+@pytest.fixture
+def writer(monkeypatch):
+    """A private writer whose entries only reach the database on flush"""
+    writer = audit.AuditWriter(batch_size=2, queue_size=3)
+    monkeypatch.setattr(writer, "_start", lambda: None)
+    return writer
+
+
+def test_mutations_are_written_with_the_username(client, db, monkeypatch):
+    writer = audit.AuditWriter(flush_interval=0.05)
+    monkeypatch.setattr(audit, "writer", writer)
+
+    response = client.post("/shops/add", json={"name": "Branch Z", "type": "consignment"})
+    assert response.status_code == 200
+    response = client.post("/products/add", json={"gpm_code": "G9", "item_code": "Z9", "description": "Audit"})
+    assert response.status_code == 200
+    writer.close()
+
+    assert _logged(db, "add_shop", "add_product") == [("add_product", "admin"), ("add_shop", "admin")]
+    entry = audit.list_entries(db, kind="mutation", action="add_product")[0]
+    assert entry["detail"]["item_code"] == "Z9"
+    assert entry["detail"]["product_id"] == response.json()["product_id"]
+
+
+def test_full_queue_drops_instead_of_blocking(db, writer):
+    before = _dropped()
+    started = time.monotonic()
+    for n in range(5):
+        writer.record("activity", f"drop-test-{n}", "alice")
+    assert time.monotonic() - started < 1
+    assert _dropped() == before + 2
+
+    writer.flush()
+    assert [action for action, _ in _logged(db, *(f"drop-test-{n}" for n in range(5)))] == [
+        "drop-test-0", "drop-test-1", "drop-test-2",
+    ]
+
+
+def test_flush_writes_pending_entries_in_batches(db, writer):
+    for n in range(3):
+        writer.record("activity", f"flush-test-{n}", "bob")
+    writer.flush()
+    assert len(_logged(db, *(f"flush-test-{n}" for n in range(3)))) == 3
+
+
+def test_close_drains_the_writer_thread(db):
+    # A long interval keeps the thread's batch open until shutdown
+    writer = audit.AuditWriter(flush_interval=60)
+    for n in range(3):
+        writer.record("activity", f"close-test-{n}", "carol")
+    started = time.monotonic()
+    writer.close()
+    assert time.monotonic() - started < 5
+    assert not writer._thread.is_alive()
+    assert _logged(db, *(f"close-test-{n}" for n in range(3))) == [
+        (f"close-test-{n}", "carol") for n in range(3)
+    ]
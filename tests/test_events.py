@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from app.services import events
+
+
+@pytest.fixture
+def broker(monkeypatch):
+    broker = events.EventBroker(queue_size=4)
+    monkeypatch.setattr(events, "broker", broker)
+    return broker
+
+
+def _stock(n: int) -> dict:
+    return events.stock_event(1, n, n)
+
+
+def _drain(subscription) -> list[dict]:
+    drained = []
+    while not subscription.queue.empty():
+        drained.append(subscription.queue.get_nowait())
+    return drained
+
+
+async def _publish(broker, batch: list[dict]):
+    # Handlers publish from the threadpool; let the loop run the handoff
+    await asyncio.to_thread(broker.publish, batch)
+    await asyncio.sleep(0)
+
+
+def test_published_events_reach_subscribers_that_want_them(broker):
+    async def scenario():
+        everything = broker.subscribe()
+        alerts_only = broker.subscribe({"low_stock", "restocked"})
+        alert = {"type": "low_stock", "shop_id": 0, "product_id": 2, "quantity": 3, "reorder_level": 10}
+        await _publish(broker, [_stock(1), alert])
+        return _drain(everything), _drain(alerts_only)
+
+    everything, alerts_only = asyncio.run(scenario())
+    assert [e["type"] for e in everything] == ["stock", "low_stock"]
+    assert alerts_only == [everything[1]]
+
+
+def test_full_queue_collapses_to_one_resync(broker):
+    async def scenario():
+        subscription = broker.subscribe()
+        for n in range(1, 11):
+            await _publish(broker, [_stock(n)])
+        return subscription, _drain(subscription)
+
+    subscription, pending = asyncio.run(scenario())
+    # The newest events survive behind a single resync
+    assert [e["type"] for e in pending] == ["resync", "stock", "stock", "stock"]
+    assert [e["product_id"] for e in pending[1:]] == [8, 9, 10]
+    assert pending[0]["dropped"] == subscription.dropped == 7
+
+
+def test_stream_unsubscribes_when_the_client_disconnects(broker):
+    async def scenario():
+        subscription = broker.subscribe()
+        connected = [True, True, False]
+
+        async def is_disconnected():
+            return not connected.pop(0)
+
+        await _publish(broker, [_stock(5)])
+        messages = [message async for message in events.stream(subscription, is_disconnected, keepalive=0.01)]
+        return subscription, messages
+
+    subscription, messages = asyncio.run(scenario())
+    assert messages[0] == ": connected\n\n"
+    assert messages[1] == events.format_sse(_stock(5))
+    assert messages[2:] == [": keepalive\n\n"]
+    assert subscription not in broker._subscriptions
+
+    # Events published after the disconnect go nowhere
+    broker.publish([_stock(6)])
+    assert subscription.queue.empty()
@@ -0,0 +1,8 @@
+from benchmarks.import_time import APP_BUDGET_MS, measure_import
+
+
+def test_main_imports_within_budget_without_heavy_libraries():
+    # The total tracks machine speed; the application's share is what we control
+    result = measure_import("main")
+    assert result["eager_heavy_modules"] == []
+    assert result["app_ms"] <= APP_BUDGET_MS, result["slowest"]
@@ -0,0 +1,72 @@
+import uuid
+
+import pytest
+
+from app.auth_utils import LoginAttemptTracker
+from app.services import shared_state
+
+
+class Clock:
+    """Stands in for the ``time`` module inside shared_state"""
+
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(shared_state, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def state_path(tmp_path):
+    return str(tmp_path / "state.db")
+
+
+def test_five_failures_lock_the_account(client):
+    credentials = {"username": f"user-{uuid.uuid4().hex[:8]}", "password": "wrong-password"}
+    statuses = [client.post("/login", json=credentials).status_code for _ in range(6)]
+    assert statuses == [401] * 5 + [429]
+
+
+def test_failure_counter_expires_after_the_window(state_path, clock):
+    tracker = LoginAttemptTracker(shared_state.SQLiteStateBackend(state_path))
+    for _ in range(4):
+        tracker.record_attempt("alice", success=False)
+
+    # The window started at the first failure; after it the count restarts
+    clock.now += tracker._attempt_window.total_seconds() + 1
+    tracker.record_attempt("alice", success=False)
+    assert tracker.backend.get("login:failures:alice") == "1"
+    assert tracker.is_locked_out("alice") == (False, None)
+
+
+def test_lockout_expires(state_path, clock):
+    tracker = LoginAttemptTracker(shared_state.SQLiteStateBackend(state_path))
+    for _ in range(5):
+        tracker.record_attempt("carol", success=False)
+    assert tracker.is_locked_out("carol")[0]
+
+    clock.now += tracker._lockout_duration.total_seconds() + 1
+    assert tracker.is_locked_out("carol") == (False, None)
+
+
+def test_trackers_on_the_same_state_share_failures(state_path):
+    # Two workers, each with its own tracker and connection
+    first = LoginAttemptTracker(shared_state.SQLiteStateBackend(state_path))
+    second = LoginAttemptTracker(shared_state.SQLiteStateBackend(state_path))
+    for tracker in (first, second, first, second, first):
+        tracker.record_attempt("bob", success=False)
+
+    locked, until = second.is_locked_out("bob")
+    assert locked and until is not None
+    assert first.is_locked_out("bob")[0]
+
+    second.clear_attempts("bob")
+    assert first.is_locked_out("bob") == (False, None)
+    assert first.backend.get("login:failures:bob") is None
@@ -0,0 +1,89 @@
+import ipaddress
+import re
+
+import pytest
+
+from app.services import metrics
+
+SAMPLE = re.compile(r'^([a-z_]+)(\{[^}]*\})? (-?[0-9.e+-]+|\+Inf)$')
+
+
+def _parse(text: str) -> tuple[dict, dict]:
+    """Samples keyed by (name, labels) and the declared type of each metric"""
+    samples, types = {}, {}
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ")
+            types[name] = kind
+        elif line and not line.startswith("# HELP "):
+            match = SAMPLE.match(line)
+            assert match, f"Malformed sample line: {line}"
+            name, labels, value = match.groups()
+            samples[(name, labels or "")] = float(value)
+    return samples, types
+
+
+@pytest.fixture
+def scraper(monkeypatch):
+    monkeypatch.setattr(metrics, "scrape_allowed", lambda host: True)
+
+
+def _scrape(client) -> dict:
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    samples, types = _parse(response.text)
+    assert types["http_requests_total"] == "counter"
+    assert types["http_request_duration_seconds"] == "histogram"
+    return samples
+
+
+def test_exposition_after_requests(client, stock, scraper):
+    route = 'method="GET",route="/shops"'
+    before = _scrape(client).get(("http_requests_total", "{" + route + ',status="200"}'), 0)
+    for _ in range(3):
+        assert client.get("/shops").status_code == 200
+    samples = _scrape(client)
+
+    assert samples[("http_requests_total", "{" + route + ',status="200"}')] == before + 3
+
+    buckets = [
+        (labels, value) for (name, labels), value in samples.items()
+        if name == "http_request_duration_seconds_bucket" and labels.startswith("{" + route + ",")
+    ]
+    bounds = [f'le="{bound!r}"' for bound in metrics.LATENCY_BUCKETS] + ['le="+Inf"']
+    assert [labels.rsplit(",", 1)[1][:-1] for labels, _ in buckets] == bounds
+    counts = [value for _, value in buckets]
+    assert counts == sorted(counts)  # cumulative
+    assert counts[-1] == samples[("http_request_duration_seconds_count", "{" + route + "}")] >= 3
+    assert samples[("http_request_db_queries_count", "{" + route + "}")] == counts[-1]
+
+
+def test_histogram_bucket_bounds_are_inclusive():
+    histogram = metrics.Histogram("test_seconds", "Test", buckets=(0.1, 1.0))
+    for value in (0.1, 0.5, 1.0, 3.0):
+        histogram.observe(value)
+    samples, types = _parse("\n".join(histogram.render()))
+
+    assert types == {"test_seconds": "histogram"}
+    assert samples[("test_seconds_bucket", '{le="0.1"}')] == 1
+    assert samples[("test_seconds_bucket", '{le="1.0"}')] == 3
+    assert samples[("test_seconds_bucket", '{le="+Inf"}')] == 4
+    assert samples[("test_seconds_sum", "")] == pytest.approx(4.6)
+    assert samples[("test_seconds_count", "")] == 4
+
+
+def test_labels_are_escaped():
+    counter = metrics.Counter("test_total", "Test", ("path",))
+    counter.inc(('a"b\\c',))
+    assert counter.render()[-1] == 'test_total{path="a\\"b\\\\c"} 1'
+
+
+def test_metrics_answer_only_allow_listed_clients(client, monkeypatch):
+    # The test client has no address, like an unknown peer
+    assert client.get("/metrics").status_code == 403
+
+    monkeypatch.setattr(metrics, "SCRAPE_NETWORKS", [ipaddress.ip_network("10.0.0.0/8")])
+    assert metrics.scrape_allowed("10.1.2.3")
+    assert not metrics.scrape_allowed("192.168.1.1")
+    assert not metrics.scrape_allowed(None)
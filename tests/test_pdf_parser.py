@@ -0,0 +1,64 @@
+import os
+
+import pytest
+
+from app.services import pdf_parser
+
+
+MARCH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Data", "March")
+
+
+# Expected values are read off the printed invoices: the goods amount is the
+# SUBTOTAL plus the commission line, and rates >= 1,000 print with separators
+@pytest.mark.parametrize("file_name, shop_name, lines, units, goods_amount, thousands", [
+    ("N _Malindi GPM-1674.pdf", "Naivas Limited-Malindi", 12, 76, 31073.28, 2),
+    ("N_Bamburi GPM-1637.pdf", "Naivas Limited-Bamburi Branch", 11, 76, 28904.30, 1),
+    ("N_Capital center GPM-1639.pdf", "Naivas limited-Capital center", 16, 109, 42240.51, 4),
+    ("N_Thindigua GPM-1696.pdf", "Naivas Limited-Thindigua", 15, 119, 46103.43, 3),
+    # Customer line is just "Naivas Limited"; the branch is on the next line
+    ("N_Kahawa sukari GPM-1654.pdf", "Naivas Limited-Kahawa Sukari", 7, 41, 14616.37, 1),
+    ("N_ ndogo GPM-1683.pdf", "Naivas limited-Ndogo", 3, 7, 2711.21, 0),
+])
+def test_naivas_invoices(file_name, shop_name, lines, units, goods_amount, thousands):
+    invoice = pdf_parser.parse_invoice(os.path.join(MARCH, file_name))
+
+    assert invoice.template == "naivas"
+    assert (invoice.retailer, invoice.shop_type) == ("naivas", "consignment")
+    assert invoice.shop_name == shop_name
+    assert invoice.invoice_no == "GPM-" + file_name.rsplit("GPM-", 1)[1].removesuffix(".pdf")
+    assert len(invoice.items) == lines
+    assert sum(item["qty"] for item in invoice.items) == units
+    assert sum(item["qty"] * item["rate"] for item in invoice.items) == pytest.approx(goods_amount, abs=0.01)
+    assert sum(item["rate"] >= 1000 for item in invoice.items) == thousands
+
+
+ITEM_LINE = "736060612 N055039 GPM ANIMALS 2 1,232.50 2,465.00\n"
+
+
+def _tax_invoice(customer: str, branch: str = "00100 Nairobi, Nairobi Kenya") -> str:
+    return (
+        f"GLOBAL PARAGON MARCANTE\nTAX INVOICE\nBILL TO INVOICE GPM-2001\n"
+        f"{customer} DATE 01/05/2025\n{branch}\n"
+        f"GPM CODE CODE DESCRIPTION QTY RATE AMOUNT\n{ITEM_LINE}"
+    )
+
+
+# Data/March holds only Naivas invoices, so the other layouts are checked on text
+@pytest.mark.parametrize("text, template, shop_name", [
+    (_tax_invoice("Majid Al Futtaim Hypermarkets-Junction"), "carrefour", "Majid Al Futtaim Hypermarkets-Junction"),
+    (_tax_invoice("Carrefour", "Carrefour-Two Rivers"), "carrefour", "Carrefour-Two Rivers"),
+    (_tax_invoice("Quick Mart-Kilimani"), "qm", "Quick Mart-Kilimani"),
+    (_tax_invoice("Toy World-Sarit"), "gpm_tax_invoice", "Toy World-Sarit"),
+    (f"INVOICE GPM-2002\nBILL TO\nToy World Ltd\n{ITEM_LINE}", "gpm_plain", "Toy World Ltd"),
+])
+def test_template_detection(text, template, shop_name):
+    detected = pdf_parser.detect_template(text)
+    assert detected.name == template
+
+    invoice = detected.parse(text)
+    assert invoice.shop_name == shop_name
+    assert invoice.items == [{"gpm_code": "736060612", "item_code": "N055039", "qty": 2, "rate": 1232.5}]
+
+
+def test_unrecognised_layout():
+    assert pdf_parser.detect_template("RECEIPT\nThank you for shopping") is None
@@ -0,0 +1,59 @@
+import io
+
+import pandas as pd
+import pytest
+from sqlalchemy import insert
+
+from app.models import Shop, ConsignmentStock, ProductCode
+from app.services.product_codes import CodeIndex
+
+
+@pytest.fixture
+def codes(db, stock):
+    db.execute(insert(ProductCode), [
+        # Carrefour's "P2" is our P3, not our P2
+        {"retailer": "carrefour", "code": "P2", "product_id": 3},
+        {"retailer": "carrefour", "code": "CF100", "product_id": 1},
+        {"retailer": "carrefour", "code": "CF999", "product_id": None},  # label with no product yet
+        {"retailer": "qm", "code": "QM7", "product_id": 2},
+    ])
+    db.commit()
+
+
+def test_retailer_code_shadows_an_item_code(db, codes):
+    index = CodeIndex.for_codes(db, "carrefour", ["P2", "CF100"])
+    assert index.resolve("carrefour", "P2") == 3
+    assert index.resolve("carrefour", "CF100") == 1
+    # Without a code of their own, other retailers get our item code
+    assert index.resolve(None, "P2") == 2
+    assert CodeIndex.for_codes(db, "naivas", ["P2"]).resolve("naivas", "P2") == 2
+
+
+def test_code_unknown_for_the_retailer(db, codes):
+    index = CodeIndex.for_codes(db, "carrefour", ["QM7", "CF999", "G3"])
+    # Another retailer's code and an unlinked label resolve to nothing
+    assert index.resolve("carrefour", "QM7") is None
+    assert index.resolve("carrefour", "CF999") is None
+    # The GPM code on the same line is the fallback
+    assert index.resolve("carrefour", "CF999", "G3") == 3
+
+
+def test_upload_reports_unmatched_lines(client, db, codes):
+    db.execute(insert(Shop), [{"id": 4, "name": "Carrefour Junction", "type": "consignment", "retailer": "carrefour"}])
+    db.commit()
+    buffer = io.BytesIO()
+    pd.DataFrame([
+        {"Shop": "Carrefour Junction", "InvoiceNo": "CF-1", "ItemCode": code, "Qty": qty, "Rate": 5.0}
+        for code, qty in (("CF100", 2), ("P2", 3), ("QM7", 4), ("NOPE", 5))
+    ]).to_excel(buffer, index=False)
+
+    response = client.post("/upload-invoice", files={"file": ("invoice.xlsx", buffer.getvalue())})
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert (body["lines"], body["matched"]) == (4, 2)
+    assert body["unmatched"] == [
+        {"line": 3, "item_code": "QM7", "qty": 4},
+        {"line": 4, "item_code": "NOPE", "qty": 5},
+    ]
+    credited = dict(db.query(ConsignmentStock.product_id, ConsignmentStock.quantity).filter_by(shop_id=4))
+    assert credited == {1: 2, 3: 3}
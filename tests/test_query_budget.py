@@ -0,0 +1,61 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import insert
+
+from app.models import Product, Shop, MasterStock, Invoice, InvoiceItem, ConsignmentSale
+from app.services import dashboard, query_diagnostics, reorder
+
+
+def test_repeated_statement_shape_fails(db):
+    with pytest.raises(query_diagnostics.QueryBudgetExceeded):
+        with query_diagnostics.track_queries("loop"):
+            for product_id in range(6):
+                db.query(Product).filter(Product.id == product_id).first()
+
+
+def test_invoice_detail_loads_lines_in_two_queries(db, client):
+    db.execute(insert(Product), [{"id": i, "item_code": f"D{i}", "description": f"Detail {i}"} for i in range(1, 9)])
+    db.execute(insert(Shop), [{"id": 1, "name": "Detail Shop", "type": "consignment"}])
+    db.execute(insert(Invoice), [{"id": 1, "invoice_no": "INV-1", "shop_id": 1, "date": date.today()}])
+    db.execute(insert(InvoiceItem), [
+        {"invoice_id": 1, "product_id": i, "quantity": 2, "rate": 5.0} for i in range(1, 9)
+    ])
+    db.commit()
+
+    # One lazy product load per line would repeat a statement 8 times
+    response = client.get("/invoices/1")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["items_count"] == 8
+    assert body["total_amount"] == 80.0
+
+
+def test_dashboard_summary_query_count(db, stock):
+    db.execute(insert(Invoice), [
+        {"id": i, "invoice_no": f"INV-{i}", "shop_id": 1, "date": date(2026, 3, i)} for i in (1, 2)
+    ])
+    db.execute(insert(InvoiceItem), [
+        {"invoice_id": 2, "product_id": 1, "quantity": 3, "rate": 2.5},
+        {"invoice_id": 2, "product_id": 2, "quantity": 1, "rate": 4.0},
+    ])
+    db.execute(insert(ConsignmentSale), [{"shop_id": 2, "product_id": 1, "quantity": -4, "date": date(2026, 3, 3)}])
+    db.query(MasterStock).filter_by(product_id=3).update({"quantity": 2})
+    reorder.rebuild_alerts(db)
+    db.commit()
+
+    with query_diagnostics.track_queries("dashboard") as tracker:
+        summary = dashboard.build_summary(db, recent=1)
+    assert tracker.query_count == 1
+    assert (summary["products"], summary["consignment_units"]) == (3, 30)
+    assert summary["stock_value"] == 650.0  # 100 units each of P1 and P2 at their invoiced rates
+    assert (summary["low_stock_master"], summary["low_stock_consignment"]) == (1, 3)
+    assert summary["recent_invoices"] == [{
+        "id": 2, "invoice_no": "INV-2", "date": "2026-03-02", "shop_name": "Branch A",
+        "shop_type": "consignment", "items_count": 2, "total_amount": 11.5,
+    }]
+    assert summary["recent_sales"] == [{
+        "id": 1, "date": "2026-03-03", "quantity": 4, "shop_name": "Branch B",
+        "item_code": "P1", "description": "Product 1",
+    }]
+    assert summary["low_stock"] == reorder.list_alerts(db, reorder.MASTER_SHOP_ID)
@@ -0,0 +1,58 @@
+import uuid
+
+import pytest
+
+from app.services import rate_limit
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    """Limiting on, with a two-request burst that does not refill during a test"""
+    monkeypatch.setattr(rate_limit, "ENABLED", True)
+    monkeypatch.setattr(rate_limit, "LIMITS", {name: (0.001, 2) for name in rate_limit.LIMITS})
+
+
+@pytest.mark.parametrize("method, path, expected", [
+    ("GET", "/products", "read"),
+    ("HEAD", "/shops", "read"),
+    ("POST", "/stock/transfers", "write"),
+    ("POST", "/upload-invoice", "upload"),
+    ("POST", "/products/import", "upload"),
+    ("GET", "/allocation/plan", "heavy"),
+    ("GET", "/export/stock", "heavy"),
+    ("GET", "/stock/as-of", "heavy"),
+    ("GET", "/health", None),
+    ("GET", "/events", None),
+    ("OPTIONS", "/products", None),
+])
+def test_route_class(method, path, expected):
+    assert rate_limit.route_class(method, path) == expected
+
+
+def test_bucket_empties_after_the_burst(limits):
+    client = uuid.uuid4().hex
+    assert rate_limit.check(client, "GET", "/products") is None
+    assert rate_limit.check(client, "GET", "/products") is None
+    assert rate_limit.check(client, "GET", "/products") >= 1
+
+    # Other classes and other clients have buckets of their own
+    assert rate_limit.check(client, "POST", "/upload-invoice") is None
+    assert rate_limit.check(uuid.uuid4().hex, "GET", "/products") is None
+
+
+def test_state_store_failure_lets_requests_through(limits, monkeypatch):
+    def unavailable(*args):
+        raise ConnectionError("state store down")
+
+    monkeypatch.setattr(rate_limit, "take_token", unavailable)
+    assert rate_limit.check(uuid.uuid4().hex, "GET", "/products") is None
+
+
+def test_middleware_answers_429_with_retry_after(client, limits):
+    # Without a bearer token the bucket is keyed on the client address
+    assert [client.get("/shops").status_code for _ in range(3)] == [200, 200, 429]
+
+    response = client.get("/shops")
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert client.get("/health").status_code == 200
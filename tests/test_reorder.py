@@ -0,0 +1,91 @@
+from app.models import Product, MasterStock, ConsignmentStock, LowStockAlert
+from app.services import reorder
+from app.services.transfers import apply_transfers
+
+MASTER = reorder.MASTER_SHOP_ID
+
+
+def _alerts(db) -> list[tuple]:
+    return sorted(db.query(
+        LowStockAlert.shop_id, LowStockAlert.product_id, LowStockAlert.quantity, LowStockAlert.reorder_level,
+    ))
+
+
+def _kinds(events: list[dict]) -> list[tuple]:
+    return sorted((e["type"], e["shop_id"], e["product_id"]) for e in events)
+
+
+def test_alert_raised_at_the_reorder_level_and_cleared_on_recovery(db, stock):
+    db.query(MasterStock).filter_by(product_id=3).update({"quantity": 11})
+    assert reorder.evaluate(db, MASTER, [3]) == []
+
+    # At the level counts as low
+    db.query(MasterStock).filter_by(product_id=3).update({"quantity": 10})
+    assert _kinds(reorder.evaluate(db, MASTER, [3])) == [("low_stock", MASTER, 3)]
+    db.query(MasterStock).filter_by(product_id=3).update({"quantity": 4})
+    assert reorder.evaluate(db, MASTER, [3]) == []  # still low: no new event
+    assert _alerts(db) == [(MASTER, 3, 4, reorder.DEFAULT_REORDER_LEVEL)]
+
+    db.query(MasterStock).filter_by(product_id=3).update({"quantity": 50})
+    assert _kinds(reorder.evaluate(db, MASTER, [3])) == [("restocked", MASTER, 3)]
+    assert _alerts(db) == []
+
+
+def test_reorder_level_change_alone_flips_alerts(client, db, stock):
+    reorder.rebuild_alerts(db)
+    db.commit()
+    # Every consignment row holds 10 units, at the default level
+    assert _alerts(db) == [(1, 1, 10, 10), (1, 2, 10, 10), (2, 1, 10, 10)]
+
+    response = client.post("/alerts/reorder-level", json={"item_code": "P3", "reorder_level": 100})
+    assert response.json()["alerts_changed"] == 1
+    assert (MASTER, 3, 100, 100) in _alerts(db)
+
+    # A shop override applies to that shop only
+    response = client.post("/alerts/reorder-level", json={
+        "item_code": "P1", "shop_name": "Branch A", "reorder_level": 5,
+    })
+    assert response.json()["alerts_changed"] == 1
+    assert _alerts(db) == [(MASTER, 3, 100, 100), (1, 2, 10, 10), (2, 1, 10, 10)]
+
+    # The product level reaches shops without an override
+    response = client.post("/alerts/reorder-level", json={"item_code": "P1", "reorder_level": 9})
+    assert response.json()["alerts_changed"] == 1
+    assert _alerts(db) == [(MASTER, 3, 100, 100), (1, 2, 10, 10)]
+    assert db.query(Product.reorder_level).filter_by(id=1).scalar() == 9
+    assert db.query(ConsignmentStock.reorder_level).filter_by(shop_id=1, product_id=1).scalar() == 5
+
+
+def test_rebuild_agrees_with_incremental_evaluation_after_a_transfer(db, stock):
+    reorder.rebuild_alerts(db)
+    db.commit()
+
+    _, changes = apply_transfers(db, [
+        {"from_shop": "Branch A", "to_shop": "Branch B", "item_code": "P1", "qty": 6},
+        {"from_shop": "Branch A", "to_shop": None, "item_code": "P2", "qty": 1},
+    ])
+    db.commit()
+    assert [e for e in _kinds(changes) if e[0] != "stock"] == [("restocked", 2, 1)]
+    incremental = _alerts(db)
+    assert incremental == [(1, 1, 4, 10), (1, 2, 9, 10)]
+
+    assert reorder.rebuild_alerts(db) == []
+    db.commit()
+    assert _alerts(db) == incremental
+
+
+def test_low_stock_route_pages_alerts(client, db, stock):
+    db.query(ConsignmentStock).filter_by(shop_id=1, product_id=2).update({"quantity": 2})
+    reorder.rebuild_alerts(db)
+    db.commit()
+
+    response = client.get("/alerts/low-stock", params={"limit": 2})
+    body = response.json()
+    assert (body["total"], body["limit"], body["offset"]) == (3, 2, 0)
+    # Furthest below its level first
+    assert [(a["shop_id"], a["product_id"]) for a in body["items"]] == [(1, 2), (1, 1)]
+
+    body = client.get("/alerts/low-stock", params={"limit": 2, "offset": 2}).json()
+    assert [(a["shop_name"], a["item_code"]) for a in body["items"]] == [("Branch B", "P1")]
+    assert client.get("/alerts/low-stock", params={"shop_id": MASTER}).json()["total"] == 0
+    assert client.get("/alerts/low-stock", params={"limit": 0}).status_code == 422
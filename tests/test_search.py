@@ -0,0 +1,83 @@
+import pytest
+from sqlalchemy import create_engine, insert, text
+
+from app.database import Base
+from app.models import Product
+from app.services import search
+
+
+@pytest.fixture
+def catalog(db):
+    db.execute(insert(Product), [
+        {"id": 1, "item_code": "N055039", "gpm_code": "736000001", "description": "GPM ANIMALS ASSORTED"},
+        {"id": 2, "item_code": "N055040", "gpm_code": "736000002", "description": "GPM PUZZLE BLOCKS"},
+        {"id": 3, "item_code": "BALL10", "gpm_code": "736000003", "description": "GPM CRAYONS BOX"},
+        {"id": 4, "item_code": "C2", "gpm_code": "736000004", "description": "GPM BALL PACK"},
+    ])
+    db.commit()
+
+
+def _ids(result: dict) -> list[int]:
+    return [item["id"] for item in result["items"]]
+
+
+def test_every_token_matches_as_a_prefix(db, catalog):
+    assert _ids(search.search_products(db, "gpm anim")) == [1]
+    assert sorted(_ids(search.search_products(db, "N0550"))) == [1, 2]
+    assert search.search_products(db, "736000003")["total"] == 1
+    assert search.search_products(db, "anim puzzle")["total"] == 0
+    assert search.search_products(db, "  ,; ") == {"total": 0, "items": []}
+
+
+def test_description_matches_rank_above_code_matches(db, catalog):
+    # "ball" is in product 4's description and product 3's item code
+    assert _ids(search.search_products(db, "ball")) == [4, 3]
+
+
+def test_triggers_follow_inserts_updates_and_deletes(client, db, catalog):
+    response = client.post("/products/add", json={
+        "gpm_code": "736000009", "item_code": "K100", "description": "GPM KITE RED",
+    })
+    assert response.status_code == 200, response.text
+    assert search.search_products(db, "kite")["total"] == 1
+
+    db.query(Product).filter_by(item_code="K100").update({"description": "GPM GLIDER RED"})
+    db.commit()
+    assert search.search_products(db, "kite")["total"] == 0
+    assert search.search_products(db, "glider")["total"] == 1
+
+    db.query(Product).filter_by(item_code="K100").delete()
+    db.commit()
+    assert search.search_products(db, "glider")["total"] == 0
+
+
+def test_search_route_pages_results(client, catalog):
+    response = client.get("/products/search", params={"q": "gpm", "limit": 3, "offset": 2})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total"] == 4
+    assert len(body["items"]) == 2
+
+
+def test_like_fallback_without_the_index(db, catalog, monkeypatch):
+    monkeypatch.setattr(search, "fts_available", lambda db: False)
+    assert _ids(search.search_products(db, "gpm anim")) == [1]
+    assert sorted(_ids(search.search_products(db, "N0550"))) == [1, 2]
+    assert search.search_products(db, "gpm", limit=2)["total"] == 4
+
+
+def test_migration_skips_the_index_without_fts5(monkeypatch):
+    # A virtual table module that does not exist fails like a build without FTS5
+    ddl = [search._FTS_DDL[0].replace("USING fts5(", "USING fts_missing(")] + search._FTS_DDL[1:]
+    monkeypatch.setattr(search, "_FTS_DDL", ddl)
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        assert search.ensure_search_index(connection) is False
+        connection.execute(insert(Product), [{"item_code": "X1", "description": "PLAIN"}])
+
+    with engine.connect() as connection:
+        names = set(connection.execute(text("SELECT name FROM sqlite_master")).scalars())
+        assert search.FTS_TABLE not in names
+        assert "products_fts_ai" not in names
+        assert connection.execute(text("SELECT count(*) FROM products")).scalar() == 1
@@ -0,0 +1,51 @@
+import os
+from datetime import date
+
+import pytest
+
+from app.models import MasterStock, ConsignmentStock
+from app.services import snapshots
+
+DAY_1 = date(2026, 3, 1)
+DAY_2 = date(2026, 3, 2)
+COLUMNS = snapshots.KEY_COLUMNS + snapshots.VALUE_COLUMNS
+
+
+def _rows(df) -> list[tuple]:
+    return [tuple(row) for row in df[COLUMNS].itertuples(index=False)]
+
+
+def test_partitions_hold_changes_and_replay_to_the_latest_state(tmp_path, db, stock):
+    root = str(tmp_path)
+    first = snapshots.write_snapshot(db, root=root, snapshot_date=DAY_1)
+    assert first["changed_rows"] == first["total_rows"] == 6  # 3 master + 3 consignment rows
+    day_1_state = snapshots.collect_stock_state(db)
+
+    db.query(MasterStock).filter_by(product_id=1).update({"quantity": 90})
+    db.query(ConsignmentStock).filter_by(shop_id=2, product_id=1).delete()
+    db.add(ConsignmentStock(shop_id=2, product_id=3, quantity=4))
+    db.commit()
+    second = snapshots.write_snapshot(db, root=root, snapshot_date=DAY_2)
+    day_2_state = snapshots.collect_stock_state(db)
+
+    # Only the changed, deleted and new rows go into the second partition
+    assert second["changed_rows"] == 3
+    changes = snapshots.read_snapshots(start=DAY_2, root=root).to_pandas()
+    assert sorted(zip(changes["product_id"], changes["shop_id"], changes["deleted"])) == [
+        (1, 0, False), (1, 2, True), (3, 2, False),
+    ]
+    assert snapshots.list_snapshot_dates(root) == [DAY_1, DAY_2]
+    assert os.path.exists(os.path.join(root, f"date={DAY_2.isoformat()}", snapshots.SNAPSHOT_FILE))
+
+    latest, latest_date = snapshots.load_latest_state(root)
+    assert latest_date == DAY_2
+    assert _rows(latest) == _rows(day_2_state)
+
+    assert _rows(snapshots.stock_state_as_of(DAY_1, root)) == _rows(day_1_state)
+    assert _rows(snapshots.stock_state_as_of(DAY_2, root)) == _rows(day_2_state)
+
+
+def test_snapshots_are_written_in_date_order(tmp_path, db, stock):
+    snapshots.write_snapshot(db, root=str(tmp_path), snapshot_date=DAY_2)
+    with pytest.raises(ValueError):
+        snapshots.write_snapshot(db, root=str(tmp_path), snapshot_date=DAY_1)
@@ -0,0 +1,104 @@
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from app.models import Invoice, InvoiceItem, ConsignmentSale, StockTransfer, StockCheckpoint
+from app.services.stock_history import build_checkpoints
+
+TODAY = date.today()
+DAYS_AGO = [60, 41, 27, 20, 13, 9, 4, 1]
+
+# (shop_id, product_id, quantity, days ago)
+RECEIVED = [(1, 1, 40, 60), (1, 2, 15, 41), (2, 2, 8, 9)]
+SOLD = [(1, 1, 5, 27), (2, 1, 2, 1), (1, 2, 15, 4)]
+# (from_shop_id, to_shop_id, product_id, quantity, days ago); shop 0 is master stock
+TRANSFERRED = [(1, 2, 1, 6, 20), (2, 0, 2, 3, 4)]
+
+
+def _day(days_ago: int) -> date:
+    return TODAY - timedelta(days=days_ago)
+
+
+def _replay(shop_id: int, days_ago: int) -> dict:
+    """Balances from every event up to the day, without checkpoints"""
+    balances = {}
+    for sid, pid, qty, ago in RECEIVED:
+        if sid == shop_id and ago >= days_ago:
+            balances[pid] = balances.get(pid, 0) + qty
+    for sid, pid, qty, ago in SOLD:
+        if sid == shop_id and ago >= days_ago:
+            balances[pid] = balances.get(pid, 0) - qty
+    for source, target, pid, qty, ago in TRANSFERRED:
+        if ago >= days_ago and source == shop_id:
+            balances[pid] = balances.get(pid, 0) - qty
+        if ago >= days_ago and target == shop_id:
+            balances[pid] = balances.get(pid, 0) + qty
+    return {pid: qty for pid, qty in balances.items() if qty}
+
+
+@pytest.fixture
+def history(db, stock):
+    """Two months of invoices, transfers and sales at the consignment shops"""
+    db.execute(insert(Invoice), [
+        {"id": n, "invoice_no": f"H-{n}", "shop_id": sid, "date": _day(ago)}
+        for n, (sid, _, _, ago) in enumerate(RECEIVED, 1)
+    ])
+    db.execute(insert(InvoiceItem), [
+        {"invoice_id": n, "product_id": pid, "quantity": qty, "rate": 1.0}
+        for n, (_, pid, qty, _) in enumerate(RECEIVED, 1)
+    ])
+    db.execute(insert(ConsignmentSale), [
+        {"shop_id": sid, "product_id": pid, "quantity": qty, "date": _day(ago)}
+        for sid, pid, qty, ago in SOLD
+    ])
+    db.execute(insert(StockTransfer), [
+        {"batch_id": f"b{n}", "from_shop_id": source, "to_shop_id": target,
+         "product_id": pid, "quantity": qty, "date": _day(ago)}
+        for n, (source, target, pid, qty, ago) in enumerate(TRANSFERRED, 1)
+    ])
+    db.commit()
+
+
+def _as_of(client, shop_id: int, days_ago: int) -> dict:
+    response = client.get("/stock/as-of", params={"date": _day(days_ago).isoformat(), "shop_id": shop_id})
+    assert response.status_code == 200, response.text
+    return {item["product_id"]: item["quantity"] for item in response.json()["items"]}
+
+
+@pytest.mark.parametrize("shop_id", [1, 2])
+def test_as_of_matches_a_full_replay(client, db, history, shop_id):
+    expected = {n: _replay(shop_id, n) for n in DAYS_AGO}
+
+    # Without checkpoints the query replays everything, and writes nothing
+    assert {n: _as_of(client, shop_id, n) for n in DAYS_AGO} == expected
+    assert db.query(StockCheckpoint).count() == 0
+
+    assert build_checkpoints(db) > 0
+    assert {n: _as_of(client, shop_id, n) for n in DAYS_AGO} == expected
+
+
+def test_checkpoints_are_built_once(db, history):
+    assert build_checkpoints(db) > 0
+    count = db.query(StockCheckpoint).count()
+    assert build_checkpoints(db) == 0
+    assert db.query(StockCheckpoint).count() == count
+
+    latest = db.query(StockCheckpoint).order_by(StockCheckpoint.date.desc()).first()
+    with pytest.raises(IntegrityError):
+        db.execute(insert(StockCheckpoint), [{
+            "shop_id": latest.shop_id, "product_id": latest.product_id,
+            "date": latest.date, "quantity": latest.quantity + 1,
+        }])
+    db.rollback()
+
+
+def test_checkpoints_hold_only_changed_pairs(db, history):
+    build_checkpoints(db)
+    dates = {d for (d,) in db.query(StockCheckpoint.date).distinct()}
+    rows = db.query(StockCheckpoint).filter_by(shop_id=1, product_id=1).count()
+
+    # P1 at Branch A changed three times in two months of weekly checkpoints
+    assert len(dates) >= 4
+    assert rows <= 3
@@ -0,0 +1,56 @@
+from app.models import ConsignmentStock
+
+
+def _pages(client, since: int, limit: int = 5) -> tuple[list[dict], int]:
+    """Every page after ``since``; returns the pages and the final cursor"""
+    pages = []
+    while True:
+        response = client.get("/sync", params={"since": since, "limit": limit})
+        assert response.status_code == 200, response.text
+        page = response.json()
+        pages.append(page)
+        since = page["cursor"]
+        if not page["has_more"]:
+            return pages, since
+
+
+def _versions(pages: list[dict]) -> list[tuple[int, str, int]]:
+    return [
+        (row["version"], table, row["id"])
+        for page in pages
+        for group in (page["changes"], page["deleted"])
+        for table, rows in group.items()
+        for row in rows
+    ]
+
+
+def test_full_sync_pages_through_every_row_in_version_order(client, stock):
+    pages, cursor = _pages(client, 0)
+    assert len(pages) == 3  # 12 rows, five per page
+
+    versions = _versions(pages)
+    assert [version for version, *_ in versions] == sorted(version for version, *_ in versions)
+    assert len({(table, row_id) for _, table, row_id in versions}) == 12
+    assert cursor == max(version for version, *_ in versions)
+
+
+def test_cursor_returns_only_later_changes_and_tombstones(client, db, stock):
+    _, cursor = _pages(client, 0)
+
+    response = client.post("/stock/transfers", json={"lines": [
+        {"from_shop": "Branch A", "to_shop": "Branch B", "item_code": "P2", "qty": 4},
+    ]})
+    assert response.status_code == 200, response.text
+    db.query(ConsignmentStock).filter_by(shop_id=2, product_id=1).delete()
+    db.commit()
+
+    pages, _ = _pages(client, cursor)
+    changed = {
+        (row["shop_id"], row["product_id"]): row["quantity"]
+        for page in pages
+        for row in page["changes"].get("consignment_stock", [])
+    }
+    assert changed == {(1, 2): 6, (2, 2): 4}
+    tombstones = [row for page in pages for row in page["deleted"].get("consignment_stock", [])]
+    assert len(tombstones) == 1
+    assert all(version > cursor for version, *_ in _versions(pages))
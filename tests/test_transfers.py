@@ -0,0 +1,50 @@
+from app.models import MasterStock, ConsignmentStock, StockTransfer
+
+
+def _consignment(db) -> dict:
+    return {
+        (shop_id, product_id): quantity
+        for shop_id, product_id, quantity in db.query(
+            ConsignmentStock.shop_id, ConsignmentStock.product_id, ConsignmentStock.quantity
+        )
+    }
+
+
+def test_batch_moves_consignment_stock(client, db, stock):
+    response = client.post("/stock/transfers", json={"lines": [
+        {"from_shop": "Branch A", "to_shop": "Branch B", "item_code": "P2", "qty": 4},
+        {"from_shop": "Branch A", "item_code": "P1", "qty": 3},
+    ]})
+    assert response.status_code == 200, response.text
+    assert response.json()["lines"] == 2
+    assert response.json()["units"] == 7
+
+    assert _consignment(db) == {(1, 1): 7, (1, 2): 6, (2, 1): 10, (2, 2): 4}
+    # Master stock already counts consigned units, returned or not
+    assert dict(db.query(MasterStock.product_id, MasterStock.quantity)) == {1: 100, 2: 100, 3: 100}
+    assert db.query(StockTransfer).count() == 2
+
+
+def test_shortfall_rejects_the_whole_batch(client, db, stock):
+    response = client.post("/stock/transfers", json={"lines": [
+        {"from_shop": "Branch A", "to_shop": "Branch B", "item_code": "P2", "qty": 4},
+        {"from_shop": "Branch B", "to_shop": "Branch A", "item_code": "P1", "qty": 11},
+    ]})
+    assert response.status_code == 400
+    problems = response.json()["detail"]["problems"]
+    assert problems == [{
+        "shop": "Branch B", "item_code": "P1", "available": 10, "requested": 11,
+        "error": "Not enough consignment stock",
+    }]
+
+    assert _consignment(db) == {(1, 1): 10, (1, 2): 10, (2, 1): 10}
+    assert db.query(StockTransfer).count() == 0
+
+
+def test_normal_shop_is_not_a_transfer_target(client, db, stock):
+    response = client.post("/stock/transfers", json={"lines": [
+        {"from_shop": "Branch A", "to_shop": "Retail C", "item_code": "P1", "qty": 1},
+    ]})
+    assert response.status_code == 400
+    assert response.json()["detail"]["problems"][0]["line"] == 1
+    assert _consignment(db) == {(1, 1): 10, (1, 2): 10, (2, 1): 10}
@@ -0,0 +1,160 @@
+import asyncio
+import io
+import os
+import tempfile
+import zipfile
+
+import pandas as pd
+import pytest
+
+from app.models import Product, MasterStock, ConsignmentStock, LowStockAlert
+from app.services import uploads
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _workbook(rows: list[dict]) -> bytes:
+    buffer = io.BytesIO()
+    pd.DataFrame(rows).to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+def _zip() -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("notes.txt", "not a workbook")
+    return buffer.getvalue()
+
+
+def test_excel_invoice_credits_consignment_stock(client, db, stock):
+    payload = _workbook([
+        {"Shop": "Branch A", "InvoiceNo": "X-1", "ItemCode": "P1", "Qty": 5, "Rate": 10.0},
+        {"Shop": "Branch A", "InvoiceNo": "X-1", "ItemCode": "P3", "Qty": 2, "Rate": 10.0},
+    ])
+    # The type comes from the content, not the name
+    response = client.post("/upload-invoice", files={"file": ("invoice.pdf", payload)})
+    assert response.status_code == 200, response.text
+    assert response.json()["matched"] == 2
+
+    consignment = dict(db.query(ConsignmentStock.product_id, ConsignmentStock.quantity).filter_by(shop_id=1))
+    assert consignment == {1: 15, 2: 10, 3: 2}
+    # Master stock already counts consigned units
+    assert db.query(MasterStock.quantity).filter_by(product_id=1).scalar() == 100
+
+
+def test_pdf_invoice_is_sniffed_by_content(client):
+    with open(os.path.join(REPO_ROOT, "Invoice GPM-1574.pdf"), "rb") as f:
+        payload = f.read()
+    response = client.post("/upload-invoice", files={"file": ("invoice.xlsx", payload)})
+    assert response.status_code == 200, response.text
+    assert response.json()["lines"] > 0
+
+
+@pytest.mark.parametrize("payload, status", [
+    (b"hello, not an invoice", 415),
+    (_zip(), 400),
+    (_workbook([{"Unexpected": 1}]), 400),
+])
+def test_unreadable_invoice_is_rejected(client, payload, status):
+    response = client.post("/upload-invoice", files={"file": ("invoice.xlsx", payload)})
+    assert response.status_code == status
+
+
+def test_oversized_upload_rejected_from_content_length(client, monkeypatch):
+    monkeypatch.setattr(uploads, "MAX_UPLOAD_BYTES", 1024)
+    response = client.post("/upload-invoice", files={"file": ("big.pdf", b"%PDF-" + b"0" * 200_000)})
+    assert response.status_code == 413
+
+
+def test_oversized_upload_rejected_while_reading(client, monkeypatch):
+    # Let the body past the Content-Length check so the chunked read catches it
+    monkeypatch.setattr(uploads, "MAX_UPLOAD_BYTES", 1024)
+    monkeypatch.setattr(uploads, "MULTIPART_OVERHEAD", 10 ** 9)
+    response = client.post("/upload-invoice", files={"file": ("big.pdf", b"%PDF-" + b"0" * 200_000)})
+    assert response.status_code == 413
+
+
+def test_chunked_upload_without_content_length_is_cut_off(client, monkeypatch):
+    monkeypatch.setattr(uploads, "MAX_UPLOAD_BYTES", 1024)
+    monkeypatch.setattr(uploads, "MULTIPART_OVERHEAD", 0)
+    body = b"--b\r\nContent-Disposition: form-data; name=file; filename=big.pdf\r\n\r\n%PDF-" + b"0" * 4096
+
+    def chunks():
+        yield body
+
+    response = client.post(
+        "/upload-invoice", content=chunks(),
+        headers={"Content-Type": "multipart/form-data; boundary=b"},
+    )
+    assert response.status_code == 413
+    assert response.headers["X-Content-Type-Options"]  # outer middleware still ran
+
+
+def test_streamed_body_is_not_read_past_the_limit(monkeypatch):
+    monkeypatch.setattr(uploads, "MAX_UPLOAD_BYTES", 1024)
+    monkeypatch.setattr(uploads, "MULTIPART_OVERHEAD", 0)
+    messages = [{"type": "http.request", "body": b"x" * 512, "more_body": True} for _ in range(10)]
+    sent = []
+
+    async def app(scope, receive, send):
+        while (await receive()).get("more_body"):
+            pass
+        raise AssertionError("the whole body was read")
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/products/import", "headers": []}
+    asyncio.run(uploads.UploadSizeLimit(app)(scope, receive, send))
+    assert sent[0]["status"] == 413
+    assert len(messages) == 7  # stopped at the third chunk
+
+
+@pytest.mark.parametrize("size, mapped", [(100, False), (2 * 1024 * 1024, True)])
+def test_only_spools_on_disk_are_memory_mapped(size, mapped):
+    spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    spool.write(b"%PDF-" + b"0" * size)
+    staged = uploads.StagedUpload(spool, "x.pdf", size + 5, "", "pdf")
+    with staged.open() as stream:
+        assert isinstance(stream, uploads._MappedFile) == mapped
+        assert stream.read(5) == b"%PDF-"
+    # Opening an in-memory spool must not roll it over to disk
+    assert isinstance(spool._file, io.BytesIO) != mapped
+
+
+def test_csv_catalog_larger_than_the_memory_spool(client, db):
+    # Over 1 MiB, so the upload is spooled to disk and read through a memory map
+    description = "X" * 300
+    lines = ["item_code,gpm_code,description"] + [f"C{i},G{i},{description}" for i in range(4000)]
+    payload = ("\n".join(lines) + "\n").encode()
+    assert len(payload) > 1024 * 1024
+
+    response = client.post("/products/import", files={"file": ("catalog.csv", payload)})
+    assert response.status_code == 200, response.text
+    assert response.json()["inserted"] == 4000
+    assert db.query(MasterStock).count() == 4000
+
+
+def test_catalog_zip_that_is_not_a_workbook(client):
+    response = client.post("/products/import", files={"file": ("catalog.xlsx", _zip())})
+    assert response.status_code == 400
+
+
+def test_catalog_import_raises_alerts_for_new_products_only(client, db, stock):
+    # An alert on an untouched product is left alone rather than recomputed
+    db.add(LowStockAlert(shop_id=0, product_id=1, quantity=5, reorder_level=10))
+    db.commit()
+    payload = b"item_code,gpm_code,description\nP2,G2,Product 2 renamed\nNEW1,GN1,New product\n"
+
+    response = client.post("/products/import", files={"file": ("catalog.csv", payload)})
+    assert response.status_code == 200, response.text
+    assert response.json()["inserted"] == 1
+    assert "stocked_ids" not in response.json()
+
+    alerts = {(a.shop_id, a.product_id) for a in db.query(LowStockAlert)}
+    new_id = db.query(Product.id).filter_by(item_code="NEW1").scalar()
+    assert alerts == {(0, 1), (0, new_id)}